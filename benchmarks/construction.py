@@ -0,0 +1,66 @@
+#! /usr/bin/env python
+
+"""construction.py
+USAGE:  construction.py [NUMBER]
+
+Times the construction of the METER parsers.  Every relay object construction
+used to build its own parser from the relay layout; now the layout is
+compiled once into a shared template.  Three costs are printed:
+
+    compile - compiling the layout into a LayoutTemplate, the least an object
+              that built its own parser would pay.
+    text_data_cards - building a text_data_cards DataCardStack from the
+              layout, which is what relay objects used to do.  text_data_cards
+              was a local development package that is not on PyPI, so this is
+              n/a unless it is installed.
+    after - constructing the relay object now.
+
+NUMBER is the number of constructions to time (default 10000).
+"""
+
+from __future__ import print_function
+import sys
+import timeit
+
+from sel_utilities import RelaySEL311C, RelaySEL351Delta, RelaySEL421
+from sel_utilities.layout import LayoutTemplate
+
+try:
+    import text_data_cards as tdc
+except ImportError:
+    tdc = None
+
+
+def data_card_stack(layout):
+    """ Builds a DataCardStack for a layout the way the relay classes used to.
+    """
+    cl = []
+    for row in layout:
+        if isinstance(row, str):
+            cl.append(tdc.DataCardFixedText(row))
+        elif row[2]:
+            cl.append(tdc.DataCard(row[0], row[1], fixed_fields=row[2]))
+        else:
+            cl.append(tdc.DataCard(row[0], row[1]))
+    return tdc.DataCardStack(cl)
+
+
+def time_us(func, number):
+    return 1e6 / number * timeit.timeit(func, number=number)
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print('%-18s %14s %20s %14s' % ('relay', 'compile (us)',
+                                    'text_data_cards (us)', 'after (us)'))
+    for relay in (RelaySEL311C, RelaySEL351Delta, RelaySEL421):
+        layout = relay._met_layout
+        compile_ = time_us(lambda: LayoutTemplate(layout), number)
+        if tdc is not None:
+            before = '%20.2f' % time_us(lambda: data_card_stack(layout),
+                                        number)
+        else:
+            before = '%20s' % 'n/a'
+        after = time_us(relay, number)
+        print('%-18s %14.2f %s %14.2f' % (relay.__name__, compile_, before,
+                                          after))
@@ -0,0 +1,171 @@
+#! /usr/bin/env python
+
+"""parsers.py
+USAGE:  parsers.py [NUMBER] [--save FILE] [--compare FILE] [--tolerance PCT]
+
+Benchmarks the METER parsers of each relay type on NUMBER synthetic captures
+(default 2000) from sel_utilities.synthetic.  The stages timed are:
+
+    construct   building the relay object
+    match       met.match of the capture
+    read        met.read of the capture without the post-read hook
+    post        the post-read hook on (a copy of) the data read
+    parse_met   the complete parse into a MeterReading
+    batch       read_met_batch of all the captures, per capture (the best
+                of five runs)
+
+For each stage the throughput (captures/s), the 50th, 90th and 99th
+percentile latency of one capture (us) and the peak memory allocated while
+running the stage (kB, from tracemalloc) are printed.
+
+--save writes the results to a JSON file.  --compare reads such a file and
+reports each stage whose median latency grew by more than the tolerance
+(default 20 percent); the exit status is then 1 if any stage regressed.  The
+median is compared rather than the throughput, as it is not thrown off by a
+few slow calls (garbage collection, other processes).
+
+Each relay type ends with how many times faster batch is than read and
+parse_met, comparing its time per capture with their median.
+"""
+
+from __future__ import print_function
+import json
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from sel_utilities import RelaySEL311C, RelaySEL351Delta, RelaySEL421
+from sel_utilities import read_met_batch, synthetic
+from sel_utilities.layout import LayoutView
+
+RELAYS = (RelaySEL311C, RelaySEL351Delta, RelaySEL421)
+
+clock = timeit.default_timer
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(int(p / 100. * len(sorted_values)),
+                             len(sorted_values) - 1)]
+
+
+def time_each(func, items):
+    """ Returns the sorted list of the times of func(item) for each item. """
+    times = []
+    for item in items:
+        t0 = clock()
+        func(item)
+        times.append(clock() - t0)
+    times.sort()
+    return times
+
+
+def peak_memory(func):
+    """ Returns the peak memory allocated while running func, in kB. """
+    if tracemalloc is None:
+        return float('nan')
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024.
+    finally:
+        tracemalloc.stop()
+
+
+def stages(relay, captures):
+    """ Returns a list of (name, per capture function, inputs). """
+    view = LayoutView(relay._met_template)
+    datas = [relay._met_template.read(lines) for lines in captures]
+    post_view = LayoutView(relay._met_template)
+
+    def post(data):
+        post_view.data = dict(data)
+        relay._met_post_read_hook(post_view)
+
+    return [('construct', lambda lines: relay(), captures),
+            ('match', view.match, captures),
+            ('read', view.read, captures),
+            ('post', post, datas),
+            ('parse_met', relay.parse_met, captures)]
+
+
+def benchmark(relay, number):
+    captures = list(synthetic.generate_met(relay, number))
+    results = {}
+    for name, func, items in stages(relay, captures):
+        times = time_each(func, items)
+        results[name] = {
+            'rate': len(times) / sum(times),
+            'p50': 1e6 * percentile(times, 50),
+            'p90': 1e6 * percentile(times, 90),
+            'p99': 1e6 * percentile(times, 99),
+            'peak_kb': peak_memory(lambda: [func(i) for i in items])}
+
+    elapsed = min(timeit.repeat(lambda: read_met_batch(relay, captures),
+                                number=1, repeat=5))
+    per = 1e6 * elapsed / number
+    results['batch'] = {'rate': number / elapsed, 'p50': per, 'p90': per,
+                        'p99': per,
+                        'peak_kb': peak_memory(
+                            lambda: read_met_batch(relay, captures))}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """ Prints the stages that are slower than the baseline. Returns True if
+        there are any.
+    """
+    regressed = False
+    for relay, relay_results in sorted(results.items()):
+        for stage, r in sorted(relay_results.items()):
+            try:
+                before = baseline[relay][stage]['p50']
+            except KeyError:
+                continue
+            change = 100. * (r['p50'] - before) / before
+            if change > tolerance:
+                regressed = True
+                print('REGRESSION %-18s %-10s p50 %9.2f -> %9.2f us (%+.1f%%)'
+                      % (relay, stage, before, r['p50'], change))
+    return regressed
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    for option in ('--save', '--compare', '--tolerance'):
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    number = int(args[0]) if args else 2000
+
+    print('%-18s %-10s %12s %9s %9s %9s %10s' % (
+        'relay', 'stage', 'captures/s', 'p50 (us)', 'p90 (us)', 'p99 (us)',
+        'peak (kB)'))
+    results = {}
+    for relay in RELAYS:
+        results[relay.__name__] = benchmark(relay, number)
+        for stage in ('construct', 'match', 'read', 'post', 'parse_met',
+                      'batch'):
+            r = results[relay.__name__][stage]
+            print('%-18s %-10s %12.0f %9.2f %9.2f %9.2f %10.1f' % (
+                relay.__name__, stage, r['rate'], r['p50'], r['p90'],
+                r['p99'], r['peak_kb']))
+        r = results[relay.__name__]
+        print('%-18s batch is %.1fx read, %.1fx parse_met' % (
+            relay.__name__, r['read']['p50'] / r['batch']['p50'],
+            r['parse_met']['p50'] / r['batch']['p50']))
+
+    if '--save' in options:
+        with open(options['--save'], 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if '--compare' in options:
+        with open(options['--compare']) as f:
+            baseline = json.load(f)
+        if compare(results, baseline,
+                   float(options.get('--tolerance', 20.))):
+            sys.exit(1)
@@ -10,9 +10,10 @@ output (using > on the command line).
 """
 
 from __future__ import print_function, unicode_literals
-import re
 import sys
 
+from sel_utilities.fleet import read_settings_export
+
 if len(sys.argv) == 1:
     print("ERROR:  Please include a filename when calling this program.")
     print("(Example Usage:  %s \"SET_R1.txt\")" % sys.argv[0])
@@ -22,24 +23,7 @@ the problem may be Windows calling the Python program without arguments.")
 
 InFileName = sys.argv[1]
 
-SettingRegEx = re.compile(r'([A-Z]+)([0-9]+),"(.*)"')
-
-with open(InFileName) as InFile:
-
-    # Read in lines until Event Report Digitals settings are found
-    l = InFile.readline()
-    if l:
-        sMatch = SettingRegEx.match(l)
-    else:
-        sMatch = None
-    while l:
-        if sMatch:
-            # Print only Event Report Digital points
-            if sMatch.group(1) == 'ERDG' and len(sMatch.group(3)) > 0:
-                print(sMatch.group(3))
-
-        l = InFile.readline()
-        if l:
-            sMatch = SettingRegEx.match(l)
-        else:
-            sMatch = None
+# Print only Event Report Digital points
+info, group, settings = read_settings_export(InFileName)
+for point in settings.points('ERDG'):
+    print(point)
@@ -0,0 +1,49 @@
+#! /usr/bin/env python
+
+"""IngestMeter.py
+USAGE:  IngestMeter.py <DIRECTORY> [<PATTERN>]
+where <DIRECTORY> is a directory of saved METER captures and <PATTERN> is an
+optional filename pattern such as "*.txt" (default all files).
+
+The METER captures in all files under the directory are parsed with a pool of
+worker processes.  The number of captures found for each relay type and the
+number of files processed per second are printed, along with any files that
+could not be read.
+"""
+
+from __future__ import print_function
+import sys
+
+from sel_utilities.ingest import ingest_directory
+
+
+def print_rate(n_files, elapsed):
+    print('\r%d files, %.0f files/s' % (n_files, n_files / max(elapsed, 1e-9)),
+          end='')
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("ERROR:  Please include a directory name when calling this "
+              "program.")
+        print("(Example Usage:  %s \"METER captures\" \"*.txt\")"
+              % sys.argv[0])
+        sys.exit(1)
+
+    pattern = sys.argv[2] if len(sys.argv) == 3 else '*'
+    counts = {}
+    n_skipped = 0
+    errors = []
+    for chunk in ingest_directory(sys.argv[1], pattern, report=print_rate):
+        for relay, columns in chunk.tables.items():
+            counts[relay.__name__] = (counts.get(relay.__name__, 0) +
+                                      len(columns['FILE']))
+        n_skipped += len(chunk.skipped)
+        errors.extend(chunk.errors)
+    print()
+    for name in sorted(counts):
+        print('%s: %d captures' % (name, counts[name]))
+    print('%d files without METER captures' % n_skipped)
+    for path, message in errors:
+        print('Could not read %s: %s' % (path, message))
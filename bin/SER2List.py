@@ -10,34 +10,14 @@ line).
 """
 
 from __future__ import print_function, unicode_literals
-import re
 
-SettingRegEx = re.compile(r'([A-Z]+)([0-9]+),"(.*)"')
+from sel_utilities.fleet import read_settings_export
 
 def get_SERList(InFileName):
     '''Returns a list of strings that are the SER points in the given input file.
     '''
-    SERList = []
-    with open(InFileName) as InFile:
-
-        # Read in lines until SER settings are found
-        l = InFile.readline()
-        if l:
-            sMatch = SettingRegEx.match(l)
-        else:
-            sMatch = None
-        while l:
-            if sMatch:
-                # Return only SER points
-                if sMatch.group(1) == 'SITM' and len(sMatch.group(3)) > 0:
-                    SERList.append(sMatch.group(3))
-
-            l = InFile.readline()
-            if l:
-                sMatch = SettingRegEx.match(l)
-            else:
-                sMatch = None
-    return SERList
+    info, group, settings = read_settings_export(InFileName)
+    return settings.points('SITM')
 
 if __name__ == "__main__":
     import sys
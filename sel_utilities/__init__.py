@@ -5,3 +5,6 @@ __email__ = 'pdb.lists@gmail.com'
 __version__ = '0.1.0'
 
 from .sel_utilities import *
+from .batch import read_met_batch, derive_met_quantities
+from .detect import RelayDetector, detect_relay
+from .timestamps import parse_timestamp, parse_timestamps
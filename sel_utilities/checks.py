@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+""" Vectorized consistency and imbalance checks of METER readings.
+
+    The checks work on columns of many readings, such as the output of
+    read_met_batch or the tables of ingest_files, so a whole fleet is checked
+    with a few NumPy operations instead of a loop over met.data dicts.
+
+    Sequence components are recomputed from the phase phasors with one
+    matrix product over a 3 x n array of phasors and compared with the
+    values the relay reported (I1, 3I2, 3I0, V1, V2 or 3V2, 3V0). For relays
+    with only phase-phase voltages (SEL-351 delta) the voltage components
+    are referred to phase-neutral, as the relay reports them, and there is
+    no zero sequence voltage.
+"""
+
+import numpy as np
+
+
+_a = np.exp(2j * np.pi / 3)
+_A_inv = np.array([[1, 1, 1],
+                   [1, _a, _a * _a],
+                   [1, _a * _a, _a]]) / 3.
+
+#  Phase-phase to phase-neutral referral of the V1 and V2 components
+_delta_ratio = np.array([0., np.exp(-1j * np.pi / 6) / np.sqrt(3),
+                         np.exp(1j * np.pi / 6) / np.sqrt(3)])
+
+_phases = {'I': ('IA', 'IB', 'IC'),
+           'V': ('VA', 'VB', 'VC'),
+           'V_DELTA': ('VAB', 'VBC', 'VCA')}
+
+
+def _phasors(columns, names):
+    """ Returns a len(names) x n complex array of the phasors of MAG/ANG
+        columns.
+    """
+    mags = np.array([columns[q + '_MAG'] for q in names], float)
+    rads = np.radians(np.array([columns[q + '_ANG'] for q in names], float))
+    phasors = np.empty(mags.shape, complex)
+    phasors.real = mags * np.cos(rads)
+    phasors.imag = mags * np.sin(rads)
+    return phasors
+
+
+def _phase_names(columns, kind):
+    """ Returns the phase quantity names used for 'I' or 'V', and whether
+        they are phase-phase voltages, or (None, False) if missing.
+    """
+    for key in ((kind,) if kind == 'I' else ('V', 'V_DELTA')):
+        names = _phases[key]
+        if all(q + '_MAG' in columns for q in names):
+            return names, key == 'V_DELTA'
+    return None, False
+
+
+def symmetrical_components(columns, kind):
+    """ Computes the sequence components of the currents or voltages of many
+        readings.
+        Parameters:
+            columns - Dict of METER columns, as from read_met_batch.
+            kind - 'I' for currents or 'V' for voltages.
+
+        Returns a 3 x n complex array with the zero, positive and negative
+        sequence rows. Voltages computed from phase-phase values are referred
+        to phase-neutral and their zero sequence row is 0. Raises KeyError if
+        the columns have no phase quantities of that kind.
+    """
+    names, delta = _phase_names(columns, kind)
+    if names is None:
+        raise KeyError('No phase %s quantities in the columns' % kind)
+    components = _A_inv.dot(_phasors(columns, names))
+    if delta:
+        components *= _delta_ratio[:, np.newaxis]
+    return components
+
+
+def imbalance(columns, kind):
+    """ Returns the imbalance of the phase magnitudes of many readings: the
+        largest deviation from the average of the three phases, divided by the
+        average (NEMA definition). Readings with an average of 0 give NaN.
+    """
+    names, delta = _phase_names(columns, kind)
+    if names is None:
+        raise KeyError('No phase %s quantities in the columns' % kind)
+    mags = np.array([columns[q + '_MAG'] for q in names], float)
+    mean = mags.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(mags - mean).max(axis=0) / mean
+
+
+def _reported(columns, q):
+    """ Returns the phasors of a sequence quantity as reported, from the q or
+        3q columns, or None if the relay does not report it.
+    """
+    if q + '_MAG' in columns:
+        return _phasors(columns, [q])[0]
+    if '3' + q + '_MAG' in columns:
+        return _phasors(columns, ['3' + q])[0] / 3.
+    return None
+
+
+def check_met_batch(columns, sequence_tolerance=0.02, current_imbalance=0.1,
+                    voltage_imbalance=0.02, min_current=1., min_voltage=1.):
+    """ Flags METER readings with inconsistent sequence quantities or with
+        phase imbalance.
+        Parameters:
+            columns - Dict of METER columns of one relay type, as from
+                      read_met_batch.
+            sequence_tolerance - Largest allowed difference between a
+                                 reported and a recomputed sequence phasor, as
+                                 a fraction of the positive sequence
+                                 magnitude.
+            current_imbalance, voltage_imbalance - Largest allowed imbalance
+                                                   ratio (see imbalance).
+            min_current, min_voltage - Readings with a smaller positive
+                                       sequence current (A) or voltage (kV)
+                                       are not checked for that kind, since
+                                       the ratios are meaningless when
+                                       lightly loaded or dead.
+
+        Returns a dict mapping the name of each check to an array of the
+        indices of the readings that fail it. The checks are 'I1', 'I2',
+        'I0', 'V1', 'V2' and 'V0' for the reported sequence quantities that
+        the relay type has, and 'I_IMBALANCE' and 'V_IMBALANCE'.
+    """
+    failed = {}
+    for kind, limit, minimum in (('I', current_imbalance, min_current),
+                                 ('V', voltage_imbalance, min_voltage)):
+        names, delta = _phase_names(columns, kind)
+        if names is None:
+            continue
+        components = symmetrical_components(columns, kind)
+        scale = np.abs(components[1])
+        live = scale >= minimum
+        for i, q in enumerate((kind + '0', kind + '1', kind + '2')):
+            if delta and i == 0:
+                continue
+            reported = _reported(columns, q)
+            if reported is None:
+                continue
+            error = np.abs(reported - components[i])
+            bad = live & ~(error <= sequence_tolerance * scale)
+            failed[q] = np.flatnonzero(bad)
+        bad = live & (imbalance(columns, kind) > limit)
+        failed[kind + '_IMBALANCE'] = np.flatnonzero(bad)
+    return failed
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+""" Lossy compression of METER time series.
+
+    Most METER quantities change little from one poll to the next (FREQ
+    sits at 59.99-60.00, VDC barely moves), so only the significant changes
+    are kept:
+
+    - deadband keeps a point when it differs from the last point kept by
+      more than a threshold. The series is reconstructed by holding the last
+      point kept.
+    - swinging_door keeps the points needed for straight lines between them
+      to pass within a deviation of every point dropped (swinging door
+      trending). The series is reconstructed by linear interpolation.
+
+    Either way, a point is also kept when keyframe seconds have passed since
+    the last point kept, so a reconstruction never has to look far back, and
+    the last point of each batch is kept so a series can be compressed batch
+    by batch. Blank values (NaN) are kept, along with the points on each
+    side of them.
+
+    Times are int64 milliseconds or datetime64 values.
+"""
+
+import numpy as np
+
+
+def _ms(times):
+    times = np.asarray(times)
+    if times.dtype.kind == 'M':
+        return times.astype('datetime64[ms]').astype(np.int64)
+    return times.astype(np.int64)
+
+
+def _keyframe_ms(keyframe):
+    return None if keyframe is None else int(round(keyframe * 1000))
+
+
+def deadband(times, values, threshold, keyframe=None, anchor=None):
+    """ Returns a boolean mask of the points of a series to keep.
+        Parameters:
+            times, values - The series.
+            threshold - Smallest change from the last point kept that is
+                        kept.
+            keyframe - Longest time, in seconds, between points kept.
+            anchor - (time, value) of the last point kept before this batch,
+                     or None to keep the first point.
+    """
+    times = _ms(times)
+    values = np.asarray(values, float)
+    keyframe = _keyframe_ms(keyframe)
+    keep = np.zeros(len(values), bool)
+    if not len(values):
+        return keep
+    if anchor is None:
+        keep[0] = True
+        t_last, v_last = times[0], values[0]
+    else:
+        t_last, v_last = _ms(anchor[0]), anchor[1]
+    for i in range(len(values)):
+        v = values[i]
+        if v != v or v_last != v_last:
+            #  Blank, or first value after blanks
+            significant = (v == v) or (v_last == v_last)
+        else:
+            significant = abs(v - v_last) > threshold
+        if (significant or keep[i] or
+                (keyframe is not None and times[i] - t_last >= keyframe)):
+            keep[i] = True
+            t_last, v_last = times[i], v
+    keep[-1] = True
+    return keep
+
+
+def swinging_door(times, values, deviation, keyframe=None, anchor=None):
+    """ Returns a boolean mask of the points of a series to keep, such that
+        linear interpolation between the points kept is within deviation of
+        every point. The parameters are as for deadband.
+    """
+    times = _ms(times)
+    values = np.asarray(values, float)
+    keyframe = _keyframe_ms(keyframe)
+    n = len(values)
+    keep = np.zeros(n, bool)
+    if not n:
+        return keep
+    if anchor is None:
+        keep[0] = True
+        t_a, v_a = times[0], values[0]
+        start = 1
+    else:
+        t_a, v_a = _ms(anchor[0]), anchor[1]
+        start = 0
+    #  Slopes from the anchor that pass within deviation of every point
+    #  since it
+    upper = -np.inf
+    lower = np.inf
+    i = start
+    while i < n:
+        t, v = times[i], values[i]
+        dt = t - t_a
+        if v != v and v_a != v_a:
+            #  More blanks
+            pass
+        elif v != v or v_a != v_a or dt <= 0:
+            #  Keep blanks and the points on each side of them
+            keep[i] = True
+            if i > 0:
+                keep[i - 1] = True
+        else:
+            slope = (v - v_a) / float(dt)
+            if not upper <= slope <= lower:
+                #  The doors have opened: the previous point ends the line
+                keep[i - 1] = True
+                t_a, v_a = times[i - 1], values[i - 1]
+                upper = -np.inf
+                lower = np.inf
+                continue
+            if keyframe is not None and dt >= keyframe:
+                keep[i] = True
+            else:
+                upper = max(upper, (v - v_a - deviation) / float(dt))
+                lower = min(lower, (v - v_a + deviation) / float(dt))
+        if keep[i]:
+            t_a, v_a = t, v
+            upper = -np.inf
+            lower = np.inf
+        i += 1
+    keep[-1] = True
+    return keep
+
+
+COMPRESSORS = {'deadband': (deadband, 'step'),
+               'swinging_door': (swinging_door, 'linear')}
+
+
+def compress(times, values, method, threshold, keyframe=None, anchor=None):
+    """ Returns the boolean mask of the points to keep with a method
+        ('deadband' or 'swinging_door') of COMPRESSORS.
+    """
+    try:
+        func, interpolation = COMPRESSORS[method]
+    except KeyError:
+        raise ValueError('Unknown compression method %r' % method)
+    return func(times, values, threshold, keyframe, anchor)
+
+
+def reconstruct(kept_times, kept_values, times, method):
+    """ Returns the values of a compressed series at times.
+        Parameters:
+            kept_times, kept_values - The points kept.
+            times - Times to reconstruct the series at.
+            method - Method the series was compressed with.
+
+        Times before the first point kept give NaN, and times after the last
+        one give its value.
+    """
+    kept_times = _ms(kept_times)
+    kept_values = np.asarray(kept_values, float)
+    times = _ms(times)
+    values = np.full(len(times), np.nan)
+    if not len(kept_times):
+        return values
+    j = np.searchsorted(kept_times, times, 'right') - 1
+    ok = j >= 0
+    values[ok] = kept_values[j[ok]]
+    if COMPRESSORS[method][1] == 'linear':
+        inside = ok & (j < len(kept_times) - 1)
+        j = j[inside]
+        t0 = kept_times[j]
+        t1 = kept_times[j + 1]
+        v0 = kept_values[j]
+        v1 = kept_values[j + 1]
+        frac = (times[inside] - t0) / (t1 - t0).astype(float)
+        #  Exact at the points kept, even next to a blank
+        values[inside] = np.where(frac == 0, v0, v0 + frac * (v1 - v0))
+    return values
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+""" Detection of the relay type of unlabeled METER captures.
+
+    A fingerprint index is built once from the fixed text lines and label
+    columns of each relay's METER layout. A capture is then identified by
+    looking up a few of its header lines in the index and checking the fixed
+    text of the candidate layout, without converting any numbers.
+
+    By default a detector recognizes every layout registered when it is
+    built, including those registered after this module was imported.
+"""
+
+from .registry import meter_layout_names
+from .sel_utilities import meter_relay_class
+
+
+def meter_relays():
+    """ Returns a tuple of the relay classes of all the registered METER
+        layouts, in the order they were registered.
+    """
+    return tuple(meter_relay_class(name) for name in meter_layout_names())
+
+
+#  The built-in relay classes
+METER_RELAYS = meter_relays()
+
+
+class RelayDetector(object):
+    """ Identifies which relay class a METER capture belongs to.
+        Parameters:
+            relays - Relay classes to recognize. Defaults to those of all the
+                     layouts registered now (see meter_relays).
+    """
+    def __init__(self, relays=None):
+        if relays is None:
+            relays = meter_relays()
+        self.relays = tuple(relays)
+        self._index = {}
+        for relay in self.relays:
+            key = self._fingerprint(relay, relay._met_template.checks)
+            self._index.setdefault(key, []).append(relay)
+        #  Line numbers to look up, in the order they are probed
+        self._probes = sorted(set(line_no for line_no, text in self._index))
+
+    def _fingerprint(self, relay, checks):
+        """ Returns the (line_no, text) of the first non-blank full line of
+            fixed text in the layout that no other relay has at the same
+            line, or the first non-blank one if none is unique.
+        """
+        lines = [(line_no, text) for line_no, start, stop, text in checks
+                 if stop is None and text]
+        others = set()
+        for other in self.relays:
+            if other is not relay:
+                others.update((line_no, text) for line_no, start, stop, text
+                              in other._met_template.checks
+                              if stop is None)
+        for line in lines:
+            if line not in others:
+                return line
+        return lines[0]
+
+    def detect(self, lines):
+        """ Returns the relay class for the METER capture, or None if the
+            capture is not recognized.
+            Parameters:
+                lines - List of lines of a METER capture, or a string.
+        """
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        for line_no in self._probes:
+            if line_no >= len(lines):
+                break
+            for relay in self._index.get((line_no, lines[line_no].rstrip()),
+                                         ()):
+                if relay._met_template.prefilter(lines):
+                    return relay
+        return None
+
+    def group(self, captures):
+        """ Sorts METER captures by relay type.
+            Returns a dict mapping each relay class (or None for unrecognized
+            captures) to the list of its captures in their original order.
+        """
+        groups = {}
+        for lines in captures:
+            groups.setdefault(self.detect(lines), []).append(lines)
+        return groups
+
+
+_detector = None
+_detector_names = None
+
+
+def default_detector():
+    """ Returns a shared RelayDetector for all the registered layouts. It is
+        built again when the registry has changed since it was built.
+    """
+    global _detector, _detector_names
+    names = meter_layout_names()
+    if _detector is None or names != _detector_names:
+        _detector = RelayDetector()
+        _detector_names = names
+    return _detector
+
+
+def detect_relay(lines):
+    """ Returns the relay class for a METER capture using default_detector,
+        or None if the capture is not recognized.
+    """
+    return default_detector().detect(lines)
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+""" Decoding of SEL Fast Meter binary messages.
+
+    A relay answers the Fast Meter configuration command (A5 C1) with a
+    message describing its data message (A5 D1): the analog channels, their
+    data types and scale factors, and where the analog data, time stamp and
+    digital banks are. The configuration is decoded with struct into a NumPy
+    structured dtype, and data messages are then read straight from their
+    bytes through that dtype, many at once and without going through METER
+    text.
+
+    Decoded messages are mapped onto the METER field names of a relay class,
+    so the results can be used like those of parse_met and read_met_batch:
+
+    - With two samples per channel, current and voltage channels (names
+      starting with I or V, but not VDC) are phasors. The second sample is
+      taken a quarter cycle after the first, so the phasor is s0 - j s1. Its
+      magnitude and angle (degrees) go in the <name>_MAG and <name>_ANG
+      fields. With one sample per channel, they are magnitudes and go in
+      the <name>_MAG fields.
+    - Other channels (FREQ, VDC, MW_3P, etc.) go in the field of the same
+      name, from their first sample.
+    - I1, 3I2, 3I0, V1, V2/3V2 and 3V0 are computed from the phase
+      phasors, and MW and MVAR from the phase voltages and currents, for
+      fields not sent as channels.
+    - RID and TID are not in the messages and are given by the caller. DATE
+      and TIME come from the time stamp. Other fields are blank.
+
+    Message layouts (all values big-endian):
+
+    Configuration, A5 C1:
+        header          2 bytes, A5 C1
+        length          1 byte, bytes in the message
+        status bytes    1 byte, number of status flag bytes
+        scale location  1 byte, unused
+        scale factors   1 byte, number of scale factors
+        analog channels 1 byte
+        samples         1 byte, samples per channel (1 or 2)
+        digital banks   1 byte
+        calc blocks     1 byte, number of calculation blocks
+        analog offset   2 bytes, position of the analog data
+        time offset     2 bytes, position of the time stamp, FFFF if none
+        digital offset  2 bytes, position of the digital banks
+        for each channel (10 bytes):
+            name        6 bytes, ASCII padded with NUL
+            type        1 byte, 0 int16, 1 float32, 2 float64
+            scale type  1 byte, FF for none, 1 for a float32 scale factor
+            scale offset 2 bytes, position of the factor in the data message
+        for each calculation block, 14 bytes (kept but not used)
+        reserved        1 byte
+        checksum        1 byte
+
+    Data, A5 D1:
+        header          2 bytes, A5 D1
+        length          1 byte
+        status          status bytes
+        analog data     at analog offset, channel by channel
+        time stamp      at time offset, 8 bytes: year (2), day of year (2),
+                        milliseconds since midnight (4)
+        digital banks   at digital offset
+        checksum        1 byte
+
+    The checksum is the sum of all the bytes before it, modulo 256.
+"""
+
+import collections
+import datetime
+import struct
+
+import numpy as np
+
+from .batch import _relay_class, derive_met_quantities
+from .checks import _A_inv, _delta_ratio, _phase_names, _phasors
+from .impedance import apparent_power
+
+
+CONFIG_HEADER = b'\xa5\xc1'
+DATA_HEADER = b'\xa5\xd1'
+
+_config_head = struct.Struct('>2s8B3H')
+_config_channel = struct.Struct('>6s2BH')
+_calc_block_size = 14
+_channel_types = {0: '>i2', 1: '>f4', 2: '>f8'}
+_no_time = 0xffff
+
+
+FastMeterChannel = collections.namedtuple(
+    'FastMeterChannel', ['name', 'dtype', 'scale_type', 'scale_offset'])
+
+
+def _checksum(message):
+    return sum(bytearray(message[:-1])) & 0xff
+
+
+def _check_message(message, header):
+    """ Checks the header, length and checksum of a message. """
+    message = bytes(message)
+    if message[:2] != header:
+        raise ValueError('Not a Fast Meter %s message'
+                         % ('configuration' if header == CONFIG_HEADER
+                            else 'data'))
+    if len(message) < 4 or bytearray(message)[2] != len(message):
+        raise ValueError('Fast Meter message length does not match its '
+                         'length byte')
+    if _checksum(message) != bytearray(message)[-1]:
+        raise ValueError('Fast Meter message checksum error')
+    return message
+
+
+class FastMeterConfig(object):
+    """ Decoded Fast Meter configuration message.
+        Parameters:
+            message - Bytes of the A5 C1 message.
+
+        Attributes:
+            channels - List of FastMeterChannel (name, dtype, scale_type,
+                       scale_offset).
+            samples - Samples per channel.
+            n_status, n_digital - Number of status bytes and digital banks.
+            analog_offset, time_offset, digital_offset - Positions in the
+                                                         data message.
+            calc_blocks - List of the raw calculation blocks.
+            data_length - Length of the data messages.
+            dtype - NumPy structured dtype of a data message, with one field
+                    per channel, and 'YEAR', 'DAY' and 'MS' fields for the
+                    time stamp if any.
+
+        Raises ValueError if the message is not valid.
+    """
+    def __init__(self, message):
+        message = _check_message(message, CONFIG_HEADER)
+        (header, length, self.n_status, scale_location, n_scale, n_analog,
+         self.samples, self.n_digital, n_calc, self.analog_offset,
+         self.time_offset, self.digital_offset) = _config_head.unpack_from(
+            message)
+        expected = (_config_head.size + n_analog * _config_channel.size +
+                    n_calc * _calc_block_size + 2)
+        if length != expected:
+            raise ValueError('Fast Meter configuration is %d bytes; %d '
+                             'expected' % (length, expected))
+
+        pos = _config_head.size
+        self.channels = []
+        for i in range(n_analog):
+            name, typ, scale_type, scale_offset = \
+                _config_channel.unpack_from(message, pos)
+            if typ not in _channel_types:
+                raise ValueError('Unknown Fast Meter channel type %d' % typ)
+            name = name.rstrip(b'\0 ').decode('ascii')
+            self.channels.append(FastMeterChannel(
+                name, _channel_types[typ], scale_type, scale_offset))
+            pos += _config_channel.size
+        self.calc_blocks = [message[p:p + _calc_block_size]
+                            for p in range(pos, pos + n_calc *
+                                           _calc_block_size,
+                                           _calc_block_size)]
+        self.data_length = self.digital_offset + self.n_digital + 1
+        self.dtype = self._data_dtype()
+
+    def _data_dtype(self):
+        names = []
+        formats = []
+        offsets = []
+        pos = self.analog_offset
+        for channel in self.channels:
+            names.append(channel.name)
+            if self.samples == 1:
+                formats.append(channel.dtype)
+            else:
+                formats.append((channel.dtype, self.samples))
+            offsets.append(pos)
+            pos += np.dtype(channel.dtype).itemsize * self.samples
+            if channel.scale_type != 0xff:
+                names.append(channel.name + '_SCALE')
+                formats.append('>f4')
+                offsets.append(channel.scale_offset)
+        if self.time_offset != _no_time:
+            names.extend(['YEAR', 'DAY', 'MS'])
+            formats.extend(['>u2', '>u2', '>u4'])
+            offsets.extend(self.time_offset + i for i in (0, 2, 4))
+        for name, fmt, offset in zip(names, formats, offsets):
+            if offset + np.dtype(fmt).itemsize > self.data_length - 1:
+                raise ValueError('Fast Meter %s data is past the end of the '
+                                 'data message' % name)
+        return np.dtype({'names': names, 'formats': formats,
+                         'offsets': offsets, 'itemsize': self.data_length})
+
+
+def _decode_frames(config, frames):
+    """ Returns a structured array of data messages (no copy), checking
+        their headers, lengths and checksums.
+    """
+    if isinstance(frames, (bytes, bytearray, memoryview)):
+        buf = frames
+    else:
+        buf = b''.join(frames)
+    raw = np.frombuffer(buf, np.uint8)
+    if len(raw) % config.data_length:
+        raise ValueError('Fast Meter data is not a whole number of %d byte '
+                         'messages' % config.data_length)
+    raw = raw.reshape(-1, config.data_length)
+    bad = ((raw[:, 0] != 0xa5) | (raw[:, 1] != 0xd1) |
+           (raw[:, 2] != config.data_length) |
+           (raw[:, :-1].sum(axis=1, dtype=np.uint64) % 256 != raw[:, -1]))
+    if bad.any():
+        raise ValueError('Fast Meter data message %d has a bad header, '
+                         'length or checksum' % bad.argmax())
+    return np.frombuffer(buf, config.dtype)
+
+
+def _is_phasor(name):
+    return name[:1] in ('I', 'V') and not name.startswith('VDC')
+
+
+def _timestamps(data):
+    """ Returns datetime64[ms] timestamps of decoded data messages. """
+    years = (data['YEAR'].astype(np.int64) - 1970).astype('datetime64[Y]')
+    days = years.astype('datetime64[D]').astype(np.int64)
+    ms = ((days + data['DAY'].astype(np.int64) - 1) * 86400000 +
+          data['MS'].astype(np.int64))
+    return ms.astype('datetime64[ms]')
+
+
+def decode_data_batch(relay, config, frames, rid='', tid=''):
+    """ Decodes many Fast Meter data messages into METER columns.
+        Parameters:
+            relay - Relay class (or instance) whose METER fields are filled.
+            config - FastMeterConfig of the relay.
+            frames - Iterable of data messages, or one buffer with the
+                     messages back to back.
+            rid, tid - Relay and terminal IDs for the RID and TID columns.
+
+        Returns a dict of columns like read_met_batch. Raises ValueError if a
+        message does not match the configuration.
+    """
+    relay = _relay_class(relay)
+    data = _decode_frames(config, frames)
+    n = len(data)
+    columns = {}
+    for channel in config.channels:
+        values = data[channel.name].astype(float)
+        if channel.scale_type != 0xff:
+            scale = data[channel.name + '_SCALE'].astype(float)
+            values *= scale if values.ndim == 1 else scale[:, np.newaxis]
+        if not _is_phasor(channel.name):
+            columns[channel.name] = values if values.ndim == 1 else \
+                values[:, 0]
+        elif values.ndim == 1:
+            columns[channel.name + '_MAG'] = values
+        else:
+            phasor = values[:, 0] - 1j * values[:, 1]
+            columns[channel.name + '_MAG'] = np.abs(phasor)
+            columns[channel.name + '_ANG'] = np.degrees(np.angle(phasor))
+
+    _add_sequence(columns)
+    if _phasor_names(columns, 'I') and _phasor_names(columns, 'V'):
+        for name, s in apparent_power(columns).items():
+            ph = name[2:]
+            columns.setdefault('MW_' + ph, s.real)
+            columns.setdefault('MVAR_' + ph, s.imag)
+
+    if config.time_offset != _no_time:
+        stamps = _timestamps(data)
+    else:
+        stamps = None
+    fields = relay._met_template.fields
+    for name, line_no, start, stop, typ in fields:
+        if name in columns:
+            continue
+        if name == 'RID':
+            columns[name] = np.array([rid] * n, dtype=str)
+        elif name == 'TID':
+            columns[name] = np.array([tid] * n, dtype=str)
+        elif name in ('DATE', 'TIME') and stamps is not None:
+            columns[name] = _format_stamps(stamps, name, stop - start)
+        elif typ == 'F':
+            columns[name] = np.full(n, np.nan)
+        else:
+            columns[name] = np.array([''] * n, dtype=str)
+    field_names = set(f[0] for f in fields)
+    for name in list(columns):
+        if name not in field_names:
+            del columns[name]
+    return derive_met_quantities(relay, columns)
+
+
+def _phasor_names(columns, kind):
+    """ Returns the names of the phase phasors of a kind ('I' or 'V') if
+        their magnitudes and angles are all in the columns, else None.
+    """
+    names, delta = _phase_names(columns, kind)
+    if names is None or not all(q + '_ANG' in columns for q in names):
+        return None
+    return names
+
+
+def _add_sequence(columns):
+    """ Adds I1, 3I2, 3I0, V1, V2, 3V2 and 3V0 columns computed from the
+        phase phasors.
+    """
+    for kind in ('I', 'V'):
+        names = _phasor_names(columns, kind)
+        if names is None:
+            continue
+        delta = names[0] == 'VAB'
+        components = _A_inv.dot(_phasors(columns, names))
+        if delta:
+            components *= _delta_ratio[:, np.newaxis]
+        for q, scale, c in ((kind + '0', 3, components[0]),
+                            (kind + '1', 1, components[1]),
+                            (kind + '2', 1, components[2]),
+                            (kind + '2', 3, components[2])):
+            if delta and q == 'V0':
+                continue
+            name = q if scale == 1 else '3' + q
+            columns.setdefault(name + '_MAG', np.abs(c) * scale)
+            columns.setdefault(name + '_ANG', np.degrees(np.angle(c)))
+
+
+def _format_stamps(stamps, name, width):
+    """ Formats timestamps as METER DATE or TIME strings. """
+    out = []
+    for stamp in stamps.astype(datetime.datetime):
+        if name == 'TIME':
+            out.append('%02d:%02d:%02d.%03d' % (
+                stamp.hour, stamp.minute, stamp.second,
+                stamp.microsecond // 1000))
+        elif width >= 10:
+            out.append('%02d/%02d/%04d' % (stamp.month, stamp.day,
+                                           stamp.year))
+        else:
+            out.append('%02d/%02d/%02d' % (stamp.month, stamp.day,
+                                           stamp.year % 100))
+    return np.array(out, dtype=str)
+
+
+def decode_data(relay, config, message, rid='', tid=''):
+    """ Decodes one Fast Meter data message into a MeterReading of the relay
+        class, as from parse_met. Raises ValueError if the message does not
+        match the configuration.
+    """
+    relay = _relay_class(relay)
+    columns = decode_data_batch(relay, config, [message], rid, tid)
+    values = []
+    for name, line_no, start, stop, typ in relay._met_template.fields:
+        v = columns[name][0]
+        if typ == 'F':
+            v = None if v != v else float(v)
+        else:
+            v = str(v)
+        values.append(v)
+    return relay._met_reading.from_values(values)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+""" Listing of saved logs and captures, shared by ingest and settings. """
+
+import fnmatch
+import os
+
+
+def iter_files(path, pattern='*'):
+    """ Yields the names of the files under a directory that match a
+        filename pattern, in sorted order.
+    """
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for name in sorted(fnmatch.filter(filenames, pattern)):
+            yield os.path.join(dirpath, name)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+""" In-memory model of the settings of a fleet of relays.
+
+    SettingsFleet maps each relay (by DEVID) to a RelaySettings, which maps
+    each settings group to a SettingsGroup: an ordered mapping of setting
+    name to value, in the order the relay lists them. Setting names are
+    interned, as the same few thousand names repeat in every relay and
+    group. Looking up a setting is a dict lookup, so asking for one setting
+    of every relay takes time proportional to the number of relays.
+
+    diff_settings compares a group against a reference (a template, or an
+    earlier capture of the same relay) with one lookup per setting.
+
+    The settings may come from parse_settings or extract_settings, or from
+    the files written by export_settings or AcSELerator (read_settings_export
+    and load_exports).
+"""
+
+import collections
+import io
+import os
+import re
+
+try:
+    from sys import intern
+except ImportError:
+    #  Python 2, where intern is a builtin
+    pass
+
+
+_section = re.compile(r'\[(\w+)\]')
+_info_line = re.compile(r'(\w+)=(.*)')
+_setting_line = re.compile(r'(\w+),"(.*)"')
+_export_name = re.compile(r'Set_(\w+)(?: \((\d+)\))?\.txt$', re.IGNORECASE)
+
+
+def _intern(name):
+    try:
+        return intern(name)
+    except TypeError:
+        #  unicode on Python 2
+        return name
+
+
+class SettingsGroup(collections.OrderedDict):
+    """ Ordered mapping of setting name to value of one settings group.
+        Parameters:
+            settings - Iterable of (name, value), or a mapping.
+    """
+    def __init__(self, settings=()):
+        if hasattr(settings, 'items'):
+            settings = settings.items()
+        super(SettingsGroup, self).__init__(
+            (_intern(name), value) for name, value in settings)
+
+    def points(self, prefix):
+        """ Returns the values of the numbered settings prefix1, prefix2,
+            ... (such as SITM for SER points or ERDG for event report
+            digitals) that are not blank, in order.
+        """
+        n = len(prefix)
+        return [value for name, value in self.items()
+                if name.startswith(prefix) and name[n:].isdigit() and value]
+
+    def diff(self, reference, subset=False):
+        """ Returns diff_settings(reference, self, subset). """
+        return diff_settings(reference, self, subset)
+
+
+def diff_settings(reference, settings, subset=False):
+    """ Returns a list of (name, reference value, value) of the settings that
+        differ between two groups, with None for a setting missing from one
+        of them. Settings are listed in the order of the reference, followed
+        by those only in settings.
+        Parameters:
+            reference, settings - Mappings of setting name to value.
+            subset - If True, only the settings in the reference are
+                     compared, as for a template of the settings that matter.
+    """
+    diffs = []
+    for name, old in reference.items():
+        new = settings.get(name)
+        if new != old:
+            diffs.append((name, old, new))
+    if not subset:
+        for name, new in settings.items():
+            if name not in reference:
+                diffs.append((name, None, new))
+    return diffs
+
+
+class RelaySettings(object):
+    """ Settings groups of one relay.
+        Parameters:
+            relay_id - Dict of the relay ID ({'FID': ..., 'DEVID': ...}), as
+                       from parse_settings, or None.
+            devid - DEVID of the relay. Defaults to the one in relay_id.
+
+        Groups are looked up by name: relay['S1'].
+    """
+    def __init__(self, relay_id=None, devid=None):
+        self.relay_id = relay_id
+        if devid is None and relay_id:
+            devid = relay_id.get('DEVID')
+        self.devid = devid
+        self.groups = collections.OrderedDict()
+
+    def __getitem__(self, group):
+        return self.groups[group]
+
+    def __contains__(self, group):
+        return group in self.groups
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def add(self, group, settings):
+        """ Sets the settings of a group, replacing any already there.
+            Returns the SettingsGroup.
+        """
+        if not isinstance(settings, SettingsGroup):
+            settings = SettingsGroup(settings)
+        self.groups[group] = settings
+        return settings
+
+    def get(self, name, group):
+        """ Returns the value of a setting in a group, or None. """
+        settings = self.groups.get(group)
+        return None if settings is None else settings.get(name)
+
+    def diff(self, reference, subset=False):
+        """ Returns a dict of {group: list of differences} (see
+            diff_settings) of the groups that differ from a reference
+            RelaySettings, or a dict of {group: settings}. A group missing
+            from either side differs in all its settings; with subset, only
+            the groups and settings of the reference are compared.
+        """
+        if isinstance(reference, RelaySettings):
+            reference = reference.groups
+        empty = {}
+        diffs = collections.OrderedDict()
+        for group, settings in reference.items():
+            d = diff_settings(settings, self.groups.get(group, empty), subset)
+            if d:
+                diffs[group] = d
+        if not subset:
+            for group, settings in self.groups.items():
+                if group not in reference:
+                    diffs[group] = diff_settings(empty, settings)
+        return diffs
+
+
+class SettingsFleet(object):
+    """ Settings of many relays, by DEVID. Relays are looked up by DEVID:
+        fleet['BROKEN BOW 11S-08']['S1']['50P1P'].
+    """
+    def __init__(self):
+        self.relays = collections.OrderedDict()
+
+    @classmethod
+    def from_captures(cls, captures):
+        """ Returns a SettingsFleet of (relay ID, group, settings), as
+            yielded by parse_settings, or SettingsCapture objects, such as
+            the values of the dict returned by extract_settings. Later
+            captures of a group replace earlier ones.
+        """
+        fleet = cls()
+        for capture in captures:
+            fleet.add(*capture[:3])
+        return fleet
+
+    def __getitem__(self, devid):
+        return self.relays[devid]
+
+    def __contains__(self, devid):
+        return devid in self.relays
+
+    def __iter__(self):
+        return iter(self.relays)
+
+    def __len__(self):
+        return len(self.relays)
+
+    def add(self, relay_id, group, settings, devid=None):
+        """ Sets the settings of a group of a relay. Returns the
+            SettingsGroup.
+        """
+        if devid is None and relay_id:
+            devid = relay_id.get('DEVID')
+        relay = self.relays.get(devid)
+        if relay is None:
+            relay = self.relays[devid] = RelaySettings(relay_id, devid)
+        elif relay_id:
+            relay.relay_id = relay_id
+        return relay.add(group, settings)
+
+    def lookup(self, name, group=None):
+        """ Returns a dict of {(DEVID, group): value} of a setting in every
+            relay that has it, in one group or in all groups.
+        """
+        values = collections.OrderedDict()
+        for devid, relay in self.relays.items():
+            groups = relay.groups if group is None else [group]
+            for g in groups:
+                settings = relay.groups.get(g)
+                if settings is not None and name in settings:
+                    values[(devid, g)] = settings[name]
+        return values
+
+    def diff(self, reference, subset=False):
+        """ Returns a dict of {DEVID: {group: list of differences}} of the
+            relays that differ from a reference.
+            Parameters:
+                reference - SettingsFleet (an earlier capture) to compare each
+                            relay with the same DEVID against, or a
+                            RelaySettings or {group: settings} template to
+                            compare every relay against.
+                subset - See RelaySettings.diff.
+
+            Relays not in a reference SettingsFleet are not compared.
+        """
+        diffs = collections.OrderedDict()
+        for devid, relay in self.relays.items():
+            if isinstance(reference, SettingsFleet):
+                if devid not in reference:
+                    continue
+                d = relay.diff(reference[devid], subset)
+            else:
+                d = relay.diff(reference, subset)
+            if d:
+                diffs[devid] = d
+        return diffs
+
+
+def read_settings_export(path):
+    """ Reads a settings file for import into AcSELerator, as written by
+        export_settings or exported by AcSELerator.
+        Returns (info, group, settings), where info is a dict of the [INFO]
+        section (RELAYTYPE, FID, ...), group is the name of the settings
+        section and settings is a SettingsGroup.
+    """
+    info = {}
+    group = None
+    settings = []
+    with io.open(path, encoding='latin-1') as f:
+        for line in f:
+            m = _section.match(line)
+            if m:
+                group = m.group(1)
+                continue
+            if group == 'INFO':
+                m = _info_line.match(line)
+                if m:
+                    info[m.group(1)] = m.group(2).strip()
+                continue
+            m = _setting_line.match(line)
+            if m:
+                settings.append(m.groups())
+    return info, group, SettingsGroup(settings)
+
+
+def load_exports(path):
+    """ Returns a SettingsFleet of the files written by export_settings to a
+        directory: a folder per relay, named after its DEVID, of Set_<group>
+        files. Of several files of one group, the one modified last is kept,
+        or the one with the highest number in parentheses, which
+        export_settings wrote last.
+
+        Relays are keyed by the DEVID in the [INFO] section of the files, so
+        that they match a fleet parsed from logs even where export_settings
+        had to change the DEVID to name the folder. Files without one (from
+        AcSELerator or older exports) are keyed by the folder name.
+    """
+    fleet = SettingsFleet()
+    for folder in sorted(os.listdir(path)):
+        relay_path = os.path.join(path, folder)
+        if not os.path.isdir(relay_path):
+            continue
+        files = []
+        for name in os.listdir(relay_path):
+            m = _export_name.match(name)
+            if m:
+                file_path = os.path.join(relay_path, name)
+                files.append((os.path.getmtime(file_path),
+                              int(m.group(2) or 0), m.group(1), file_path))
+        for mtime, number, file_group, file_path in sorted(files):
+            info, group, settings = read_settings_export(file_path)
+            if not info.get('DEVID'):
+                info['DEVID'] = folder
+            fleet.add(info, group or file_group, settings)
+    return fleet
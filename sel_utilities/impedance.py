@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+""" Apparent impedances and power flow of METER readings, in batch.
+
+    Like checks, these work on the columns of many readings of one relay
+    type, with one NumPy operation per group of quantities:
+
+    - Phase (loop) impedances ZA = VA / IA, etc., where the relay has phase
+      voltages (SEL-311C, SEL-421).
+    - Phase-phase impedances ZAB = VAB / (IA - IB), etc., from the reported
+      phase-phase voltages (SEL-421, SEL-351 delta) or from the differences
+      of the phase voltages (SEL-311C).
+    - Positive sequence impedance Z1 = V1 / I1 from the reported values.
+
+    Voltages are in kV and currents in A, so impedances are in primary ohms
+    and powers in MVA. Readings with no current give infinite or NaN
+    impedances.
+"""
+
+import numpy as np
+
+from .checks import _phase_names, _phasors
+
+
+_pairs = ('AB', 'BC', 'CA')
+
+
+def _divide(v, i):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return v * 1000. / i
+
+
+def _voltage_names(columns):
+    """ Returns _phase_names(columns, 'V'), or raises KeyError naming the
+        missing phase and phase-phase voltage columns.
+    """
+    names, delta = _phase_names(columns, 'V')
+    if names is None:
+        missing = [q + '_MAG' for q in ('VA', 'VB', 'VC', 'VAB', 'VBC', 'VCA')
+                   if q + '_MAG' not in columns]
+        raise KeyError('No phase V quantities in the columns: missing %s'
+                       % ', '.join(missing))
+    return names, delta
+
+
+def apparent_impedances(columns):
+    """ Computes the apparent impedances of many METER readings.
+        Parameters:
+            columns - Dict of METER columns of one relay type, as from
+                      read_met_batch.
+
+        Returns a dict of complex arrays of impedances in ohms: 'ZA', 'ZB' and
+        'ZC' if the relay has phase voltages, 'ZAB', 'ZBC' and 'ZCA', and
+        'Z1' if the relay reports V1 and I1. Raises KeyError if the columns
+        have neither phase nor phase-phase voltages.
+    """
+    currents = _phasors(columns, ('IA', 'IB', 'IC'))
+    names, delta = _voltage_names(columns)
+    z = {}
+    if not delta:
+        voltages = _phasors(columns, names)
+        for ph, zph in zip('ABC', _divide(voltages, currents)):
+            z['Z' + ph] = zph
+    if all('V%s_MAG' % pair in columns for pair in _pairs):
+        voltages = _phasors(columns, ['V' + pair for pair in _pairs])
+    else:
+        voltages = voltages - np.roll(voltages, -1, axis=0)
+    loops = currents - np.roll(currents, -1, axis=0)
+    for pair, zpair in zip(_pairs, _divide(voltages, loops)):
+        z['Z' + pair] = zpair
+    if 'V1_MAG' in columns and 'I1_MAG' in columns:
+        z['Z1'] = _divide(*_phasors(columns, ('V1', 'I1')))
+    return z
+
+
+def apparent_power(columns):
+    """ Computes the complex power of many METER readings from the voltage
+        and current phasors.
+
+        Returns a dict of complex arrays in MVA: 'S_A', 'S_B', 'S_C' and
+        'S_3P' if the relay has phase voltages, and only 'S_3P' for a delta
+        relay, where the three-wire power is
+        (VAB (IA - IB)* + VBC (IB - IC)* + VCA (IC - IA)*) / 3. Raises
+        KeyError as apparent_impedances does.
+    """
+    currents = _phasors(columns, ('IA', 'IB', 'IC'))
+    names, delta = _voltage_names(columns)
+    if delta:
+        voltages = _phasors(columns, names)
+        loops = currents - np.roll(currents, -1, axis=0)
+        return {'S_3P': (voltages * loops.conj()).sum(axis=0) / 3000.}
+    s = _phasors(columns, names) * currents.conj() / 1000.
+    power = dict(('S_' + ph, s_ph) for ph, s_ph in zip('ABC', s))
+    power['S_3P'] = s.sum(axis=0)
+    return power
+
+
+def check_power(columns, tolerance=0.02, min_power=0.1):
+    """ Compares the reported MW and MVAR of many METER readings with the
+        power computed from the phasors.
+        Parameters:
+            columns - Dict of METER columns of one relay type.
+            tolerance - Largest allowed difference, as a fraction of the
+                        magnitude of the reported power.
+            min_power - Smallest reported power (MVA) that is checked.
+
+        Returns a dict mapping each of 'S_A', 'S_B', 'S_C' and 'S_3P' that
+        the relay reports to an array of the indices of readings that fail.
+    """
+    failed = {}
+    for name, s in apparent_power(columns).items():
+        ph = name[2:]
+        if 'MW_' + ph not in columns:
+            continue
+        reported = np.empty(len(s), complex)
+        reported.real = columns['MW_' + ph]
+        reported.imag = columns['MVAR_' + ph]
+        scale = np.abs(reported)
+        bad = ~(np.abs(s - reported) <= tolerance * scale)
+        failed[name] = np.flatnonzero(bad & (scale >= min_power))
+    return failed
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+""" Bulk ingest of saved METER captures with a process pool.
+
+    Files are split into batches that are parsed in worker processes. Each
+    worker keeps its own RelayDetector and relay layout templates, and sends
+    back its batch as columns (one NumPy array per field and relay type)
+    rather than as pickled dicts. Batches come back in the order of the files.
+"""
+
+import collections
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import read_met_batch
+from .detect import default_detector
+from .files import iter_files
+from .stream import iter_met_blocks
+
+
+IngestChunk = collections.namedtuple('IngestChunk',
+                                     ['paths', 'tables', 'skipped',
+                                      'errors'])
+IngestChunk.__doc__ = """ Result of ingesting one batch of files.
+    Attributes:
+        paths - List of the files in the batch.
+        tables - Dict mapping each relay class found to a dict of columns as
+                 from read_met_batch, with an extra 'FILE' column giving the
+                 index in paths of the file each capture came from.
+        skipped - List of the files in which no METER capture was found.
+        errors - List of (file, message) of the files that could not be
+                 read, which are left out of the batch.
+"""
+
+
+def ingest_batch(paths):
+    """ Parses the METER captures in a list of files into an IngestChunk.
+        This runs in the worker processes of ingest_files. A file that
+        cannot be read is recorded in the errors of the IngestChunk rather
+        than failing the batch.
+    """
+    detector = default_detector()
+    captures = {}
+    skipped = []
+    errors = []
+    for i, path in enumerate(paths):
+        try:
+            with open(path, 'rb') as f:
+                text = f.read()
+        except (IOError, OSError) as e:
+            errors.append((path, str(e)))
+            continue
+        found = False
+        for offset, relay, lines in iter_met_blocks(text, detector):
+            captures.setdefault(relay, ([], []))
+            captures[relay][0].append(i)
+            captures[relay][1].append(lines)
+            found = True
+        if not found:
+            skipped.append(path)
+
+    tables = {}
+    for relay, (files, lines) in captures.items():
+        try:
+            columns = read_met_batch(relay, lines)
+        except ValueError:
+            #  Drop any garbled captures
+            template = relay._met_template
+            ok = [template.match(capture) for capture in lines]
+            files = [f for f, m in zip(files, ok) if m]
+            columns = read_met_batch(
+                relay, [capture for capture, m in zip(lines, ok) if m])
+        columns['FILE'] = np.array(files, dtype=np.int64)
+        tables[relay] = columns
+    return IngestChunk(paths, tables, skipped, errors)
+
+
+def _batches(paths, batch_size):
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_files(paths, batch_size=500, max_workers=None, report=None):
+    """ Parses the METER captures in many files with a process pool.
+        Parameters:
+            paths - Iterable of file names.
+            batch_size - Number of files per batch sent to a worker.
+            max_workers - Number of worker processes. Defaults to the number
+                          of processors.
+            report - Function called after each batch with the number of
+                     files done so far and the elapsed time in seconds.
+
+        Yields an IngestChunk for each batch, in the order of the files. Only
+        a few batches per worker are in progress at any time, so the files
+        may be listed lazily.
+    """
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    start = time.time()
+    n_files = 0
+    batches = _batches(paths, batch_size)
+    futures = collections.deque()
+    with ProcessPoolExecutor(max_workers) as pool:
+        while True:
+            for batch in itertools.islice(batches,
+                                          2 * max_workers - len(futures)):
+                futures.append(pool.submit(ingest_batch, batch))
+            if not futures:
+                break
+            chunk = futures.popleft().result()
+            n_files += len(chunk.paths)
+            if report is not None:
+                report(n_files, time.time() - start)
+            yield chunk
+
+
+def ingest_directory(path, pattern='*', **kwargs):
+    """ Parses the METER captures in the files under a directory with
+        ingest_files. Keyword arguments are passed on to ingest_files.
+    """
+    return ingest_files(iter_files(path, pattern), **kwargs)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+""" Optional timing and counters of METER parsing.
+
+    Instrumentation is off by default; the parsers then only check that the
+    module attribute active is None. enable_stats turns it on for every
+    relay object and parse_met call, and returns the ParseStats object that
+    collects:
+
+    - the time spent in, and number of calls of, met.match, met.read, the
+      post-read hook and parse_met, per relay type,
+    - the number of successful and failed parses per relay type,
+    - the number of met.match probes that did not match, per relay type,
+    - the number of conversion failures per field of the failed parses, per
+      relay type.
+
+    Fields are only looked at one by one after a conversion has failed, so
+    successful parses cost no more than the timing.
+"""
+
+import threading
+import timeit
+
+
+_clock = timeit.default_timer
+
+active = None
+
+STAGES = ('match', 'read', 'post_read', 'parse_met')
+
+
+class ParseStats(object):
+    """ Counters and timers of METER parsing, safe to update and read from
+        many threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Sets all the counters and timers back to zero. """
+        with self._lock:
+            self._time = {}
+            self._calls = {}
+            self._parsed = {}
+            self._failed = {}
+            self._mismatched = {}
+            self._field_errors = {}
+
+    def add_time(self, relay, stage, seconds):
+        key = (relay, stage)
+        with self._lock:
+            self._time[key] = self._time.get(key, 0.) + seconds
+            self._calls[key] = self._calls.get(key, 0) + 1
+
+    def _count(self, relay, ok, template=None, lines=None):
+        """ Counts a parse, and the fields that could not be converted if it
+            failed.
+        """
+        fields = []
+        if not ok and template is not None:
+            for name, (line_no, start, stop, conv) in zip(template.names,
+                                                          template.plan):
+                try:
+                    conv(lines[line_no][start:stop])
+                except (ValueError, IndexError):
+                    fields.append(name)
+        with self._lock:
+            counts = self._parsed if ok else self._failed
+            counts[relay] = counts.get(relay, 0) + 1
+            for name in fields:
+                key = (relay, name)
+                self._field_errors[key] = self._field_errors.get(key, 0) + 1
+
+    def timed_match(self, view, lines):
+        """ met.match with instrumentation. """
+        t0 = _clock()
+        matched = view.template.match(lines)
+        self.add_time(view.name, 'match', _clock() - t0)
+        if not matched:
+            #  A probe, not a parse: the capture may be of another relay,
+            #  and a read of it counts its own failure
+            with self._lock:
+                self._mismatched[view.name] = (
+                    self._mismatched.get(view.name, 0) + 1)
+        return matched
+
+    def timed_read(self, view, lines):
+        """ met.read with instrumentation. """
+        t0 = _clock()
+        try:
+            view.data = view.template.read(lines)
+        except ValueError:
+            self.add_time(view.name, 'read', _clock() - t0)
+            self._count(view.name, False, view.template, lines)
+            raise
+        t1 = _clock()
+        self.add_time(view.name, 'read', t1 - t0)
+        if view.post_read_hook is not None:
+            view.post_read_hook(view)
+            self.add_time(view.name, 'post_read', _clock() - t1)
+        self._count(view.name, True)
+
+    def timed_parse(self, relay, lines):
+        """ relay.parse_met with instrumentation. """
+        name = relay.__name__
+        t0 = _clock()
+        try:
+            reading = relay._met_reading.from_values(
+                relay._met_template.parse_values(lines))
+        except ValueError:
+            self.add_time(name, 'parse_met', _clock() - t0)
+            template = relay._met_template
+            self._count(name, False,
+                        template if template.prefilter(lines) else None,
+                        lines)
+            raise
+        self.add_time(name, 'parse_met', _clock() - t0)
+        self._count(name, True)
+        return reading
+
+    def snapshot(self):
+        """ Returns a copy of the counters as a dict:
+                {relay: {'parsed': n, 'failed': n, 'mismatched': n,
+                         'field_errors': {field: n},
+                         'match': {'calls': n, 'seconds': t},
+                         'read': ..., 'post_read': ..., 'parse_met': ...}}
+        """
+        with self._lock:
+            relays = set(r for r, stage in self._time)
+            relays.update(self._parsed, self._failed, self._mismatched)
+            relays.update(r for r, field in self._field_errors)
+            out = {}
+            for relay in relays:
+                out[relay] = {
+                    'parsed': self._parsed.get(relay, 0),
+                    'failed': self._failed.get(relay, 0),
+                    'mismatched': self._mismatched.get(relay, 0),
+                    'field_errors': dict(
+                        (field, n) for (r, field), n
+                        in self._field_errors.items() if r == relay)}
+                for stage in STAGES:
+                    out[relay][stage] = {
+                        'calls': self._calls.get((relay, stage), 0),
+                        'seconds': self._time.get((relay, stage), 0.)}
+            return out
+
+
+def enable_stats(stats=None):
+    """ Turns instrumentation on, collecting into stats (a new ParseStats by
+        default), and returns the ParseStats.
+    """
+    global active
+    active = stats if stats is not None else ParseStats()
+    return active
+
+
+def disable_stats():
+    """ Turns instrumentation off and returns the ParseStats that was
+        collecting, if any.
+    """
+    global active
+    stats, active = active, None
+    return stats
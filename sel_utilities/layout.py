@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+""" Precompiled fixed-width text layouts.
+
+    A layout is a list describing the lines of a relay response. Strings are
+    lines of fixed text. Tuples of (format, fields, fixed_fields) are lines of
+    data, where format is a Fortran-style format string such as
+    'A12, F10.3, F10.3', fields names each item of the format, and
+    fixed_fields gives the indexes of the items that are fixed text (labels)
+    rather than data.
+
+    A LayoutTemplate is compiled once from a layout and holds the slice of
+    every item together with its converter, in a flat plan that reads all the
+    fields of a capture in a single pass. It is immutable and may be shared
+    by any number of LayoutView objects, which only hold the data read.
+"""
+
+import re
+
+from . import instrument
+
+
+_format_item = re.compile(r'\s*([AF])(\d+)(?:\.\d+)?\s*$')
+
+
+def _parse_format(fmt):
+    """ Returns a list of (type, width) tuples for a Fortran-style format
+        string such as 'A12, F10.3'.
+    """
+    items = []
+    for s in fmt.split(','):
+        m = _format_item.match(s)
+        if not m:
+            raise ValueError('Unsupported format item %r in %r' % (s, fmt))
+        items.append((m.group(1), int(m.group(2))))
+    return items
+
+
+def _float_field(s):
+    """ Converts a numeric field. Blank fields are read as None. """
+    if s.strip():
+        return float(s)
+    return None
+
+
+def _str_field(s):
+    """ Returns a text field unchanged. """
+    return s
+
+
+_converters = {'A': _str_field, 'F': _float_field}
+
+
+def _check_order(check):
+    """ Sort key for the prefilter checks. Lines of fixed text are the most
+        likely to tell layouts apart, and blank lines the least.
+    """
+    line_no, start, stop, text = check
+    if not text:
+        return 2
+    return 0 if stop is None else 1
+
+
+class LayoutTemplate(object):
+    """ Compiled form of a layout.
+        Attributes:
+            n_lines - Number of lines in the layout.
+            checks - Tuple of (line_no, start, stop, text) for each item of
+                     fixed text. stop is None for full lines of fixed text,
+                     and text has trailing whitespace removed.
+            prefilter_checks - The checks in the order used by prefilter:
+                               non-blank lines of fixed text, then labels,
+                               then blank lines.
+            fields - Tuple of (name, line_no, start, stop, type) for each data
+                     item, where type is 'A' or 'F'.
+            lines - Tuple with, for each line, a tuple of
+                    (name, start, stop, converter) for the fields on that
+                    line.
+            names - Tuple of the data item names, in the order of fields.
+            plan - Tuple of (line_no, start, stop, converter) for each data
+                   item, in the order of fields.
+    """
+    __slots__ = ('n_lines', 'checks', 'prefilter_checks', 'fields', 'lines',
+                 'names', 'plan')
+
+    def __init__(self, layout):
+        checks = []
+        fields = []
+        lines = []
+        for line_no, row in enumerate(layout):
+            line_fields = []
+            if isinstance(row, str):
+                checks.append((line_no, 0, None, row.rstrip()))
+            else:
+                fmt, names, fixed = row
+                start = 0
+                for i, (typ, width) in enumerate(_parse_format(fmt)):
+                    stop = start + width
+                    if i in fixed:
+                        checks.append((line_no, start, stop,
+                                       names[i].rstrip()))
+                    else:
+                        fields.append((names[i], line_no, start, stop, typ))
+                        line_fields.append((names[i], start, stop,
+                                            _converters[typ]))
+                    start = stop
+            lines.append(tuple(line_fields))
+        prefilter_checks = sorted(checks, key=_check_order)
+        set_ = object.__setattr__
+        set_(self, 'n_lines', len(layout))
+        set_(self, 'checks', tuple(checks))
+        set_(self, 'prefilter_checks', tuple(prefilter_checks))
+        set_(self, 'fields', tuple(fields))
+        set_(self, 'lines', tuple(lines))
+        set_(self, 'names', tuple(f[0] for f in fields))
+        set_(self, 'plan', tuple((line_no, start, stop, _converters[typ])
+                                 for name, line_no, start, stop, typ
+                                 in fields))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('LayoutTemplate is immutable')
+
+    def prefilter(self, lines):
+        """ Returns True if the lines have the number of lines, fixed text and
+            labels of the layout. No numbers are converted, so this is a cheap
+            way to reject text that is not in this layout.
+        """
+        if len(lines) < self.n_lines:
+            return False
+        for line_no, start, stop, text in self.prefilter_checks:
+            if lines[line_no][start:stop].rstrip() != text:
+                return False
+        return True
+
+    def _mismatch(self, lines):
+        """ Returns a description of why the lines fail the prefilter. """
+        if len(lines) < self.n_lines:
+            return '%d lines found; %d expected' % (len(lines), self.n_lines)
+        for line_no, start, stop, text in self.checks:
+            if lines[line_no][start:stop].rstrip() != text:
+                return 'Line %d does not match %r' % (line_no, text)
+
+    def match(self, lines):
+        """ Returns True if the lines match the layout: the prefilter passes
+            and every numeric field can be converted.
+        """
+        if not self.prefilter(lines):
+            return False
+        try:
+            self.read(lines)
+        except ValueError:
+            return False
+        return True
+
+    def parse_values(self, lines):
+        """ Returns a list of the data field values read from the lines, in
+            the order of the fields attribute. Raises ValueError if the lines
+            do not match the layout.
+        """
+        if not self.prefilter(lines):
+            raise ValueError(self._mismatch(lines))
+        return [conv(lines[line_no][start:stop])
+                for line_no, start, stop, conv in self.plan]
+
+    def parse(self, lines):
+        """ Returns a new dict of the data fields read from the lines. Raises
+            ValueError if the lines do not match the layout.
+        """
+        return dict(zip(self.names, self.parse_values(lines)))
+
+    def read(self, lines):
+        """ Returns a new dict of the data fields read from the lines, without
+            checking the fixed text.
+        """
+        data = {}
+        for line, line_fields in zip(lines, self.lines):
+            for name, start, stop, conv in line_fields:
+                data[name] = conv(line[start:stop])
+        return data
+
+
+class LayoutView(object):
+    """ Reader for one layout that keeps the data last read, with the same
+        match/read/data interface as a text_data_cards DataCardStack.
+        Parameters:
+            template - LayoutTemplate shared with other views.
+            post_read_hook - Function called with the view after each read.
+            name - Name under which instrument statistics are kept.
+    """
+    __slots__ = ('template', 'post_read_hook', 'data', 'name')
+
+    def __init__(self, template, post_read_hook=None, name=None):
+        self.template = template
+        self.post_read_hook = post_read_hook
+        self.data = {}
+        self.name = name
+
+    def match(self, lines):
+        if instrument.active is not None:
+            return instrument.active.timed_match(self, lines)
+        return self.template.match(lines)
+
+    def read(self, lines):
+        if instrument.active is not None:
+            return instrument.active.timed_read(self, lines)
+        self.data = self.template.read(lines)
+        if self.post_read_hook is not None:
+            self.post_read_hook(self)
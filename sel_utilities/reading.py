@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+""" Compact records for parsed METER captures.
+
+    Each relay class has its own MeterReading subclass with a fixed layout.
+    Numeric fields are stored in a single array of doubles and text fields in
+    a tuple of interned strings. Derived quantities (V0, IA, S_3P, etc.) are
+    only computed when they are first looked up, and are then cached.
+
+    A reading is a read-only mapping, so code written for the met.data dict
+    can use it as is, or convert it with dict(reading).
+"""
+
+import cmath
+import math
+import sys
+from array import array
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from .timestamps import parse_timestamp
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    _intern = intern  # noqa: F821 (Python 2)
+
+
+_NUM = 0
+_STR = 1
+_DERIVED = 2
+_MISSING = object()
+_NAN = float('nan')
+
+
+class MeterReading(Mapping):
+    """ Quantities parsed from one METER capture.
+        Attributes:
+            relay - Relay class that parsed the capture.
+            data - Dict with all quantities, as in met.data after met.read.
+            timestamp - numpy.datetime64 of the DATE and TIME fields.
+
+        Blank numeric fields are stored as NaN and looked up as None, as in
+        met.data.
+    """
+    __slots__ = ('_num', '_str', '_cache')
+    relay = None
+    _keys = {}
+    _key_order = ()
+    _num_pos = ()
+    _str_pos = ()
+    _strip = ()
+    _derived = ()
+
+    def __init__(self, num, strs):
+        self._num = num
+        self._str = strs
+        self._cache = None
+
+    @classmethod
+    def from_values(cls, values):
+        """ Creates a reading from the list of field values in the order of
+            the relay layout template's fields.
+        """
+        num = array('d', [_NAN if values[i] is None else values[i]
+                          for i in cls._num_pos])
+        strs = tuple([_intern(values[i].strip() if strip else values[i])
+                      for i, strip in zip(cls._str_pos, cls._strip)])
+        return cls(num, strs)
+
+    def __getitem__(self, key):
+        kind, i = self._keys[key]
+        if kind == _NUM:
+            v = self._num[i]
+            return v if v == v else None
+        if kind == _STR:
+            return self._str[i]
+        cache = self._cache
+        if cache is None:
+            cache = self._cache = [_MISSING] * len(self._derived)
+        v = cache[i]
+        if v is _MISSING:
+            v = cache[i] = self._derived[i](self)
+        return v
+
+    def __iter__(self):
+        return iter(self._key_order)
+
+    def __len__(self):
+        return len(self._key_order)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __repr__(self):
+        return '<%s %s %s %s>' % (type(self).__name__, self.get('RID'),
+                                  self.get('DATE'), self.get('TIME'))
+
+    def __reduce__(self):
+        return _rebuild_reading, (self.relay, self._num, self._str)
+
+    @property
+    def data(self):
+        return dict(self.items())
+
+    @property
+    def timestamp(self):
+        return parse_timestamp(self['DATE'], self['TIME'])
+
+
+def _rebuild_reading(relay, num, strs):
+    """ Recreates a pickled reading. """
+    return relay._met_reading(num, strs)
+
+
+def _scaled_third(key):
+    return lambda r: r[key] / 3.
+
+
+def _same(key):
+    return lambda r: r[key]
+
+
+def _phasor(q):
+    mag = q + '_MAG'
+    ang = q + '_ANG'
+    return lambda r: cmath.rect(r[mag], math.radians(r[ang]))
+
+
+def _power(ph):
+    mw = 'MW_' + ph
+    mvar = 'MVAR_' + ph
+    return lambda r: complex(r[mw], r[mvar])
+
+
+def derived_rules(relay):
+    """ Returns a list of (name, function) for the quantities derived from
+        the METER fields of a relay class, in the order they must be
+        computed. Each function takes a mapping of the fields (and of the
+        quantities before it) and returns the value.
+    """
+    rules = []
+    #  V0, I2, I0, etc. from 3V0, 3I2, 3I0, to give a standard interface
+    #  among relays that report either
+    for q in relay._met_sequence:
+        rules.append((q + '_MAG', _scaled_third('3' + q + '_MAG')))
+        rules.append((q + '_ANG', _same('3' + q + '_ANG')))
+    rules.extend((q, _phasor(q)) for q in relay._met_quantities)
+    rules.extend(('S_' + ph, _power(ph)) for ph in relay._met_power_phases)
+    return rules
+
+
+def reading_class(relay):
+    """ Creates the MeterReading subclass for a relay class from its METER
+        layout template and its _met_* derived quantity attributes.
+    """
+    keys = {}
+    order = []
+    num_pos = []
+    str_pos = []
+    strip = []
+    derived = []
+
+    def add(name, kind, i):
+        if name in keys:
+            raise ValueError('Duplicate METER quantity %s' % name)
+        keys[name] = (kind, i)
+        order.append(name)
+
+    for pos, field in enumerate(relay._met_template.fields):
+        name, typ = field[0], field[4]
+        if typ == 'F':
+            add(name, _NUM, len(num_pos))
+            num_pos.append(pos)
+        else:
+            add(name, _STR, len(str_pos))
+            str_pos.append(pos)
+            strip.append(name in relay._met_strings)
+
+    for name, func in derived_rules(relay):
+        add(name, _DERIVED, len(derived))
+        derived.append(func)
+
+    return type(relay.__name__ + 'MeterReading', (MeterReading,),
+                {'__slots__': (),
+                 '__module__': __name__,
+                 'relay': relay,
+                 '_keys': keys,
+                 '_key_order': tuple(order),
+                 '_num_pos': tuple(num_pos),
+                 '_str_pos': tuple(str_pos),
+                 '_strip': tuple(strip),
+                 '_derived': tuple(derived)})
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+""" Registry of relay METER layouts.
+
+    Each relay type with METER output is described by data alone: its layout
+    (see layout) and the rules for the quantities derived from the fields
+    read. An entry is checked and compiled into a LayoutTemplate when it is
+    registered, and sel_utilities.meter_relay_class builds the relay class
+    from it. Adding a relay type means registering one more entry.
+
+    The derived quantity rules are lists of names:
+        sequence - Sequence quantities reported as 3X (3I2, 3V0, ...) for
+                   which X_MAG and X_ANG are added (X_MAG = 3X_MAG / 3).
+        quantities - Quantities with _MAG and _ANG fields for which a complex
+                     phasor is added.
+        power_phases - Phases with MW_ and MVAR_ fields for which a complex
+                       power S_ is added.
+        strings - Text fields from which whitespace is stripped.
+"""
+
+import collections
+
+from .layout import LayoutTemplate
+
+
+MeterLayout = collections.namedtuple(
+    'MeterLayout', ['name', 'doc', 'layout', 'template', 'sequence',
+                    'quantities', 'power_phases', 'strings'])
+
+_meter_layouts = collections.OrderedDict()
+
+
+def register_meter_layout(name, layout, sequence=(), quantities=(),
+                          power_phases=(), strings=(), doc=None):
+    """ Registers the METER layout of a relay type.
+        Parameters:
+            name - Name of the relay class, such as 'RelaySEL311C'.
+            layout - List of the lines of the METER output.
+            sequence, quantities, power_phases, strings - Derived quantity
+                                                           rules.
+            doc - Docstring of the relay class.
+
+        Returns the MeterLayout entry. Raises ValueError if the name is
+        already registered or the entry is not consistent.
+    """
+    if name in _meter_layouts:
+        raise ValueError('METER layout %s is already registered' % name)
+    template = LayoutTemplate(layout)
+    types = dict((f[0], f[4]) for f in template.fields)
+    needed = ([('3' + q + suffix, 'F') for q in sequence
+               for suffix in ('_MAG', '_ANG')] +
+              [('MW_' + ph, 'F') for ph in power_phases] +
+              [('MVAR_' + ph, 'F') for ph in power_phases] +
+              [(q, 'A') for q in strings])
+    derived = set(q + suffix for q in sequence for suffix in ('_MAG', '_ANG'))
+    needed.extend((q + suffix, 'F') for q in quantities
+                  for suffix in ('_MAG', '_ANG')
+                  if q + suffix not in derived)
+    for field, typ in needed:
+        if types.get(field) != typ:
+            raise ValueError('METER layout %s has no %s field %s'
+                             % (name, 'numeric' if typ == 'F' else 'text',
+                                field))
+    entry = MeterLayout(name, doc, layout, template, tuple(sequence),
+                        tuple(quantities), tuple(power_phases),
+                        tuple(strings))
+    _meter_layouts[name] = entry
+    return entry
+
+
+def meter_layout(name):
+    """ Returns the registered MeterLayout of a relay type. """
+    return _meter_layouts[name]
+
+
+def meter_layout_names():
+    """ Returns the names of the registered relay types, in the order they
+        were registered.
+    """
+    return list(_meter_layouts)
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+""" Streaming statistics of METER quantities per relay.
+
+    RollingAggregator takes MeterReading objects as they are parsed and keeps
+    the count, mean, variance, minimum, maximum and quantiles of chosen
+    fields for each relay, over the whole stream and over sliding time
+    windows. The statistics are updated with each reading and can be looked
+    up at any time without going back over the readings.
+
+    RunningStats (whole stream) uses Welford's method for the mean and
+    variance and the P-square algorithm to estimate quantiles, so its memory
+    use is constant.
+
+    WindowStats (sliding window) splits the window into a fixed number of
+    buckets of time. Each bucket keeps its count, Welford mean and variance,
+    minimum, maximum and a quantile sketch of at most 2 * sketch_size
+    weighted values, which are merged when the statistics are looked up.
+    Memory is bounded by the number of buckets, however many readings fall
+    in the window. Values leave the window a whole bucket at a time, so the
+    statistics cover between window and window + window / buckets of time.
+"""
+
+import bisect
+import collections
+import math
+
+import numpy as np
+
+from .timestamps import parse_timestamp
+
+
+class _P2Quantile(object):
+    """ P-square estimate of one quantile (Jain and Chlamtac, 1985) from
+        five markers.
+    """
+    __slots__ = ('p', 'q', 'n', 'np', 'dn')
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []
+        self.n = [0, 1, 2, 3, 4]
+        self.np = [0., 2 * p, 4 * p, 2 + 2 * p, 4.]
+        self.dn = [0., p / 2., p, (1 + p) / 2., 1.]
+
+    def add(self, x):
+        q = self.q
+        if len(q) < 5:
+            bisect.insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+        n = self.n
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+        for i in (1, 2, 3):
+            d = self.np[i] - n[i]
+            if ((d >= 1 and n[i + 1] - n[i] > 1) or
+                    (d <= -1 and n[i - 1] - n[i] < -1)):
+                d = 1 if d > 0 else -1
+                qi = self._parabolic(i, d)
+                if not q[i - 1] < qi < q[i + 1]:
+                    qi = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qi
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q = self.q
+        n = self.n
+        return q[i] + d / float(n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        """ Returns the estimate, interpolated between the markers at the
+            position of the quantile. This is exact until the markers have
+            moved away from the values seen.
+        """
+        q = self.q
+        if len(q) < 5:
+            return _sorted_quantile(q, self.p)
+        n = self.n
+        pos = self.p * n[4]
+        for i in range(4):
+            if pos <= n[i + 1]:
+                return q[i] + (pos - n[i]) * (q[i + 1] - q[i]) / float(
+                    n[i + 1] - n[i])
+        return q[4]
+
+
+def _sorted_quantile(values, p):
+    """ Returns the p quantile of a sorted list, interpolating linearly. """
+    if not values:
+        return None
+    pos = p * (len(values) - 1)
+    i = int(pos)
+    if i + 1 >= len(values):
+        return values[-1]
+    return values[i] + (pos - i) * (values[i + 1] - values[i])
+
+
+class RunningStats(object):
+    """ Statistics of all the values added, in constant memory.
+        Parameters:
+            quantiles - Quantiles to estimate, between 0 and 1.
+    """
+    __slots__ = ('count', 'mean', '_m2', 'min', 'max', '_quantiles')
+
+    def __init__(self, quantiles=(0.5,)):
+        self.count = 0
+        self.mean = 0.
+        self._m2 = 0.
+        self.min = None
+        self.max = None
+        self._quantiles = [_P2Quantile(p) for p in quantiles]
+
+    def add(self, x):
+        self.count += 1
+        d = x - self.mean
+        self.mean += d / self.count
+        self._m2 += d * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        for q in self._quantiles:
+            q.add(x)
+
+    @property
+    def variance(self):
+        """ Sample variance, or None if fewer than two values. """
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+    def quantile(self, p):
+        for q in self._quantiles:
+            if q.p == p:
+                return q.value()
+        raise KeyError('Quantile %r is not estimated' % p)
+
+    def summary(self):
+        """ Returns a dict of count, mean, std, min, max and the quantiles
+            (keyed by their value).
+        """
+        return _summary(self, [q.p for q in self._quantiles])
+
+
+class _Bucket(object):
+    """ Statistics of the values of one bucket of time of a WindowStats. """
+    __slots__ = ('k', 'count', 'mean', 'm2', 'min', 'max', 'sketch')
+
+    def __init__(self, k):
+        self.k = k
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = None
+        self.max = None
+        self.sketch = []
+
+
+def _compact(sketch, size):
+    """ Halves a sketch of [value, weight] by merging neighbouring values. """
+    sketch.sort()
+    merged = []
+    for i in range(0, len(sketch) - 1, 2):
+        (v1, w1), (v2, w2) = sketch[i], sketch[i + 1]
+        merged.append([(v1 * w1 + v2 * w2) / float(w1 + w2), w1 + w2])
+    if len(sketch) % 2:
+        merged.append(sketch[-1])
+    sketch[:] = merged
+
+
+def _sketch_quantile(sketch, count, lo, hi, p):
+    """ Returns the p quantile of a sorted sketch of [value, weight], with
+        each value standing at the middle rank of its weight, and the
+        minimum and maximum at the ends.
+    """
+    if not count:
+        return None
+    pos = p * (count - 1)
+    prev_rank, prev_value = 0., lo
+    before = 0
+    for v, w in sketch:
+        rank = before + (w - 1) / 2.
+        if pos <= rank:
+            if rank == prev_rank:
+                return v
+            return prev_value + (pos - prev_rank) * (v - prev_value) / (
+                rank - prev_rank)
+        prev_rank, prev_value = rank, v
+        before += w
+    last = count - 1.
+    if last == prev_rank:
+        return hi
+    return prev_value + (pos - prev_rank) * (hi - prev_value) / (
+        last - prev_rank)
+
+
+class WindowStats(object):
+    """ Statistics of the values added in the last window of time.
+        Parameters:
+            window - Length of the window, in the units of the times given to
+                     add (ms for RollingAggregator).
+            quantiles - Quantiles to report, between 0 and 1.
+            buckets - Number of buckets the window is split into.
+            sketch_size - Number of values each bucket keeps for quantiles
+                          (up to twice that between compactions). Quantiles
+                          are exact while no bucket holds more values.
+
+        Values are expected in time order. A value older than the latest one
+        is counted as if it came at the latest time.
+    """
+    __slots__ = ('window', 'quantiles', 'width', 'sketch_size', '_buckets',
+                 '_last')
+
+    def __init__(self, window, quantiles=(0.5,), buckets=32, sketch_size=64):
+        self.window = window
+        self.quantiles = tuple(quantiles)
+        self.width = window / float(buckets)
+        self.sketch_size = sketch_size
+        self._buckets = collections.deque()
+        self._last = None
+
+    def add(self, t, x):
+        if self._last is not None and t < self._last:
+            t = self._last
+        self._last = t
+        self.expire(t)
+
+        k = int(t // self.width)
+        buckets = self._buckets
+        if not buckets or buckets[-1].k != k:
+            buckets.append(_Bucket(k))
+        b = buckets[-1]
+        b.count += 1
+        d = x - b.mean
+        b.mean += d / b.count
+        b.m2 += d * (x - b.mean)
+        if b.min is None or x < b.min:
+            b.min = x
+        if b.max is None or x > b.max:
+            b.max = x
+        b.sketch.append([x, 1])
+        if len(b.sketch) >= 2 * self.sketch_size:
+            _compact(b.sketch, self.sketch_size)
+
+    def expire(self, now):
+        """ Drops the buckets that end at or before now - window. """
+        start = now - self.window
+        buckets = self._buckets
+        while buckets and (buckets[0].k + 1) * self.width <= start:
+            buckets.popleft()
+
+    @property
+    def count(self):
+        return sum(b.count for b in self._buckets)
+
+    def _moments(self):
+        """ Returns the count, mean and sum of squared deviations of the
+            buckets merged (Chan et al.).
+        """
+        count, mean, m2 = 0, 0., 0.
+        for b in self._buckets:
+            n = count + b.count
+            d = b.mean - mean
+            mean += d * b.count / n
+            m2 += b.m2 + d * d * count * b.count / n
+            count = n
+        return count, mean, m2
+
+    @property
+    def mean(self):
+        return self._moments()[1]
+
+    @property
+    def min(self):
+        return min(b.min for b in self._buckets) if self._buckets else None
+
+    @property
+    def max(self):
+        return max(b.max for b in self._buckets) if self._buckets else None
+
+    @property
+    def variance(self):
+        """ Sample variance, or None if fewer than two values. """
+        count, mean, m2 = self._moments()
+        if count < 2:
+            return None
+        return m2 / (count - 1)
+
+    def quantile(self, p):
+        sketch = sorted(item for b in self._buckets for item in b.sketch)
+        return _sketch_quantile(sketch, self.count, self.min, self.max, p)
+
+    def summary(self):
+        """ Returns a dict of count, mean, std, min, max and the quantiles
+            (keyed by their value).
+        """
+        return _summary(self, self.quantiles)
+
+
+def _summary(stats, quantiles):
+    variance = stats.variance
+    summary = {'count': stats.count,
+               'mean': stats.mean if stats.count else None,
+               'std': None if variance is None else math.sqrt(variance),
+               'min': stats.min,
+               'max': stats.max}
+    for p in quantiles:
+        summary[p] = stats.quantile(p)
+    return summary
+
+
+class RollingAggregator(object):
+    """ Statistics of METER quantities for each relay.
+        Parameters:
+            fields - Names of the numeric fields to follow, such as 'IA_MAG'
+                     or 'FREQ'. Fields a relay type does not have, and blank
+                     values, are skipped.
+            windows - Lengths of the sliding windows, in seconds. None stands
+                      for the whole stream.
+            quantiles - Quantiles to report, between 0 and 1.
+
+        Readings are grouped by their RID.
+    """
+    def __init__(self, fields, windows=(None,), quantiles=(0.5,)):
+        self.fields = tuple(fields)
+        self.windows = tuple(windows)
+        self.quantiles = tuple(quantiles)
+        self._relays = {}
+
+    def _new_stats(self, window):
+        if window is None:
+            return RunningStats(self.quantiles)
+        return WindowStats(int(window * 1000), self.quantiles)
+
+    def add(self, reading):
+        """ Adds a MeterReading (or met.data dict). """
+        rid = reading['RID']
+        relay = self._relays.get(rid)
+        if relay is None:
+            relay = self._relays[rid] = dict(
+                (window, dict((f, self._new_stats(window))
+                              for f in self.fields))
+                for window in self.windows)
+        t = None
+        for window, stats in relay.items():
+            if window is not None and t is None:
+                t = _timestamp_ms(reading)
+            for f, s in stats.items():
+                x = reading.get(f)
+                if x is None or x != x:
+                    if window is not None:
+                        s.expire(t)
+                    continue
+                if window is None:
+                    s.add(x)
+                else:
+                    s.add(t, x)
+
+    def extend(self, readings):
+        for reading in readings:
+            self.add(reading)
+
+    def relays(self):
+        """ Returns a sorted list of the RIDs seen. """
+        return sorted(self._relays)
+
+    def stats(self, rid, window=None, field=None):
+        """ Returns the RunningStats or WindowStats of one relay, window and
+            field, or a dict of them keyed by field if field is None.
+        """
+        stats = self._relays[rid][window]
+        return stats if field is None else stats[field]
+
+    def summary(self, rid=None):
+        """ Returns the statistics as nested dicts,
+            summary[rid][window][field] = {'count': ..., 'mean': ..., ...}, for
+            one relay (without the rid level) or for all relays.
+        """
+        if rid is not None:
+            return dict((window, dict((f, s.summary())
+                                      for f, s in stats.items()))
+                        for window, stats in self._relays[rid].items())
+        return dict((rid, self.summary(rid)) for rid in self._relays)
+
+
+def _timestamp_ms(reading):
+    try:
+        stamp = reading.timestamp
+    except AttributeError:
+        #  A met.data dict
+        stamp = parse_timestamp(reading['DATE'], reading['TIME'])
+    return int(stamp.astype(np.int64))
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
-import text_data_cards as tdc
 import math
 import cmath
 
+from . import instrument
+from .layout import LayoutView
+from .reading import derived_rules, reading_class
+from .registry import register_meter_layout, meter_layout
+
 
 def _mag_ang_to_complex(q, d):
     """ Combines magnitude and angle of quantity to a complex number and adds
@@ -27,307 +31,287 @@ def _strip_string(q, d):
     d[q] = d[q].strip()
 
 
-class RelaySEL311C:
-    """ Class for SEL-311C relay types. """
-    def __init__(self):
-        cl = [tdc.DataCard('A30, A10, A8, A10, A12',
-                           ['RID', '    Date: ', 'DATE', '    Time: ', 'TIME'],
-                           fixed_fields=(1, 3)),
-              tdc.DataCard('A30',
-                           ['TID']),
-              tdc.DataCardFixedText('                 A         B         C   '
-                                    '      P         G'),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3, F10.3',
-                           ['I MAG (A)   ', 'IA_MAG', 'IB_MAG', 'IC_MAG',
-                            'IP_MAG', 'IG_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F10.2, F10.2, F10.2, F10.2, F10.2',
-                           ['I ANG (DEG)', 'IA_ANG', 'IB_ANG', 'IC_ANG',
-                            'IP_ANG', 'IG_ANG'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                 A         B         C   '
-                                    '      S'),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3',
-                           ['V MAG (KV)  ', 'VA_MAG', 'VB_MAG', 'VC_MAG',
-                            'VS_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F10.2, F10.2, F10.2, F10.2',
-                           ['V ANG (DEG)', 'VA_ANG', 'VB_ANG', 'VC_ANG',
-                            'VS_ANG'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                 A         B         C   '
-                                    '      3P'),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3',
-                           ['MW          ', 'MW_A', 'MW_B', 'MW_C', 'MW_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3',
-                           ['MVAR        ', 'MVAR_A', 'MVAR_B', 'MVAR_C',
-                            'MVAR_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3',
-                           ['PF          ', 'PF_A', 'PF_B', 'PF_C', 'PF_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, A10, A10, A10, A10',
-                           ['            ', 'PF_LEADLAG_A', 'PF_LEADLAG_B',
-                            'PF_LEADLAG_C', 'PF_LEADLAG_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                 I1       3I2       3I0  '
-                                    '      V1        V2       3V0'),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3, F10.3, F10.3',
-                           ['MAG         ', 'I1_MAG', '3I2_MAG', '3I0_MAG',
-                            'V1_MAG', 'V2_MAG', '3V0_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F10.2, F10.2, F10.2, F10.2, F10.2, F10.2',
-                           ['ANG   (DEG)', 'I1_ANG', '3I2_ANG', '3I0_ANG',
-                            'V1_ANG', 'V2_ANG', '3V0_ANG'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCard('A12, F8.2, A24, F10.1',
-                           ['FREQ (Hz)   ', 'FREQ',
-                            '                VDC (V) ', 'VDC'],
-                           fixed_fields=(0, 2))
-              ]
-        self.met = tdc.DataCardStack(cl,
-                                     post_read_hook=self._met_post_read_hook)
-
-    @staticmethod
-    def _met_post_read_hook(met_card):
-        #  Populate V0, I2, and I0 from 3V0, 3I2, and 3I0
-        #  This will help provide a standardized interface among different
-        #  relays that may vary in whether they provide V0 or 3V0, etc.
-        met_card.data['V0_MAG'] = met_card.data['3V0_MAG'] / 3.
-        met_card.data['V0_ANG'] = met_card.data['3V0_ANG']
-        met_card.data['I2_MAG'] = met_card.data['3I2_MAG'] / 3.
-        met_card.data['I2_ANG'] = met_card.data['3I2_ANG']
-        met_card.data['I0_MAG'] = met_card.data['3I0_MAG'] / 3.
-        met_card.data['I0_ANG'] = met_card.data['3I0_ANG']
-
-        #  Add complex quantities to data dict. This will be a convenience for
-        #  functions that use this class as the basis for computations.
-        quantities = ['IA', 'IB', 'IC', 'IP', 'IG',
-                      'VA', 'VB', 'VC', 'VS',
-                      'V1', 'V2', '3V0', 'I1', '3I2', '3I0',
-                      'V0', 'I2', 'I0']
-
-        for q in quantities:
-            _mag_ang_to_complex(q, met_card.data)
-
-        for ph in ['A', 'B', 'C', '3P']:
-            met_card.data['S_' + ph] = complex(met_card.data['MW_' + ph],
-                                               met_card.data['MVAR_' + ph])
-
-        # Trim whitespace from lead/lag
-        for ph in ['A', 'B', 'C', '3P']:
-            _strip_string('PF_LEADLAG_' + ph, met_card.data)
+def _met_post_read(relay, d):
+    """ Adds the quantities derived from the raw METER fields to the dict.
+        Parameters:
+            relay - Relay class whose _met_rules give the quantities to
+                    derive.
+            d - Dict of quantities read from the METER output.
+    """
+    for name, rule in relay._met_rules:
+        d[name] = rule(d)
 
-        # Trim whitespace from RID and TID
-        _strip_string('RID', met_card.data)
-        _strip_string('TID', met_card.data)
+    # Trim whitespace from lead/lag, RID and TID
+    for q in relay._met_strings:
+        _strip_string(q, d)
 
 
-class RelaySEL351Delta:
-    """ Class for SEL-351 relay type with delta PTs. """
+class _MeterRelay(object):
+    """ Base class for relay types with METER output. Subclasses are made by
+        meter_relay_class from a registered METER layout, which gives their
+        _met_* class attributes, and have a MeterReading subclass in
+        _met_reading.
+    """
     def __init__(self):
-        cl = [tdc.DataCard('A30, A10, A8, A10, A12',
-                           ['RID', '    Date: ', 'DATE', '    Time: ', 'TIME'],
-                           fixed_fields=(1, 3)),
-              tdc.DataCard('A30',
-                           ['TID']),
-              tdc.DataCardFixedText('                 A         B         C   '
-                                    '      N         G'),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3, F10.3',
-                           ['I MAG (A)   ', 'IA_MAG', 'IB_MAG', 'IC_MAG',
-                            'IN_MAG', 'IG_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F10.2, F10.2, F10.2, F10.2, F10.2',
-                           ['I ANG (DEG)', 'IA_ANG', 'IB_ANG', 'IC_ANG',
-                            'IN_ANG', 'IG_ANG'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                 AB        BC        CA   '
-                                    '     S'),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3',
-                           ['V MAG (KV)  ', 'VAB_MAG', 'VBC_MAG', 'VCA_MAG',
-                            'VS_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F10.2, F10.2, F10.2, F10.2',
-                           ['V ANG (DEG)', 'VAB_ANG', 'VBC_ANG', 'VCA_ANG',
-                            'VS_ANG'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                 3P'),
-              tdc.DataCard('A12, F10.3',
-                           ['MW          ', 'MW_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, F10.3',
-                           ['MVAR        ', 'MVAR_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, F10.3',
-                           ['PF          ', 'PF_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, A10',
-                           ['            ', 'PF_LEADLAG_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                 I1       3I2       3I0  '
-                                    '      V1        V2'),
-              tdc.DataCard('A12, F10.3, F10.3, F10.3, F10.3, F10.3',
-                           ['MAG         ', 'I1_MAG', '3I2_MAG', '3I0_MAG',
-                            'V1_MAG', 'V2_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F10.2, F10.2, F10.2, F10.2, F10.2, F10.2',
-                           ['ANG   (DEG)', 'I1_ANG', '3I2_ANG', '3I0_ANG',
-                            'V1_ANG', 'V2_ANG', '3V0_ANG'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCard('A12, F8.2, A24, F10.1',
-                           ['FREQ (Hz)   ', 'FREQ',
-                            '                VDC (V) ', 'VDC'],
-                           fixed_fields=(0, 2))
-              ]
-        self.met = tdc.DataCardStack(cl,
-                                     post_read_hook=self._met_post_read_hook)
+        self.met = LayoutView(self._met_template,
+                              post_read_hook=self._met_post_read_hook,
+                              name=type(self).__name__)
 
-    @staticmethod
-    def _met_post_read_hook(met_card):
-        #  Populate V0, I2, and I0 from 3V0, 3I2, and 3I0
-        #  This will help provide a standardized interface among different
-        #  relays that may vary in whether they provide V0 or 3V0, etc.
-        met_card.data['I2_MAG'] = met_card.data['3I2_MAG'] / 3.
-        met_card.data['I2_ANG'] = met_card.data['3I2_ANG']
-        met_card.data['I0_MAG'] = met_card.data['3I0_MAG'] / 3.
-        met_card.data['I0_ANG'] = met_card.data['3I0_ANG']
+    @classmethod
+    def _met_post_read_hook(cls, met_card):
+        _met_post_read(cls, met_card.data)
 
-        #  Add complex quantities to data dict. This will be a convenience for
-        #  functions that use this class as the basis for computations.
-        quantities = ['IA', 'IB', 'IC', 'IN', 'IG',
-                      'VAB', 'VBC', 'VCA', 'VS',
-                      'V1', 'V2', 'I1', '3I2', '3I0',
-                      'I2', 'I0']
+    @classmethod
+    def parse_met(cls, lines):
+        """ Parses METER output into a new MeterReading.
+            Parameters:
+                lines - List of lines of METER output.
 
-        for q in quantities:
-            _mag_ang_to_complex(q, met_card.data)
+            Unlike met.read, no state is kept between calls, so a single
+            relay class or object may be used to parse from many threads at
+            once. Raises ValueError if the lines do not match the layout.
+        """
+        if instrument.active is not None:
+            return instrument.active.timed_parse(cls, lines)
+        return cls._met_reading.from_values(
+            cls._met_template.parse_values(lines))
 
-        met_card.data['S_3P'] = complex(met_card.data['MW_3P'],
-                                        met_card.data['MVAR_3P'])
 
-        # Trim whitespace from lead/lag
-        _strip_string('PF_LEADLAG_3P', met_card.data)
+_meter_relays = {}
 
-        # Trim whitespace from RID and TID
-        _strip_string('RID', met_card.data)
-        _strip_string('TID', met_card.data)
 
-class RelaySEL421:
-    """ Class for SEL-421 relay types. """
-    def __init__(self):
-        cl = [tdc.DataCard('A40, A9, A10, A8, A12',
-                           ['RID', '   Date: ', 'DATE', '  Time: ', 'TIME'],
-                           fixed_fields=(1, 3)),
-              tdc.DataCard('A40, A18, A10',
-                           ['TID', '   Serial Number: ', 'S_N'],
-                           fixed_fields=(1,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                      Phase Currents'),
-              tdc.DataCardFixedText('                 IA        IB        IC'),
-              tdc.DataCard('A13, F10.3, F10.3, F10.3',
-                           ['I MAG (A)    ', 'IA_MAG', 'IB_MAG', 'IC_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, F10.2, F10.2, F10.2',
-                           ['I ANG (DEG) ', 'IA_ANG', 'IB_ANG', 'IC_ANG'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                      Phase Voltages      '
-                                    '          Phase-Phase Voltages'),
-              tdc.DataCardFixedText('                 VA        VB        VC   '
-                                    '        VAB       VBC       VCA'),
-              tdc.DataCard('A13, F10.3, F10.3, F10.3, A3, F10.3, F10.3, F10.3',
-                           ['V MAG (kV)   ', 'VA_MAG', 'VB_MAG', 'VC_MAG',
-                            '   ', 'VAB_MAG', 'VBC_MAG', 'VCA_MAG'],
-                           fixed_fields=(0, 4)),
-              tdc.DataCard('A12, F10.2, F10.2, F10.2, A3, F10.2, F10.2, F10.2',
-                           ['V ANG (DEG) ', 'VA_ANG', 'VB_ANG', 'VC_ANG',
-                            '   ', 'VAB_ANG', 'VBC_ANG', 'VCA_ANG'],
-                           fixed_fields=(0, 4)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                    Sequence Currents (A) '
-                                    '         Sequence Voltages (kV)'),
-              tdc.DataCardFixedText('                  I1        3I2       3I0 '
-                                    '        V1        3V2       3V0'),
-              tdc.DataCard('A13, F10.3, F10.3, F10.3, A2, F10.3, F10.3, F10.3',
-                           ['MAG          ', 'I1_MAG', '3I2_MAG', '3I0_MAG',
-                            '  ', 'V1_MAG', '3V2_MAG', '3V0_MAG'],
-                           fixed_fields=(0, 4)),
-              tdc.DataCard('A12, F10.2, F10.2, F10.2, A2, F10.2, F10.2, F10.2',
-                           ['ANG (DEG)   ', 'I1_ANG', '3I2_ANG', '3I0_ANG',
-                            '  ', 'V1_ANG', '3V2_ANG', '3V0_ANG'],
-                           fixed_fields=(0, 4)),
-              tdc.DataCardFixedText(''),
-              tdc.DataCardFixedText('                   A           B          '
-                                    ' C             3P'),
-              tdc.DataCard('A11, F12.2, F12.2, F12.2, F15.2',
-                           ['P (MW)     ', 'MW_A', 'MW_B', 'MW_C', 'MW_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F12.2, F12.2, F12.2, F15.2',
-                           ['Q (MVAR)   ', 'MVAR_A', 'MVAR_B', 'MVAR_C',
-                            'MVAR_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, F12.2, F12.2, F12.2, F15.2',
-                           ['S (MVA)    ', 'S_A_MAG', 'S_B_MAG', 'S_C_MAG',
-                            'S_3P_MAG'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A12, F11.2, F12.2, F12.2, F15.2',
-                           ['POWER FACTOR', 'PF_A', 'PF_B', 'PF_C', 'PF_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCard('A11, A12, A12, A12, A15',
-                           ['           ', 'PF_LEADLAG_A', 'PF_LEADLAG_B',
-                            'PF_LEADLAG_C', 'PF_LEADLAG_3P'],
-                           fixed_fields=(0,)),
-              tdc.DataCardFixedText(''),
+def meter_relay_class(name):
+    """ Returns the relay class for a METER layout registered with
+        register_meter_layout, creating it the first time.
 
-              tdc.DataCard('A12, F9.2, A14, F9.2',
-                           ['FREQ (Hz)   ', 'FREQ',
-                            '       VDC1(V)', 'VDC1'],
-                           fixed_fields=(0, 2))
-              ]
-        self.met = tdc.DataCardStack(cl,
-                                     post_read_hook=self._met_post_read_hook)
+        The class is also set as an attribute of this module, if that name
+        is free, so that readings of it can be pickled.
+    """
+    try:
+        return _meter_relays[name]
+    except KeyError:
+        pass
+    entry = meter_layout(name)
+    relay = type(name, (_MeterRelay,),
+                 {'__doc__': entry.doc,
+                  '__module__': __name__,
+                  '_met_layout': entry.layout,
+                  '_met_template': entry.template,
+                  '_met_sequence': list(entry.sequence),
+                  '_met_quantities': list(entry.quantities),
+                  '_met_power_phases': list(entry.power_phases),
+                  '_met_strings': list(entry.strings)})
+    relay._met_rules = tuple(derived_rules(relay))
+    relay._met_reading = reading_class(relay)
+    _meter_relays[name] = relay
+    globals().setdefault(name, relay)
+    return relay
 
-    @staticmethod
-    def _met_post_read_hook(met_card):
-        #  Populate V0, I2, and I0 from 3V0, 3I2, and 3I0
-        #  This will help provide a standardized interface among different
-        #  relays that may vary in whether they provide V0 or 3V0, etc.
-        met_card.data['V2_MAG'] = met_card.data['3V2_MAG'] / 3.
-        met_card.data['V2_ANG'] = met_card.data['3V2_ANG']
-        met_card.data['V0_MAG'] = met_card.data['3V0_MAG'] / 3.
-        met_card.data['V0_ANG'] = met_card.data['3V0_ANG']
-        met_card.data['I2_MAG'] = met_card.data['3I2_MAG'] / 3.
-        met_card.data['I2_ANG'] = met_card.data['3I2_ANG']
-        met_card.data['I0_MAG'] = met_card.data['3I0_MAG'] / 3.
-        met_card.data['I0_ANG'] = met_card.data['3I0_ANG']
 
-        #  Add complex quantities to data dict. This will be a convenience for
-        #  functions that use this class as the basis for computations.
-        quantities = ['IA', 'IB', 'IC',
-                      'VA', 'VB', 'VC', 'VAB', 'VBC', 'VCA',
-                      'I1', '3I2', '3I0', 'V1', '3V2', '3V0',
-                      'V2', 'V0', 'I2', 'I0']
+register_meter_layout(
+    'RelaySEL311C',
+    doc=""" Class for SEL-311C relay types. """,
+    layout=[
+        ('A30, A10, A8, A10, A12',
+         ['RID', '    Date: ', 'DATE', '    Time: ', 'TIME'],
+         (1, 3)),
+        ('A30',
+         ['TID'],
+         ()),
+        '                 A         B         C         P         G',
+        ('A12, F10.3, F10.3, F10.3, F10.3, F10.3',
+         ['I MAG (A)   ', 'IA_MAG', 'IB_MAG', 'IC_MAG', 'IP_MAG', 'IG_MAG'],
+         (0,)),
+        ('A11, F10.2, F10.2, F10.2, F10.2, F10.2',
+         ['I ANG (DEG)', 'IA_ANG', 'IB_ANG', 'IC_ANG', 'IP_ANG', 'IG_ANG'],
+         (0,)),
+        '',
+        '                 A         B         C         S',
+        ('A12, F10.3, F10.3, F10.3, F10.3',
+         ['V MAG (KV)  ', 'VA_MAG', 'VB_MAG', 'VC_MAG', 'VS_MAG'],
+         (0,)),
+        ('A11, F10.2, F10.2, F10.2, F10.2',
+         ['V ANG (DEG)', 'VA_ANG', 'VB_ANG', 'VC_ANG', 'VS_ANG'],
+         (0,)),
+        '',
+        '                 A         B         C         3P',
+        ('A12, F10.3, F10.3, F10.3, F10.3',
+         ['MW          ', 'MW_A', 'MW_B', 'MW_C', 'MW_3P'],
+         (0,)),
+        ('A12, F10.3, F10.3, F10.3, F10.3',
+         ['MVAR        ', 'MVAR_A', 'MVAR_B', 'MVAR_C', 'MVAR_3P'],
+         (0,)),
+        ('A12, F10.3, F10.3, F10.3, F10.3',
+         ['PF          ', 'PF_A', 'PF_B', 'PF_C', 'PF_3P'],
+         (0,)),
+        ('A12, A10, A10, A10, A10',
+         ['            ', 'PF_LEADLAG_A', 'PF_LEADLAG_B', 'PF_LEADLAG_C',
+          'PF_LEADLAG_3P'],
+         (0,)),
+        '',
+        '                 I1       3I2       3I0        V1        V2      '
+        ' 3V0',
+        ('A12, F10.3, F10.3, F10.3, F10.3, F10.3, F10.3',
+         ['MAG         ', 'I1_MAG', '3I2_MAG', '3I0_MAG', 'V1_MAG', 'V2_MAG',
+          '3V0_MAG'],
+         (0,)),
+        ('A11, F10.2, F10.2, F10.2, F10.2, F10.2, F10.2',
+         ['ANG   (DEG)', 'I1_ANG', '3I2_ANG', '3I0_ANG', 'V1_ANG', 'V2_ANG',
+          '3V0_ANG'],
+         (0,)),
+        '',
+        ('A12, F8.2, A24, F10.1',
+         ['FREQ (Hz)   ', 'FREQ', '                VDC (V) ', 'VDC'],
+         (0, 2))
+        ],
+    sequence=['V0', 'I2', 'I0'],
+    quantities=['IA', 'IB', 'IC', 'IP', 'IG',
+                'VA', 'VB', 'VC', 'VS',
+                'V1', 'V2', '3V0', 'I1', '3I2', '3I0',
+                'V0', 'I2', 'I0'],
+    power_phases=['A', 'B', 'C', '3P'],
+    strings=['PF_LEADLAG_A', 'PF_LEADLAG_B', 'PF_LEADLAG_C',
+             'PF_LEADLAG_3P', 'RID', 'TID'])
+RelaySEL311C = meter_relay_class('RelaySEL311C')
 
-        for q in quantities:
-            _mag_ang_to_complex(q, met_card.data)
 
-        for ph in ['A', 'B', 'C', '3P']:
-            met_card.data['S_' + ph] = complex(met_card.data['MW_' + ph],
-                                               met_card.data['MVAR_' + ph])
+register_meter_layout(
+    'RelaySEL351Delta',
+    doc=""" Class for SEL-351 relay type with delta PTs. """,
+    layout=[
+        ('A30, A10, A8, A10, A12',
+         ['RID', '    Date: ', 'DATE', '    Time: ', 'TIME'],
+         (1, 3)),
+        ('A30',
+         ['TID'],
+         ()),
+        '                 A         B         C         N         G',
+        ('A12, F10.3, F10.3, F10.3, F10.3, F10.3',
+         ['I MAG (A)   ', 'IA_MAG', 'IB_MAG', 'IC_MAG', 'IN_MAG', 'IG_MAG'],
+         (0,)),
+        ('A11, F10.2, F10.2, F10.2, F10.2, F10.2',
+         ['I ANG (DEG)', 'IA_ANG', 'IB_ANG', 'IC_ANG', 'IN_ANG', 'IG_ANG'],
+         (0,)),
+        '',
+        '                 AB        BC        CA        S',
+        ('A12, F10.3, F10.3, F10.3, F10.3',
+         ['V MAG (KV)  ', 'VAB_MAG', 'VBC_MAG', 'VCA_MAG', 'VS_MAG'],
+         (0,)),
+        ('A11, F10.2, F10.2, F10.2, F10.2',
+         ['V ANG (DEG)', 'VAB_ANG', 'VBC_ANG', 'VCA_ANG', 'VS_ANG'],
+         (0,)),
+        '',
+        '                 3P',
+        ('A12, F10.3',
+         ['MW          ', 'MW_3P'],
+         (0,)),
+        ('A12, F10.3',
+         ['MVAR        ', 'MVAR_3P'],
+         (0,)),
+        ('A12, F10.3',
+         ['PF          ', 'PF_3P'],
+         (0,)),
+        ('A12, A10',
+         ['            ', 'PF_LEADLAG_3P'],
+         (0,)),
+        '',
+        '                 I1       3I2       3I0        V1        V2',
+        ('A12, F10.3, F10.3, F10.3, F10.3, F10.3',
+         ['MAG         ', 'I1_MAG', '3I2_MAG', '3I0_MAG', 'V1_MAG', 'V2_MAG'],
+         (0,)),
+        ('A11, F10.2, F10.2, F10.2, F10.2, F10.2, F10.2',
+         ['ANG   (DEG)', 'I1_ANG', '3I2_ANG', '3I0_ANG', 'V1_ANG', 'V2_ANG',
+          '3V0_ANG'],
+         (0,)),
+        '',
+        ('A12, F8.2, A24, F10.1',
+         ['FREQ (Hz)   ', 'FREQ', '                VDC (V) ', 'VDC'],
+         (0, 2))
+        ],
+    sequence=['I2', 'I0'],
+    quantities=['IA', 'IB', 'IC', 'IN', 'IG',
+                'VAB', 'VBC', 'VCA', 'VS',
+                'V1', 'V2', 'I1', '3I2', '3I0',
+                'I2', 'I0'],
+    power_phases=['3P'],
+    strings=['PF_LEADLAG_3P', 'RID', 'TID'])
+RelaySEL351Delta = meter_relay_class('RelaySEL351Delta')
 
-        # Trim whitespace from lead/lag
-        for ph in ['A', 'B', 'C', '3P']:
-            _strip_string('PF_LEADLAG_' + ph, met_card.data)
 
-        # Trim whitespace from RID and TID
-        _strip_string('RID', met_card.data)
-        _strip_string('TID', met_card.data)
+register_meter_layout(
+    'RelaySEL421',
+    doc=""" Class for SEL-421 relay types. """,
+    layout=[
+        ('A40, A9, A10, A8, A12',
+         ['RID', '   Date: ', 'DATE', '  Time: ', 'TIME'],
+         (1, 3)),
+        ('A40, A18, A10',
+         ['TID', '   Serial Number: ', 'S_N'],
+         (1,)),
+        '',
+        '                      Phase Currents',
+        '                 IA        IB        IC',
+        ('A13, F10.3, F10.3, F10.3',
+         ['I MAG (A)    ', 'IA_MAG', 'IB_MAG', 'IC_MAG'],
+         (0,)),
+        ('A12, F10.2, F10.2, F10.2',
+         ['I ANG (DEG) ', 'IA_ANG', 'IB_ANG', 'IC_ANG'],
+         (0,)),
+        '',
+        '                      Phase Voltages                Phase-Phase '
+        'Voltages',
+        '                 VA        VB        VC           VAB       VBC    '
+        '   VCA',
+        ('A13, F10.3, F10.3, F10.3, A3, F10.3, F10.3, F10.3',
+         ['V MAG (kV)   ', 'VA_MAG', 'VB_MAG', 'VC_MAG', '   ', 'VAB_MAG',
+          'VBC_MAG', 'VCA_MAG'],
+         (0, 4)),
+        ('A12, F10.2, F10.2, F10.2, A3, F10.2, F10.2, F10.2',
+         ['V ANG (DEG) ', 'VA_ANG', 'VB_ANG', 'VC_ANG', '   ', 'VAB_ANG',
+          'VBC_ANG', 'VCA_ANG'],
+         (0, 4)),
+        '',
+        '                    Sequence Currents (A)          Sequence Voltages '
+        '(kV)',
+        '                  I1        3I2       3I0         V1        3V2      '
+        ' 3V0',
+        ('A13, F10.3, F10.3, F10.3, A2, F10.3, F10.3, F10.3',
+         ['MAG          ', 'I1_MAG', '3I2_MAG', '3I0_MAG', '  ', 'V1_MAG',
+          '3V2_MAG', '3V0_MAG'],
+         (0, 4)),
+        ('A12, F10.2, F10.2, F10.2, A2, F10.2, F10.2, F10.2',
+         ['ANG (DEG)   ', 'I1_ANG', '3I2_ANG', '3I0_ANG', '  ', 'V1_ANG',
+          '3V2_ANG', '3V0_ANG'],
+         (0, 4)),
+        '',
+        '                   A           B           C             3P',
+        ('A11, F12.2, F12.2, F12.2, F15.2',
+         ['P (MW)     ', 'MW_A', 'MW_B', 'MW_C', 'MW_3P'],
+         (0,)),
+        ('A11, F12.2, F12.2, F12.2, F15.2',
+         ['Q (MVAR)   ', 'MVAR_A', 'MVAR_B', 'MVAR_C', 'MVAR_3P'],
+         (0,)),
+        ('A11, F12.2, F12.2, F12.2, F15.2',
+         ['S (MVA)    ', 'S_A_MAG', 'S_B_MAG', 'S_C_MAG', 'S_3P_MAG'],
+         (0,)),
+        ('A12, F11.2, F12.2, F12.2, F15.2',
+         ['POWER FACTOR', 'PF_A', 'PF_B', 'PF_C', 'PF_3P'],
+         (0,)),
+        ('A11, A12, A12, A12, A15',
+         ['           ', 'PF_LEADLAG_A', 'PF_LEADLAG_B', 'PF_LEADLAG_C',
+          'PF_LEADLAG_3P'],
+         (0,)),
+        '',
+        ('A12, F9.2, A14, F9.2',
+         ['FREQ (Hz)   ', 'FREQ', '       VDC1(V)', 'VDC1'],
+         (0, 2))
+        ],
+    sequence=['V2', 'V0', 'I2', 'I0'],
+    quantities=['IA', 'IB', 'IC',
+                'VA', 'VB', 'VC', 'VAB', 'VBC', 'VCA',
+                'I1', '3I2', '3I0', 'V1', '3V2', '3V0',
+                'V2', 'V0', 'I2', 'I0'],
+    power_phases=['A', 'B', 'C', '3P'],
+    strings=['PF_LEADLAG_A', 'PF_LEADLAG_B', 'PF_LEADLAG_C',
+             'PF_LEADLAG_3P', 'RID', 'TID'])
+RelaySEL421 = meter_relay_class('RelaySEL421')
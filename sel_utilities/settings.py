@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+""" Parser of relay settings in communication logs.
+
+    A log of a terminal session with a relay holds the output of ID and SHO
+    commands. parse_settings reads it one line at a time, with one line of
+    lookahead, and yields the settings of each SHO command as soon as its
+    output ends, so only one settings section is held in memory however
+    long the log is.
+
+    The ID command output tells which relay the settings that follow are
+    for and how to parse them: SEL-4xx relays use := as the setting name and
+    value separator, other relays use =.
+
+    extract_settings parses many logs with a process pool and keeps the
+    latest capture of each group of each relay.
+"""
+
+import collections
+import errno
+import io
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .files import iter_files
+
+
+#  Prompt followed by a command
+_command = re.compile(r'=>?>? *(.+)', re.IGNORECASE)
+_id_command = re.compile(r'^ID.*', re.IGNORECASE)
+_sho_command = re.compile(r'^SHOW? +(\w+) *$', re.IGNORECASE)
+_id_line = re.compile(r'"(\w+)=(.+)",".+"')
+
+_unsafe_chars = re.compile('[^A-Za-z0-9 _-]')
+_relay_type = re.compile(r'(SEL-[0-9A-Z]+(-[0-9])?)-R')
+
+_multiline = re.compile(r'([0-9]+): (.+)')
+_ser_point = re.compile(r'(\w+),"(.+)","(.+)","(.+)",?(\w)?')
+_ser_names = ['SITM', 'SNAME', 'SSET', 'SCLR', 'SHMI']
+
+#  (heading, prefix, number of points) of multiline settings, in the order
+#  the headings are checked. Lists are filled up to the number of points.
+_ml_contexts = [(re.compile(r'^SER Points'), 'SER', 250),
+                (re.compile(r'^Event Reporting Digital'), 'ERDG', 800),
+                (re.compile(r'^Event Reporting Analog'), 'ERAQ', 20),
+                (re.compile(r'^Protection'), 'PROTSEL', 100),
+                (re.compile(r'^Automation'), 'AUTO_', 100),
+                (re.compile(r'^Signal Profile'), 'SPAQ', 20)]
+
+SettingsCapture = collections.namedtuple(
+    'SettingsCapture', ['relay_id', 'group', 'settings', 'path', 'mtime'])
+SettingsCapture.__doc__ = """ Settings of one SHO command in a log file.
+    Attributes:
+        relay_id, group, settings - As yielded by parse_settings.
+        path - Name of the log file.
+        mtime - Modification time of the log file.
+"""
+
+_sel4 = re.compile('SEL-4')
+_group = re.compile(r'(\w) *(\w)?')
+_group_number = re.compile(r'[1-6]')
+
+#  Simple settings lines hold one or more "NAME := value" (SEL-4xx) or
+#  "NAME = value" items. A line is one when it starts with an item, and each
+#  item starts at the start of the line or after whitespace.
+_simple_test = {':=': re.compile(r' *(\w+) *:=(.+)'),
+                '=': re.compile(r' *(\w+) *=(.+)')}
+_simple_names = {':=': re.compile(r'(?:^|(?<=\s)) *(\w+) *:='),
+                 '=': re.compile(r'(?:^|(?<=\s)) *(\w+) *=')}
+
+
+def apply_backspaces(line):
+    """ Returns a line (bytes or str) with the characters erased by
+        backspaces removed, in one pass. Backspaces with nothing left to
+        erase, at the start of the line, are kept.
+    """
+    bsp = b'\x08' if isinstance(line, bytes) else u'\x08'
+    if line.find(bsp) < 0:
+        return line
+    #  Stack of [text, number of characters of it left]. Each piece of the
+    #  line after the first follows a backspace.
+    chunks = []
+    unmatched = 0
+    for i, piece in enumerate(line.split(bsp)):
+        if i:
+            if not chunks:
+                unmatched += 1
+            elif chunks[-1][1] == 1:
+                chunks.pop()
+            else:
+                chunks[-1][1] -= 1
+        if piece:
+            chunks.append([piece, len(piece)])
+    return bsp * unmatched + line[:0].join(text[:n] for text, n in chunks)
+
+
+def sanitize_lines(lines):
+    """ Yields the lines of a log, bytes or str, with line continuations (a
+        trailing backslash) joined and backspaces applied.
+    """
+    lines = iter(lines)
+    for line in lines:
+        backslash = b'\\' if isinstance(line, bytes) else u'\\'
+        if line.find(backslash) < 0:
+            yield apply_backspaces(line)
+            continue
+        #  The line is the joined parts followed by line
+        parts = []
+        while True:
+            t = line.strip()
+            if parts and not t:
+                #  Nothing was added: go on from the text joined so far
+                line = line[:0].join(parts) + line
+                parts = []
+                t = line.strip()
+            if not t.endswith(backslash):
+                break
+            try:
+                following = next(lines)
+            except StopIteration:
+                break
+            parts.append(t[:-1])
+            line = following.strip()
+        if parts:
+            line = line[:0].join(parts) + line
+        yield apply_backspaces(line)
+
+
+class _Lookahead(object):
+    """ Iterator over lines that can peek at the next line. """
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._next = next(self._lines, None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._next is None:
+            raise StopIteration
+        line, self._next = self._next, next(self._lines, None)
+        return line
+
+    next = __next__
+
+    def peek(self):
+        """ Returns the next line, or None at the end. """
+        return self._next
+
+
+def get_command(line):
+    """ Returns the command of a line with a relay prompt, or None. """
+    m = _command.match(line)
+    return m.group(1) if m else None
+
+
+def setting_separator(fid):
+    """ Returns the setting separator of a relay from its FID. """
+    return ':=' if _sel4.match(fid) else '='
+
+
+def settings_group(text, fid):
+    """ Returns the name AcSELerator uses for a settings group from the
+        argument of a SHO command (such as '1' or 'L') and the FID of the
+        relay. SEL-4xx groups are named S1-S6, L1, etc.
+    """
+    group = list(_group.match(text).groups())
+    if _sel4.match(fid):
+        if _group_number.match(group[0]):
+            group[1] = group[0]
+            group[0] = 'S'
+        if not group[1]:
+            group[0] = group[0].upper()
+            group[1] = '1'
+    if group[1]:
+        return ''.join(group)
+    return group[0]
+
+
+def _read_id(lines):
+    """ Returns a dict of the ID command output that follows. """
+    id_data = []
+    while lines.peek() is not None:
+        m = _id_line.match(lines.peek())
+        if not m:
+            break
+        id_data.append(m.groups())
+        next(lines)
+    return dict(id_data)
+
+
+_blanks = {}
+
+
+def _fill(names, start, n_max):
+    """ Returns blank settings for points start to n_max of a list. """
+    key = (tuple(names), n_max)
+    if key not in _blanks:
+        _blanks[key] = [(name + '%d' % n, '') for n in range(1, n_max + 1)
+                        for name in names]
+    return _blanks[key][(start - 1) * len(names):]
+
+
+def simple_settings(line, sep):
+    """ Returns a list of (name, value) of the items of a simple settings
+        line with separator sep (':=' or '='). Quotes around values are
+        removed.
+    """
+    matches = list(_simple_names[sep].finditer(line))
+    ends = [m.start() for m in matches[1:]] + [len(line)]
+    return [(m.group(1), line[m.end():end].strip().strip('"'))
+            for m, end in zip(matches, ends)]
+
+
+def _read_settings(lines, fid):
+    """ Returns a list of (name, value) of the SHO command output that
+        follows, up to the next command.
+    """
+    settings = []
+    sep = setting_separator(fid)
+    simple_test = _simple_test[sep]
+    context = None
+    while lines.peek() is not None and not get_command(lines.peek()):
+        line = next(lines)
+        ml_match = _multiline.match(line)
+        if ml_match and context is not None:
+            heading, prefix, n_max = context
+            number, text = ml_match.groups()
+            if prefix == 'SER':
+                point = _ser_point.match(text).groups()
+                settings.extend(zip([s + number for s in _ser_names],
+                                    ['' if v is None else v for v in point]))
+                names = _ser_names
+            else:
+                settings.append((prefix + number, text.strip()))
+                names = [prefix]
+            #  Fill up the list at its end
+            if not _multiline.match(lines.peek() or ''):
+                settings.extend(_fill(names, int(number) + 1, n_max))
+        elif ml_match:
+            #  A numbered line outside of a multiline settings list
+            continue
+        elif simple_test.match(line):
+            context = None
+            settings.extend(simple_settings(line, sep))
+        else:
+            #  Heading of a multiline settings list
+            for ml_context in _ml_contexts:
+                if ml_context[0].match(line):
+                    context = ml_context
+                    break
+    return settings
+
+
+def parse_settings(lines):
+    """ Yields (relay ID, group, settings) for each SHO command in a log.
+        Parameters:
+            lines - Iterable of the lines of the log, such as a file.
+
+        The relay ID is the dict of the last ID command output ({'FID': ...,
+        'DEVID': ..., ...}), or None if there was none yet. The group is
+        named as AcSELerator names it (see settings_group) and the settings
+        are a list of (name, value).
+    """
+    lines = _Lookahead(sanitize_lines(lines))
+    relay_id = None
+    for line in lines:
+        cmd = get_command(line)
+        if not cmd:
+            continue
+        if _id_command.match(cmd):
+            relay_id = _read_id(lines)
+            continue
+        sho_match = _sho_command.match(cmd)
+        if sho_match:
+            fid = relay_id.get('FID', '') if relay_id else ''
+            group = settings_group(sho_match.group(1), fid)
+            yield relay_id, group, _read_settings(lines, fid)
+
+
+def read_settings_file(path):
+    """ Returns a list of SettingsCapture of the SHO commands in a log file.
+    """
+    mtime = os.path.getmtime(path)
+    with io.open(path, encoding='latin-1') as f:
+        return [SettingsCapture(relay_id, group, settings, path, mtime)
+                for relay_id, group, settings in parse_settings(f)]
+
+
+def settings_key(capture):
+    """ Returns the (DEVID, group) of a SettingsCapture. DEVID is None if
+        there was no ID command before the SHO command.
+    """
+    devid = capture.relay_id.get('DEVID') if capture.relay_id else None
+    return devid, capture.group
+
+
+def merge_settings(captures, merged=None):
+    """ Adds SettingsCapture objects to a dict of {(DEVID, group): capture}
+        (a new one by default), keeping the latest capture of each group, and
+        returns the dict. Captures are taken to be in time order within files
+        of the same modification time, and later files are more recent.
+    """
+    if merged is None:
+        merged = {}
+    for capture in captures:
+        key = settings_key(capture)
+        if key not in merged or capture.mtime >= merged[key].mtime:
+            merged[key] = capture
+    return merged
+
+
+def extract_settings(paths, max_workers=None, report=None):
+    """ Parses the settings in many log files with a process pool.
+        Parameters:
+            paths - List of file names, or the name of one file, or of a
+                    directory whose files are all parsed.
+            max_workers - Number of worker processes. Defaults to the number
+                          of processors.
+            report - Function called after each file with the number of
+                     files done so far and the elapsed time in seconds.
+
+        Returns the dict of merge_settings with the latest capture of each
+        group of each relay.
+    """
+    if isinstance(paths, str):
+        paths = list(iter_files(paths)) if os.path.isdir(paths) else [paths]
+    else:
+        paths = list(paths)
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    start = time.time()
+    merged = {}
+    chunksize = max(1, len(paths) // (4 * max_workers))
+    with ProcessPoolExecutor(max_workers) as pool:
+        for n, captures in enumerate(pool.map(read_settings_file, paths,
+                                              chunksize=chunksize)):
+            merge_settings(captures, merged)
+            if report is not None:
+                report(n + 1, time.time() - start)
+    return merged
+
+
+def export_settings(path, relay_id, group, settings):
+    """ Writes the settings of one group to a file for import into
+        AcSELerator, and returns the name of the file.
+        Parameters:
+            path - Directory to save to. The file is saved in a folder named
+                   after the DEVID of the relay, with characters that are not
+                   safe in file names replaced by '_'. The DEVID itself is
+                   written to the [INFO] section.
+            relay_id, group, settings - As yielded by parse_settings.
+
+        If a file for the group already exists, a number in parentheses is
+        added to the name of the new one.
+    """
+    if relay_id:
+        save_dir = os.path.join(path, _unsafe_chars.sub('_',
+                                                        relay_id['DEVID']))
+    else:
+        save_dir = os.path.join(path, 'NODEVID')
+    try:
+        os.makedirs(save_dir)
+    except OSError as exception:
+        if exception.errno != errno.EEXIST:
+            raise
+
+    save_file = os.path.join(save_dir, 'Set_' + group + '.txt')
+    ctr = 0
+    while os.path.isfile(save_file):
+        ctr += 1
+        save_file = os.path.join(save_dir, 'Set_' + group + ' (%d).txt' % ctr)
+
+    with open(save_file, 'w') as f:
+        f.write('[INFO]\n')
+        if relay_id:
+            fid = relay_id.get('FID', '')
+            m = _relay_type.match(fid)
+            f.write('RELAYTYPE=%s\n' % (m.group(1) if m else fid))
+            f.write('FID=%s\n' % fid)
+            f.write('BFID=%s\n' % relay_id.get('BFID', ''))
+            f.write('PARTNO=%s\n' % relay_id.get('PARTNO', ''))
+            f.write('DEVID=%s\n' % relay_id.get('DEVID', ''))
+        f.write('[%s]\n' % group)
+        for setting in settings:
+            f.write('%s,"%s"\n' % setting)
+    return save_file
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+""" Append-only on-disk store for parsed METER readings.
+
+    Readings are kept in one series per relay (RID and TID). Each series is a
+    directory holding one flat binary file per METER field, so a query reads
+    only the files of the fields asked for, through a memory map:
+
+        <store>/<series>/meta.json     RID, TID, relay type and field types
+        <store>/<series>/TIME.i8       timestamps (datetime64[ms] as int64)
+        <store>/<series>/<field>.bin   values of one field, one per reading
+        <store>/<series>/index.i8      timestamp of the first reading of
+                                       every block of block_size readings
+
+    The sparse index lets a time range query find the blocks it needs before
+    touching the TIME file, and only those blocks of each field file are then
+    read. Readings must be appended in time order within a series.
+
+    TIME.i8 is written after the field files, so its length is the number of
+    complete readings in the series. A series whose first append was
+    interrupted may have no TIME.i8 and is then empty, and an index left
+    short is rebuilt from TIME.i8.
+
+    Numeric fields may be compressed (see compression): only the values kept
+    are written to <field>.bin, with their reading numbers in
+    <field>.rows.i8, and a query reconstructs the values of every reading in
+    the range from the ones kept around it.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+from .compression import COMPRESSORS, compress, reconstruct
+from .timestamps import parse_timestamps
+
+
+_unsafe_chars = re.compile('[^A-Za-z0-9 _-]')
+_skip_fields = ('RID', 'TID', 'DATE', 'TIME')
+
+
+def _to_ms(t):
+    """ Converts a time (datetime, datetime64 or ISO string) to int64 ms. """
+    return np.datetime64(t, 'ms').astype(np.int64)
+
+
+def _read_range(path, dtype, lo, hi):
+    """ Reads items lo to hi of a binary file through a memory map. """
+    dtype = np.dtype(dtype)
+    if hi <= lo:
+        return np.zeros(0, dtype)
+    return np.array(np.memmap(path, dtype, 'r', offset=lo * dtype.itemsize,
+                              shape=(hi - lo,)))
+
+
+class MeterStore(object):
+    """ On-disk store of METER readings.
+        Parameters:
+            path - Directory of the store. It is created if needed.
+            block_size - Number of readings per block of the sparse time
+                         index, used when creating new series.
+            compression - Dict of {field: (method, threshold)} of the numeric
+                          fields to compress in new series, with method
+                          'deadband' or 'swinging_door'.
+            keyframe - Longest time, in seconds, between the values kept of
+                       a compressed field, used when creating new series.
+    """
+    def __init__(self, path, block_size=4096, compression=None,
+                 keyframe=None):
+        self.path = path
+        self.block_size = block_size
+        self.compression = dict(compression or {})
+        for name, (method, threshold) in self.compression.items():
+            if method not in COMPRESSORS:
+                raise ValueError('Unknown compression method %r for %s'
+                                 % (method, name))
+        self.keyframe = keyframe
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _series_path(self, rid, tid):
+        digest = hashlib.sha1((rid + '\0' + tid).encode('utf-8'))
+        return os.path.join(self.path, _unsafe_chars.sub('_', rid) + '_' +
+                            digest.hexdigest()[:10])
+
+    def _meta(self, series_path):
+        with open(os.path.join(series_path, 'meta.json')) as f:
+            return json.load(f)
+
+    def series(self):
+        """ Returns a list of the (RID, TID) of the series in the store. """
+        series = []
+        for name in sorted(os.listdir(self.path)):
+            series_path = os.path.join(self.path, name)
+            if os.path.isfile(os.path.join(series_path, 'meta.json')):
+                meta = self._meta(series_path)
+                series.append((meta['RID'], meta['TID']))
+        return series
+
+    def append(self, readings):
+        """ Appends MeterReading objects, of any relay types, to the store.
+        """
+        groups = {}
+        for r in readings:
+            groups.setdefault((r.relay, r['RID'], r['TID']), []).append(r)
+        for (relay, rid, tid), group in groups.items():
+            columns = {}
+            for f, dtype in self._field_types(relay):
+                if dtype.startswith('S'):
+                    columns[f] = [r[f] for r in group]
+                else:
+                    columns[f] = [np.nan if r[f] is None else r[f]
+                                  for r in group]
+            columns['DATE'] = [r['DATE'] for r in group]
+            columns['TIME'] = [r['TIME'] for r in group]
+            self._append_series(relay, rid, tid, columns)
+
+    def append_columns(self, relay, columns):
+        """ Appends readings of one relay type given as columns, such as the
+            output of read_met_batch.
+        """
+        groups = {}
+        for i, key in enumerate(zip(columns['RID'], columns['TID'])):
+            groups.setdefault(key, []).append(i)
+        for (rid, tid), rows in groups.items():
+            rows = np.array(rows)
+            self._append_series(relay, str(rid), str(tid),
+                                dict((f, np.asarray(c)[rows])
+                                     for f, c in columns.items()))
+
+    @staticmethod
+    def _field_types(relay):
+        """ Returns a list of (field, dtype) stored for a relay type. """
+        types = []
+        for name, line_no, start, stop, typ in relay._met_template.fields:
+            if name in _skip_fields:
+                continue
+            if typ == 'F':
+                types.append((name, '<f8'))
+            else:
+                types.append((name, 'S%d' % (stop - start)))
+        return types
+
+    def _append_series(self, relay, rid, tid, columns):
+        series_path = self._series_path(rid, tid)
+        stamps = parse_timestamps(columns['DATE'], columns['TIME'])
+        if np.isnat(stamps).any():
+            raise ValueError('%d readings for %s, %s have no timestamp'
+                             % (np.isnat(stamps).sum(), rid, tid))
+        stamps = stamps.astype(np.int64)
+        order = np.argsort(stamps, kind='mergesort')
+        stamps = stamps[order]
+
+        if os.path.isfile(os.path.join(series_path, 'meta.json')):
+            meta = self._meta(series_path)
+            if meta['relay'] != relay.__name__:
+                raise ValueError('Series %s, %s holds %s readings, not %s'
+                                 % (rid, tid, meta['relay'], relay.__name__))
+        else:
+            if not os.path.isdir(series_path):
+                os.makedirs(series_path)
+            fields = self._field_types(relay)
+            meta = {'RID': rid, 'TID': tid, 'relay': relay.__name__,
+                    'fields': fields,
+                    'block_size': self.block_size,
+                    'compression': dict(
+                        (name, list(self.compression[name]))
+                        for name, dtype in fields
+                        if name in self.compression and dtype == '<f8'),
+                    'keyframe': self.keyframe}
+            with open(os.path.join(series_path, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+
+        time_path = os.path.join(series_path, 'TIME.i8')
+        n_old = (os.path.getsize(time_path) // 8
+                 if os.path.exists(time_path) else 0)
+        if n_old:
+            last = np.memmap(time_path, '<i8', 'r', offset=8 * (n_old - 1),
+                             shape=(1,))[0]
+            if stamps[0] < last:
+                raise ValueError('Readings for %s, %s are older than the last '
+                                 'reading stored' % (rid, tid))
+
+        compression = meta.get('compression', {})
+        for name, dtype in meta['fields']:
+            path = os.path.join(series_path, name + '.bin')
+            values = np.asarray(columns[name])[order]
+            if name in compression:
+                self._append_compressed(series_path, name, compression[name],
+                                        meta['keyframe'], n_old, stamps,
+                                        values.astype(dtype))
+                continue
+            if dtype.startswith('S'):
+                values = np.char.encode(values.astype(str), 'latin-1')
+            values = values.astype(dtype)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                #  Drop anything past the last complete reading
+                f.truncate(n_old * values.dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                values.tofile(f)
+        with open(time_path, 'ab') as f:
+            stamps.astype('<i8').tofile(f)
+
+        self._append_index(series_path, meta['block_size'], n_old, stamps)
+
+    @staticmethod
+    def _append_compressed(series_path, name, rule, keyframe, n_old, stamps,
+                           values):
+        """ Appends the values kept of a compressed field. The last value
+            kept before is the anchor of the compression.
+        """
+        path = os.path.join(series_path, name + '.bin')
+        rows_path = os.path.join(series_path, name + '.rows.i8')
+        rows = (np.fromfile(rows_path, '<i8') if os.path.exists(rows_path)
+                else np.zeros(0, np.int64))
+        #  Values kept of complete readings
+        m = np.searchsorted(rows, n_old, 'left')
+        anchor = None
+        if m:
+            time_path = os.path.join(series_path, 'TIME.i8')
+            anchor = (np.memmap(time_path, '<i8', 'r', offset=8 * rows[m - 1],
+                                shape=(1,))[0],
+                      np.memmap(path, '<f8', 'r', offset=8 * (m - 1),
+                                shape=(1,))[0])
+        method, threshold = rule
+        keep = compress(stamps, values, method, threshold, keyframe, anchor)
+        for p, data, dtype in ((path, values[keep], '<f8'),
+                               (rows_path, n_old + np.flatnonzero(keep),
+                                '<i8')):
+            with open(p, 'r+b' if os.path.exists(p) else 'wb') as f:
+                f.truncate(8 * m)
+                f.seek(0, os.SEEK_END)
+                data.astype(dtype).tofile(f)
+
+    def _append_index(self, series_path, block_size, n_old, stamps):
+        """ Adds the timestamps of the new blocks to the sparse index. """
+        index_path = os.path.join(series_path, 'index.i8')
+        n_blocks = -(-n_old // block_size)
+        mode = 'r+b' if os.path.exists(index_path) else 'wb'
+        with open(index_path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() != 8 * n_blocks:
+                #  Rebuild an index left incomplete by an interrupted append
+                f.seek(0)
+                f.truncate()
+                if n_old:
+                    time_path = os.path.join(series_path, 'TIME.i8')
+                    np.array(np.memmap(time_path, '<i8', 'r', shape=(n_old,))
+                             [::block_size]).tofile(f)
+            rows = np.arange(n_blocks * block_size, n_old + len(stamps),
+                             block_size)
+            stamps[rows - n_old].astype('<i8').tofile(f)
+
+    def query(self, rid, tid, start=None, end=None, fields=None):
+        """ Returns the readings of one relay in a time range as columns.
+            Parameters:
+                rid, tid - RID and TID of the relay.
+                start, end - Time range (datetime, datetime64 or ISO string).
+                             Readings with start <= time < end are returned.
+                             Either may be None for an open range.
+                fields - List of fields to return. Defaults to all.
+
+            Returns a dict with a 'TIME' datetime64[ms] array and an array
+            for each field. Raises KeyError if the relay is not in the store.
+        """
+        series_path = self._series_path(rid, tid)
+        if not os.path.isdir(series_path):
+            raise KeyError((rid, tid))
+        meta = self._meta(series_path)
+        types = dict(meta['fields'])
+        if fields is None:
+            fields = [name for name, dtype in meta['fields']]
+
+        #  Find the blocks that may hold the range from the sparse index
+        time_path = os.path.join(series_path, 'TIME.i8')
+        n = (os.path.getsize(time_path) // 8
+             if os.path.exists(time_path) else 0)
+        block_size = meta['block_size']
+        index = self._read_index(series_path, block_size, n)
+        lo, hi = 0, n
+        if start is not None:
+            start = _to_ms(start)
+            lo = max(np.searchsorted(index, start, 'left') - 1, 0) * block_size
+        if end is not None:
+            end = _to_ms(end)
+            hi = min(np.searchsorted(index, end, 'left') * block_size, n)
+
+        #  Then the exact range within those blocks
+        stamps = _read_range(time_path, '<i8', lo, hi)
+        i = 0 if start is None else np.searchsorted(stamps, start, 'left')
+        j = len(stamps)
+        if end is not None:
+            j = np.searchsorted(stamps, end, 'left')
+        columns = {'TIME': stamps[i:j].astype('datetime64[ms]')}
+        lo, hi = lo + i, lo + j
+        compression = meta.get('compression', {})
+        for name in fields:
+            if name in compression:
+                columns[name] = self._query_compressed(
+                    series_path, name, compression[name][0], n, lo, hi,
+                    columns['TIME'])
+                continue
+            values = _read_range(os.path.join(series_path, name + '.bin'),
+                                 types[name], lo, hi)
+            if values.dtype.kind == 'S':
+                values = np.char.decode(values, 'latin-1')
+            columns[name] = values
+        return columns
+
+    @staticmethod
+    def _read_index(series_path, block_size, n):
+        """ Returns the sparse index of the first n readings of a series,
+            from TIME.i8 if index.i8 is missing or short.
+        """
+        n_blocks = -(-n // block_size)
+        index_path = os.path.join(series_path, 'index.i8')
+        index = (np.fromfile(index_path, '<i8')
+                 if os.path.exists(index_path) else np.zeros(0, np.int64))
+        if len(index) < n_blocks:
+            time_path = os.path.join(series_path, 'TIME.i8')
+            index = np.array(np.memmap(time_path, '<i8', 'r', shape=(n,))
+                             [::block_size])
+        return index[:n_blocks]
+
+    @staticmethod
+    def _query_compressed(series_path, name, method, n, lo, hi, stamps):
+        """ Reconstructs readings lo to hi of a compressed field from the
+            values kept at or around them.
+        """
+        if hi <= lo:
+            return np.zeros(0)
+        rows = np.fromfile(os.path.join(series_path, name + '.rows.i8'),
+                           '<i8')
+        rows = rows[:np.searchsorted(rows, n, 'left')]
+        a = max(np.searchsorted(rows, lo, 'right') - 1, 0)
+        b = min(np.searchsorted(rows, hi - 1, 'left') + 1, len(rows))
+        if b <= a:
+            return np.full(hi - lo, np.nan)
+        kept_rows = rows[a:b]
+        kept_values = _read_range(os.path.join(series_path, name + '.bin'),
+                                  '<f8', a, b)
+        time_path = os.path.join(series_path, 'TIME.i8')
+        kept_times = np.memmap(time_path, '<i8', 'r', shape=(n,))[kept_rows]
+        values = reconstruct(kept_times, kept_values, stamps, method)
+        #  Exact where a value was kept, even between equal timestamps
+        inside = (kept_rows >= lo) & (kept_rows < hi)
+        values[kept_rows[inside] - lo] = kept_values[inside]
+        return values
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+""" Extraction of METER captures from terminal session logs.
+
+    Logs are scanned through a memory map, so memory use does not depend on
+    the size of the file. METER captures are found by the header line that
+    starts every METER response (relay ID, date and time), identified with a
+    RelayDetector and parsed with the relay's parse_met.
+
+    MetFollower parses captures incrementally as they are appended to a log
+    that is still being written.
+"""
+
+import mmap
+import os
+import re
+import time
+
+from .detect import default_detector
+
+
+_header_key = b' Date: '
+_header = re.compile(br'.* Date: +\S+ +Time: +\S+\s*$')
+_max_header = 200
+
+
+def _decode(line):
+    """ Decodes a line of a log, dropping any carriage return. """
+    return line.rstrip(b'\r').decode('latin-1')
+
+
+def iter_met_blocks(buf, detector=None, pos=0, final=True):
+    """ Finds METER captures in a buffer of log text.
+        Parameters:
+            buf - bytes, mmap or other buffer with find and slicing.
+            detector - RelayDetector used to identify the captures.
+            pos - Offset in buf to start scanning from.
+            final - False if more text may still be appended to buf. Lines
+                    must then end with a newline to be used, and a capture
+                    that may not be complete yet is not parsed; instead
+                    (offset, None, None) is yielded for it and the scan
+                    stops.
+
+        Yields (offset, relay, lines) for each capture, where offset is the
+        position of its header line in buf, relay is its relay class and
+        lines is its list of lines as strings.
+    """
+    if detector is None:
+        detector = default_detector()
+    n_max = max(relay._met_template.n_lines for relay in detector.relays)
+    n_buf = len(buf)
+    while True:
+        i = buf.find(_header_key, pos)
+        if i < 0:
+            return
+        start = buf.rfind(b'\n', 0, i) + 1
+        pos = buf.find(b'\n', i)
+        if pos < 0:
+            if not final:
+                yield start, None, None
+                return
+            pos = n_buf
+        if pos - start > _max_header or not _header.match(buf[start:pos]):
+            continue
+        lines = []
+        ends = []
+        line_start = start
+        end = pos
+        while True:
+            lines.append(_decode(buf[line_start:end]))
+            ends.append(end)
+            if len(lines) == n_max:
+                break
+            line_start = end + 1
+            end = buf.find(b'\n', line_start)
+            if end < 0:
+                if final and line_start < n_buf:
+                    lines.append(_decode(buf[line_start:]))
+                    ends.append(n_buf)
+                break
+        relay = detector.detect(lines)
+        if relay is None:
+            if not final and len(lines) < n_max:
+                yield start, None, None
+                return
+            continue
+        n_lines = relay._met_template.n_lines
+        yield start, relay, lines[:n_lines]
+        pos = ends[n_lines - 1]
+
+
+def _parse_blocks(blocks):
+    """ Parses the captures from iter_met_blocks, skipping any that are
+        garbled. Yields (offset, reading).
+    """
+    for offset, relay, lines in blocks:
+        try:
+            reading = relay.parse_met(lines)
+        except ValueError:
+            continue
+        yield offset, reading
+
+
+def iter_met_readings(path, detector=None):
+    """ Parses the METER captures found in a log file.
+        Parameters:
+            path - Name of the log file.
+            detector - RelayDetector used to identify the captures.
+
+        Yields (offset, reading) for each capture, where offset is the byte
+        position of its header line in the file and reading is the
+        MeterReading from the relay's parse_met. Captures that are cut short
+        or garbled are skipped.
+    """
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            #  Empty file
+            return
+        try:
+            for item in _parse_blocks(iter_met_blocks(buf, detector)):
+                yield item
+        finally:
+            buf.close()
+
+
+class MetFollower(object):
+    """ Follows a growing log file and parses the METER captures appended to
+        it, like tail -f.
+        Parameters:
+            path - Name of the log file.
+            detector - RelayDetector used to identify the captures.
+            offset - Byte offset in the file to start from, such as a saved
+                     value of the offset attribute.
+            chunk_size - Number of bytes to read at a time.
+
+        Attributes:
+            offset - Byte offset of the first byte not yet processed. Saving
+                     it and passing it back in later resumes where this
+                     follower stopped. Bytes after it (at most a partial
+                     capture or line) are kept in memory until complete.
+
+        If the file is truncated, it is followed again from the start. This is
+        noticed when the file is shorter than the offset, or when its first
+        bytes (up to head_size) have changed, so that a file rewritten past
+        the offset between two polls is not read from the middle. If the file
+        is rotated (path now names a new file), the rest of the old file is
+        read first and then the new file is followed from the start.
+    """
+    head_size = 4096
+
+    def __init__(self, path, detector=None, offset=0, chunk_size=1 << 20):
+        self.path = path
+        self.detector = detector
+        self.offset = offset
+        self.chunk_size = chunk_size
+        self._pending = b''
+        self._file = None
+        self._head = b''
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self, offset):
+        self.close()
+        self._file = open(self.path, 'rb')
+        if os.fstat(self._file.fileno()).st_size < offset:
+            offset = 0
+        self._head = self._file.read(self.head_size)
+        self._file.seek(offset)
+        self.offset = offset
+        self._pending = b''
+
+    def _truncated(self):
+        """ Returns True if the open file is shorter than what was read of
+            it, or its first bytes have changed. Otherwise takes note of any
+            new first bytes.
+        """
+        pos = self._file.tell()
+        if os.fstat(self._file.fileno()).st_size < pos:
+            return True
+        self._file.seek(0)
+        head = self._file.read(self.head_size)
+        self._file.seek(pos)
+        if head[:len(self._head)] != self._head:
+            return True
+        self._head = head
+        return False
+
+    def poll(self):
+        """ Reads what has been appended to the file since the last poll.
+            Returns a list of (offset, reading) for the captures completed,
+            where offset is the byte position of the capture in the file.
+        """
+        readings = []
+        if self._file is None:
+            try:
+                self._open(self.offset)
+            except (IOError, OSError):
+                return readings
+        elif self._truncated():
+            self._open(0)
+        self._read(readings)
+
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            #  Rotation in progress; the new file does not exist yet
+            return readings
+        st_open = os.fstat(self._file.fileno())
+        if (st.st_ino, st.st_dev) != (st_open.st_ino, st_open.st_dev):
+            #  Rotated: finish the old file, then start on the new one
+            readings.extend(self._scan(final=True))
+            self._open(0)
+            self._read(readings)
+        return readings
+
+    def _read(self, readings):
+        while True:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk:
+                return
+            self._pending += chunk
+            readings.extend(self._scan(final=False))
+
+    def _scan(self, final):
+        """ Parses the complete captures in the pending bytes and drops the
+            bytes that are done with.
+        """
+        pending = self._pending
+        readings = []
+        resume = None
+        for offset, relay, lines in iter_met_blocks(pending, self.detector,
+                                                    final=final):
+            if relay is None:
+                resume = offset
+                break
+            try:
+                reading = relay.parse_met(lines)
+            except ValueError:
+                continue
+            readings.append((self.offset + offset, reading))
+        if resume is None:
+            resume = len(pending) if final else pending.rfind(b'\n') + 1
+        self.offset += resume
+        self._pending = pending[resume:]
+        return readings
+
+
+def follow(path, interval=1., detector=None, offset=0):
+    """ Follows a growing log file forever, yielding (offset, reading) for
+        each METER capture as it is completed. The file is checked for new
+        data every interval seconds.
+    """
+    follower = MetFollower(path, detector, offset)
+    try:
+        while True:
+            for item in follower.poll():
+                yield item
+            time.sleep(interval)
+    finally:
+        follower.close()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+""" Synthetic METER captures for tests and benchmarks.
+
+    Captures are written from a relay's METER layout, so any registered
+    relay type is supported. Numeric fields get random values in a range
+    suited to the quantity (currents, voltages, angles, power, etc.) that
+    always fits the column width of the field. DATE and TIME advance by a
+    fixed interval from one capture to the next.
+"""
+
+import datetime
+import os
+import random
+import re
+
+
+#  (pattern of field names, low, high), first match wins
+_ranges = [(re.compile(r'.*_ANG$'), -180., 180.),
+           (re.compile(r'^PF_'), -1., 1.),
+           (re.compile(r'^FREQ$'), 59.95, 60.05),
+           (re.compile(r'^VDC'), 120., 140.),
+           (re.compile(r'^(3I2|3I0|I[PGN])_MAG$'), 0., 50.),
+           (re.compile(r'^I.*_MAG$'), 0., 1200.),
+           (re.compile(r'^(V2|3V2|3V0)_MAG$'), 0., 1.),
+           (re.compile(r'^V(AB|BC|CA)_MAG$'), 110., 130.),
+           (re.compile(r'^VS_MAG$'), 60., 130.),
+           (re.compile(r'^V.*_MAG$'), 64., 74.),
+           (re.compile(r'^S_.*_MAG$'), 0., 150.),
+           (re.compile(r'^(MW|MVAR)_3P$'), -150., 150.),
+           (re.compile(r'^(MW|MVAR)_'), -50., 50.),
+           (re.compile(r''), 0., 100.)]
+
+_format_item = re.compile(r'\s*([AF])(\d+)(?:\.(\d+))?\s*$')
+
+_rids = ['BROKEN BOW 11S-02', 'CALLAWAY 115 SUB', 'CROOKED CREEK T1',
+         'ANSLEY 34.5 KV', 'MERNA NORTH BUS']
+_tids = ['L1140C, PCB1102, BRK BOW-CALWY', 'L1074 BROKEN BOW-CROOKED CREEK',
+         'PCB610 T1 11T1L', 'FEEDER 3 RECLOSER']
+
+
+def _format_items(fmt):
+    """ Returns a list of (type, width, decimals) for a format string. """
+    items = []
+    for s in fmt.split(','):
+        typ, width, decimals = _format_item.match(s).groups()
+        items.append((typ, int(width), int(decimals or 0)))
+    return items
+
+
+def _value_range(name, width, decimals):
+    for pattern, low, high in _ranges:
+        if pattern.match(name):
+            break
+    #  Largest magnitude that fits with a sign and a decimal point
+    digits = width - 1 - (decimals + 1 if decimals else 0)
+    limit = 10 ** digits - 1
+    return max(low, -limit), min(high, limit)
+
+
+def random_met_values(relay, rng=None, timestamp=None, rid=None, tid=None,
+                      blank_rate=0.):
+    """ Returns a dict of random values for the METER fields of a relay.
+        Parameters:
+            relay - Relay class, such as RelaySEL311C.
+            rng - random.Random to use. Defaults to the random module.
+            timestamp - datetime for DATE and TIME. Defaults to now.
+            rid, tid - Relay and terminal IDs. Default to random names.
+            blank_rate - Probability of a numeric field being blank (None).
+    """
+    if rng is None:
+        rng = random
+    if timestamp is None:
+        timestamp = datetime.datetime.now()
+    fields = set(f[0] for f in relay._met_template.fields)
+    values = {}
+    for row in relay._met_layout:
+        if isinstance(row, str):
+            continue
+        fmt, names, fixed = row
+        for i, (typ, width, decimals) in enumerate(_format_items(fmt)):
+            if i in fixed:
+                continue
+            name = names[i]
+            if typ == 'F':
+                if name.endswith('_ANG') and name[:-4] + '_MAG' not in fields:
+                    #  Relays leave the angle blank when there is no
+                    #  magnitude (3V0 with delta PTs)
+                    values[name] = None
+                elif blank_rate and rng.random() < blank_rate:
+                    values[name] = None
+                else:
+                    low, high = _value_range(name, width, decimals)
+                    values[name] = round(rng.uniform(low, high), decimals)
+            elif name == 'RID':
+                values[name] = rid if rid is not None else rng.choice(_rids)
+            elif name == 'TID':
+                values[name] = tid if tid is not None else rng.choice(_tids)
+            elif name == 'DATE':
+                values[name] = timestamp.strftime(
+                    '%m/%d/%Y' if width >= 10 else '%m/%d/%y')
+            elif name == 'TIME':
+                values[name] = '%02d:%02d:%02d.%03d' % (
+                    timestamp.hour, timestamp.minute, timestamp.second,
+                    timestamp.microsecond // 1000)
+            elif name.startswith('PF_LEADLAG'):
+                values[name] = rng.choice(['LEAD', 'LAG'])
+            else:
+                values[name] = ''.join(rng.choice('0123456789')
+                                       for n in range(width))
+    return values
+
+
+def format_met(relay, values):
+    """ Returns the lines of METER output of a relay for a dict of field
+        values, as the relay would print them. Missing or None numeric
+        fields are left blank.
+    """
+    lines = []
+    for row in relay._met_layout:
+        if isinstance(row, str):
+            lines.append(row)
+            continue
+        fmt, names, fixed = row
+        line = []
+        for i, (typ, width, decimals) in enumerate(_format_items(fmt)):
+            if i in fixed:
+                line.append(names[i].ljust(width))
+                continue
+            v = values.get(names[i])
+            if names[i].startswith('PF_LEADLAG'):
+                #  Under the end of the numbers above
+                line.append(str(v or '').strip().rjust(width - 1).ljust(width))
+            elif typ == 'A':
+                line.append(str(v if v is not None else '').ljust(width))
+            elif v is None:
+                line.append(' ' * width)
+            else:
+                s = '%*.*f' % (width, decimals, v)
+                if len(s) > width:
+                    raise ValueError('%s value %r does not fit in %d '
+                                     'columns' % (names[i], v, width))
+                line.append(s)
+        lines.append(''.join(line).rstrip())
+    return lines
+
+
+def generate_met(relay, n, seed=0, start=None,
+                 interval=datetime.timedelta(seconds=1), blank_rate=0.):
+    """ Yields n random METER captures (lists of lines) of a relay, with
+        times interval apart from start (default 2016-07-21 16:00).
+    """
+    rng = random.Random(seed)
+    if start is None:
+        start = datetime.datetime(2016, 7, 21, 16)
+    rid = rng.choice(_rids)
+    tid = rng.choice(_tids)
+    for i in range(n):
+        yield format_met(relay, random_met_values(
+            relay, rng, start + i * interval, rid, tid, blank_rate))
+
+
+def write_met_corpus(path, relays, n_files, captures_per_file=1, seed=0):
+    """ Writes files of random METER captures to a directory, as they would
+        be saved from terminal sessions, and returns their names.
+        Parameters:
+            path - Directory to write to. It is created if needed.
+            relays - Relay classes to pick from, one per file.
+            n_files - Number of files.
+            captures_per_file - Number of captures in each file.
+            seed - Random seed.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    rng = random.Random(seed)
+    names = []
+    for i in range(n_files):
+        relay = rng.choice(relays)
+        name = os.path.join(path, 'met_%05d.txt' % i)
+        with open(name, 'w') as f:
+            for lines in generate_met(relay, captures_per_file,
+                                      rng.randrange(1 << 30)):
+                f.write('=>METER\n\n')
+                f.write('\n'.join(lines))
+                f.write('\n\n')
+        names.append(name)
+    return names
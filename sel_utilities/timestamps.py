@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+""" Conversion of METER DATE and TIME fields to timestamps.
+
+    METER headers give the date as MM/DD/YY or MM/DD/YYYY and the time as
+    HH:MM:SS.fff. Whole columns of them are converted to datetime64[ms] in
+    one vectorized pass: each distinct date is parsed once (and kept in a
+    small cache, since most captures share a few days) and the times are
+    read digit by digit from their bytes.
+"""
+
+import datetime
+
+import numpy as np
+
+
+_epoch = datetime.date(1970, 1, 1)
+_ms_per_day = 86400000
+_max_dates = 4096
+_date_cache = {}
+
+
+def _date_days(date):
+    """ Returns the number of days since 1970-01-01 of a METER date. """
+    try:
+        return _date_cache[date]
+    except KeyError:
+        pass
+    try:
+        month, day, year = date.strip().split('/')
+        if len(year) == 2:
+            #  As strptime's %y
+            year = int(year) + (2000 if int(year) < 69 else 1900)
+        elif len(year) != 4:
+            raise ValueError
+        days = (datetime.date(int(year), int(month), int(day)) -
+                _epoch).days
+    except ValueError:
+        raise ValueError('Invalid METER date %r' % date)
+    if len(_date_cache) >= _max_dates:
+        _date_cache.clear()
+    _date_cache[date] = days
+    return days
+
+
+def _time_ms(time):
+    """ Returns the milliseconds since midnight of a METER time. """
+    s = time.strip()
+    try:
+        if s[2] != ':' or s[5] != ':' or (len(s) > 8 and s[8] != '.'):
+            raise ValueError
+        ms = (int(s[0:2]) * 3600 + int(s[3:5]) * 60 + int(s[6:8])) * 1000
+        if len(s) > 9:
+            ms += int(s[9:12].ljust(3, '0'))
+    except (ValueError, IndexError):
+        raise ValueError('Invalid METER time %r' % time)
+    return ms
+
+
+def parse_timestamp(date, time):
+    """ Returns the numpy.datetime64 timestamp, in ms, of a METER DATE and
+        TIME. Raises ValueError if either is not valid.
+    """
+    return np.datetime64(_date_days(date) * _ms_per_day + _time_ms(time),
+                         'ms')
+
+
+def _times_ms(times):
+    """ Vectorized _time_ms for an array of time strings. """
+    b = np.char.encode(np.char.strip(np.asarray(times, dtype=str)), 'ascii')
+    width = max(b.dtype.itemsize, 8)
+    u = b.astype('S%d' % width).view(np.uint8).reshape(len(b), width)
+    u = u.astype(np.int64)
+    d = u - ord('0')
+    is_digit = (d >= 0) & (d <= 9)
+
+    bad = ~(is_digit[:, [0, 1, 3, 4, 6, 7]].all(axis=1) &
+            (u[:, 2] == ord(':')) & (u[:, 5] == ord(':')))
+    ms = (((d[:, 0] * 10 + d[:, 1]) * 60 + d[:, 3] * 10 + d[:, 4]) * 60 +
+          d[:, 6] * 10 + d[:, 7]) * 1000
+    if width > 8:
+        #  Fraction of a second, padded with NUL bytes if short
+        bad |= (u[:, 8] != ord('.')) & (u[:, 8] != 0)
+        for k in range(9, width):
+            bad |= ~is_digit[:, k] & (u[:, k] != 0)
+            if k < 12:
+                ms += np.where(is_digit[:, k], d[:, k], 0) * 10 ** (11 - k)
+    if bad.any():
+        raise ValueError('Invalid METER time %r'
+                         % np.asarray(times)[bad.argmax()])
+    return ms
+
+
+def parse_timestamps(dates, times):
+    """ Converts columns of METER DATE and TIME strings, such as those from
+        read_met_batch, to a datetime64[ms] array. Raises ValueError if any
+        date or time is not valid.
+    """
+    dates = np.asarray(dates, dtype=str)
+    if len(dates) != len(times):
+        raise ValueError('%d dates and %d times' % (len(dates), len(times)))
+    if not len(dates):
+        return np.zeros(0, 'datetime64[ms]')
+    unique, inverse = np.unique(dates, return_inverse=True)
+    days = np.array([_date_days(d) for d in unique], dtype=np.int64)
+    ms = days[inverse.ravel()] * _ms_per_day + _times_ms(times)
+    return ms.astype('datetime64[ms]')
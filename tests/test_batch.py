@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_batch
+----------------------------------
+
+Tests for `batch` module.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import batch, synthetic
+
+from .test_sel_utilities import (sel311c_met, sel351delta_met, sel421_met,
+                                 assert_round_equals)
+
+
+@pytest.mark.parametrize("relay, met_text",
+                         [(su.RelaySEL311C, sel311c_met),
+                          (su.RelaySEL421, sel421_met),
+                          (su.RelaySEL351Delta, sel351delta_met)])
+def test_read_met_batch_matches_read(relay, met_text):
+    met = relay().met
+    met.read(met_text)
+    columns = batch.read_met_batch(relay, [met_text, '\n'.join(met_text)])
+    for k, v in met.data.items():
+        if v is None:
+            continue
+        assert len(columns[k]) == 2
+        for c in columns[k]:
+            assert_round_equals(c, v, places=9)
+
+
+def test_read_met_batch_rejects_other_layout():
+    with pytest.raises(ValueError):
+        batch.read_met_batch(su.RelaySEL311C, [sel311c_met, sel421_met])
+    with pytest.raises(ValueError) as e:
+        batch.read_met_batch(su.RelaySEL311C, [sel311c_met, sel311c_met[:5]])
+    assert 'Capture 1 ' in str(e.value)
+    garbled = list(sel311c_met)
+    garbled[3] = garbled[3].replace('213.328', '213.3x8')
+    with pytest.raises(ValueError) as e:
+        batch.read_met_batch(su.RelaySEL311C, [sel311c_met, garbled])
+    assert 'Capture 1 has a bad IB_MAG field' in str(e.value)
+
+
+@pytest.mark.parametrize("relay", [su.RelaySEL311C, su.RelaySEL421,
+                                   su.RelaySEL351Delta])
+def test_read_met_batch_matches_parse_met(relay):
+    rng = random.Random(0)
+    captures = []
+    for i in range(50):
+        values = synthetic.random_met_values(relay, rng, None, 'RELAY %d' % i,
+                                             blank_rate=0.1)
+        captures.append(synthetic.format_met(relay, values))
+    #  Unusual but matching text is read the slow way
+    captures[1] = [line + '   ' for line in captures[1]]
+    captures[2] = [line.replace('    Date: ', '    Date:\t')
+                   for line in captures[2]]
+    captures[3] = [line.replace('RELAY 3', u'RELAY \u2163')
+                   for line in captures[3]]
+    #  Lines from readlines, and with a blank field at the end of a line
+    captures[4] = [line + '\n' for line in captures[4]]
+    captures[5] = [line + '\r\n' for line in captures[5]]
+    captures[6] = [line.rstrip() + '\n' for line in captures[6]]
+    captures[7] = [line + '\n' for line in captures[7]]
+    captures[7][-1] = captures[7][-1][:-1]
+    captures[8] = captures[8][:1] + [line.rstrip() + '\r\n'
+                                     for line in captures[8][1:]]
+    columns = batch.read_met_batch(relay, captures)
+    for i, lines in enumerate(captures):
+        reading = relay.parse_met(lines)
+        for name in relay._met_template.names:
+            if reading[name] is None:
+                assert np.isnan(columns[name][i])
+            else:
+                assert columns[name][i] == reading[name]
+    assert columns['RID'][3] == u'RELAY \u2163'
+
+
+@pytest.mark.parametrize("relay, met_text",
+                         [(su.RelaySEL311C, sel311c_met),
+                          (su.RelaySEL421, sel421_met),
+                          (su.RelaySEL351Delta, sel351delta_met)])
+def test_derive_met_quantities(relay, met_text):
+    met = relay().met
+    met.read(met_text)
+    columns = dict((k, [v]) for k, v in met.data.items()
+                   if isinstance(v, float))
+    batch.derive_met_quantities(relay, columns)
+    for k in (relay._met_quantities +
+              ['S_' + ph for ph in relay._met_power_phases]):
+        assert_round_equals(columns[k][0], met.data[k], places=9)
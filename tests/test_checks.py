@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_checks
+----------------------------------
+
+Tests for `checks` module.
+"""
+
+import numpy as np
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import batch
+from sel_utilities import checks
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+
+
+def replace_field(met_text, line_no, start, stop, value):
+    lines = list(met_text)
+    line = lines[line_no]
+    lines[line_no] = line[:start] + value.rjust(stop - start) + line[stop:]
+    return lines
+
+
+@pytest.mark.parametrize('relay, met_text, checked',
+                         [(su.RelaySEL311C, sel311c_met,
+                           ['I0', 'I1', 'I2', 'I_IMBALANCE',
+                            'V0', 'V1', 'V2', 'V_IMBALANCE']),
+                          (su.RelaySEL421, sel421_met,
+                           ['I0', 'I1', 'I2', 'I_IMBALANCE',
+                            'V0', 'V1', 'V2', 'V_IMBALANCE']),
+                          (su.RelaySEL351Delta, sel351delta_met,
+                           ['I0', 'I1', 'I2', 'I_IMBALANCE',
+                            'V1', 'V2', 'V_IMBALANCE'])])
+def test_check_met_batch(relay, met_text, checked):
+    columns = batch.read_met_batch(relay, [met_text] * 4)
+    failed = checks.check_met_batch(columns)
+    assert sorted(failed) == checked
+    for name in checked:
+        assert list(failed[name]) == []
+
+
+def test_check_met_batch_flags():
+    template = su.RelaySEL311C._met_template
+    fields = dict((f[0], f[1:4]) for f in template.fields)
+    captures = [sel311c_met] * 5
+    #  Reported 3I2 does not match the phase currents
+    captures[1] = replace_field(sel311c_met, *fields['3I2_MAG'] + ('60.990',))
+    #  Phase B voltage sags, so V1 and V2 are no longer consistent
+    captures[3] = replace_field(sel311c_met, *fields['VB_MAG'] + ('65.000',))
+    #  Dead line
+    dead = sel311c_met
+    for q in ('IA', 'IB', 'IC'):
+        dead = replace_field(dead, *fields[q + '_MAG'] + ('0.100',))
+    captures[4] = dead
+    columns = batch.read_met_batch(su.RelaySEL311C, captures)
+
+    failed = checks.check_met_batch(columns)
+    assert list(failed['I2']) == [1]
+    assert list(failed['I1']) == []
+    assert list(failed['V1']) == [3]
+    assert list(failed['V2']) == [3]
+    assert list(failed['V_IMBALANCE']) == [3]
+    assert list(failed['I_IMBALANCE']) == []
+    assert list(checks.check_met_batch(
+        columns, current_imbalance=0.01)['I_IMBALANCE']) == [0, 1, 2, 3]
+
+
+def test_symmetrical_components():
+    columns = batch.read_met_batch(su.RelaySEL351Delta, [sel351delta_met])
+    i0, i1, i2 = checks.symmetrical_components(columns, 'I')[:, 0]
+    assert abs(i1) == pytest.approx(195.933, abs=0.01)
+    assert np.degrees(np.angle(i1)) == pytest.approx(-33.84, abs=0.01)
+    v0, v1, v2 = checks.symmetrical_components(columns, 'V')[:, 0]
+    assert v0 == 0
+    assert abs(v1) == pytest.approx(41.062, abs=0.05)
+    assert np.degrees(np.angle(v1)) == pytest.approx(-30.22, abs=0.01)
+    assert checks.imbalance(columns, 'I')[0] == pytest.approx(
+        (197.990 - 195.9347) / 195.9347, rel=1e-4)
+    with pytest.raises(KeyError):
+        checks.symmetrical_components({}, 'V')
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_compression
+----------------------------------
+
+Tests for `compression` module.
+"""
+
+import numpy as np
+import pytest
+
+
+from sel_utilities import compression
+
+
+def random_walk(n=2000, seed=0):
+    rng = np.random.RandomState(seed)
+    times = np.cumsum(rng.randint(500, 1500, n)).astype(np.int64)
+    values = 60. + np.cumsum(rng.normal(0, 0.01, n))
+    return times, values
+
+
+@pytest.mark.parametrize('method', ['deadband', 'swinging_door'])
+def test_error_bound(method):
+    times, values = random_walk()
+    keep = compression.compress(times, values, method, 0.02)
+    assert keep[0] and keep[-1]
+    assert keep.sum() < len(values) / 4
+    restored = compression.reconstruct(times[keep], values[keep], times,
+                                       method)
+    assert np.abs(restored - values).max() <= 0.02 + 1e-9
+    assert np.array_equal(restored[keep], values[keep])
+
+
+def test_deadband():
+    times = np.arange(8) * 1000
+    values = [1., 1.05, 1.2, 1.25, 1.05, np.nan, np.nan, 1.1]
+    keep = compression.deadband(times, values, 0.1)
+    assert list(np.flatnonzero(keep)) == [0, 2, 4, 5, 7]
+    restored = compression.reconstruct(times[keep], np.array(values)[keep],
+                                       times, 'deadband')
+    assert np.allclose(restored, [1., 1., 1.2, 1.2, 1.05, np.nan, np.nan, 1.1],
+                       equal_nan=True)
+
+
+def test_swinging_door():
+    #  A ramp needs only its ends
+    times = np.arange(10) * 1000
+    values = np.arange(10) * 0.5
+    assert list(np.flatnonzero(
+        compression.swinging_door(times, values, 0.01))) == [0, 9]
+    values[4] = 3.
+    assert list(np.flatnonzero(
+        compression.swinging_door(times, values, 0.01))) == [0, 3, 4, 5, 9]
+
+    #  The points next to blanks are kept
+    values = np.arange(10) * 0.5
+    values[5:7] = np.nan
+    keep = compression.swinging_door(times, values, 0.01)
+    assert list(np.flatnonzero(keep)) == [0, 4, 5, 6, 7, 9]
+    restored = compression.reconstruct(times[keep], values[keep], times,
+                                       'swinging_door')
+    assert np.allclose(restored, values, equal_nan=True)
+
+
+@pytest.mark.parametrize('method', ['deadband', 'swinging_door'])
+def test_keyframe(method):
+    times = np.arange(100) * 1000
+    values = np.full(100, 60.)
+    keep = compression.compress(times, values, method, 0.1, keyframe=30)
+    assert list(np.flatnonzero(keep)) == [0, 30, 60, 90, 99]
+
+
+@pytest.mark.parametrize('method', ['deadband', 'swinging_door'])
+def test_batches(method):
+    times, values = random_walk(1000, 1)
+    times = times.astype('datetime64[ms]')
+    keep = compression.compress(times[:500], values[:500], method, 0.02)
+    anchor = (times[499], values[499])
+    keep = np.concatenate([keep, compression.compress(
+        times[500:], values[500:], method, 0.02, anchor=anchor)])
+    restored = compression.reconstruct(times[keep], values[keep], times,
+                                       method)
+    assert np.abs(restored - values).max() <= 0.02 + 1e-9
+
+
+def test_reconstruct_outside():
+    restored = compression.reconstruct([1000, 2000], [1., 2.],
+                                       [0, 1000, 1500, 2500], 'swinging_door')
+    assert np.allclose(restored, [np.nan, 1., 1.5, 2.], equal_nan=True)
+    assert np.isnan(compression.reconstruct([], [], [0], 'deadband')).all()
+    with pytest.raises(ValueError):
+        compression.compress([0], [0.], 'average', 1.)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_detect
+----------------------------------
+
+Tests for `detect` module.
+"""
+
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import detect
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+
+
+@pytest.mark.parametrize("met_text, relay",
+                         [(sel311c_met, su.RelaySEL311C),
+                          (sel421_met, su.RelaySEL421),
+                          (sel351delta_met, su.RelaySEL351Delta),
+                          ('\n'.join(sel421_met), su.RelaySEL421),
+                          (sel311c_met[:-1], None),
+                          (sel311c_met[:3] + sel351delta_met[3:], None),
+                          (['=>MET', ''], None)])
+def test_detect_relay(met_text, relay):
+    assert detect.detect_relay(met_text) is relay
+
+
+def test_group():
+    d = detect.RelayDetector([su.RelaySEL311C, su.RelaySEL351Delta])
+    groups = d.group([sel311c_met, sel421_met, sel351delta_met, sel311c_met])
+    assert groups == {su.RelaySEL311C: [sel311c_met, sel311c_met],
+                      su.RelaySEL351Delta: [sel351delta_met],
+                      None: [sel421_met]}
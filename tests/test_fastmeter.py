@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_fastmeter
+----------------------------------
+
+Tests for `fastmeter` module.
+"""
+
+import cmath
+import math
+import struct
+
+import numpy as np
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import fastmeter
+
+from .test_sel_utilities import sel311c_met, sel351delta_met
+
+
+def checksum(message):
+    return message + struct.pack('>B', sum(bytearray(message)) & 0xff)
+
+
+def make_config(channels, samples=2, n_status=1, n_digital=2,
+                time_stamp=True):
+    """ Returns the A5 C1 message for a list of (name, type, scaled)
+        channels, with the data laid out as status, scale factors, analog
+        data, time stamp and digital banks.
+    """
+    sizes = {0: 2, 1: 4, 2: 8}
+    scale_offset = 3 + n_status
+    scale_offsets = []
+    for name, typ, scaled in channels:
+        scale_offsets.append(scale_offset if scaled else None)
+        scale_offset += 4 if scaled else 0
+    analog_offset = scale_offset
+    time_offset = analog_offset + samples * sum(sizes[typ] for name, typ, s
+                                                in channels)
+    digital_offset = time_offset + (8 if time_stamp else 0)
+    n_calc = 1
+    length = 16 + 10 * len(channels) + 14 * n_calc + 2
+    message = struct.pack('>2s8B3H', b'\xa5\xc1', length, n_status, 0xff, 0,
+                          len(channels), samples, n_digital, n_calc,
+                          analog_offset,
+                          time_offset if time_stamp else 0xffff,
+                          digital_offset)
+    for (name, typ, scaled), scale_offset in zip(channels, scale_offsets):
+        message += struct.pack('>6s2BH', name.encode('ascii'), typ,
+                               0xff if scale_offset is None else 1,
+                               scale_offset or 0)
+    message += b'\0' * 14 * n_calc + b'\0'
+    return checksum(message)
+
+
+def make_data(config, values, stamp=(2016, 203, 60714489)):
+    """ Returns an A5 D1 message for a FastMeterConfig and a dict of the
+        sample values (and scale factors as <name>_SCALE) of each channel.
+    """
+    message = bytearray(config.data_length - 1)
+    message[0:3] = struct.pack('>2sB', b'\xa5\xd1', config.data_length)
+    pos = config.analog_offset
+    for channel in config.channels:
+        fmt = '>' + {'>i2': 'h', '>f4': 'f', '>f8': 'd'}[channel.dtype]
+        for v in values[channel.name]:
+            message[pos:pos + struct.calcsize(fmt)] = struct.pack(fmt, v)
+            pos += struct.calcsize(fmt)
+        if channel.scale_type != 0xff:
+            message[channel.scale_offset:channel.scale_offset + 4] = \
+                struct.pack('>f', values[channel.name + '_SCALE'])
+    if config.time_offset != 0xffff:
+        message[config.time_offset:config.time_offset + 8] = struct.pack(
+            '>2HI', *stamp)
+    return checksum(bytes(message))
+
+
+def samples(reading, q):
+    """ Returns the two samples, a quarter cycle apart, of a phasor. """
+    p = cmath.rect(reading[q + '_MAG'], math.radians(reading[q + '_ANG']))
+    return [p.real, -p.imag]
+
+
+phases_311 = ['IA', 'IB', 'IC', 'IG', 'VA', 'VB', 'VC', 'VS']
+phases_351 = ['IA', 'IB', 'IC', 'IG', 'VAB', 'VBC', 'VCA', 'VS']
+
+
+@pytest.mark.parametrize('relay, met_text, phases',
+                         [(su.RelaySEL311C, sel311c_met, phases_311),
+                          (su.RelaySEL351Delta, sel351delta_met, phases_351)])
+def test_decode_data(relay, met_text, phases):
+    met = relay.parse_met(met_text)
+    config = fastmeter.FastMeterConfig(make_config(
+        [(q, 1, False) for q in phases] + [('FREQ', 2, False),
+                                           ('VDC', 1, False)]))
+    assert [c.name for c in config.channels] == phases + ['FREQ', 'VDC']
+    assert config.samples == 2 and len(config.calc_blocks) == 1
+    values = dict((q, samples(met, q)) for q in phases)
+    values['FREQ'] = [met['FREQ'], 0.]
+    values['VDC'] = [met['VDC'], 0.]
+
+    reading = fastmeter.decode_data(relay, config, make_data(config, values),
+                                    met['RID'], met['TID'])
+    assert type(reading) is relay._met_reading
+    assert sorted(reading) == sorted(met)
+    assert reading['RID'] == met['RID'] and reading['TID'] == met['TID']
+    assert reading['DATE'] == '07/21/16'
+    assert reading['TIME'] == '16:51:54.489'
+    assert reading['FREQ'] == met['FREQ']
+    for q in phases:
+        assert reading[q + '_MAG'] == pytest.approx(met[q + '_MAG'], 1e-6)
+        assert reading[q + '_ANG'] == pytest.approx(met[q + '_ANG'],
+                                                    abs=1e-4)
+    #  Computed from the phasors, so close to the relay's own values
+    for name in ('I1_MAG', '3I2_MAG', '3I0_MAG', 'V1_MAG', 'MW_3P',
+                 'MVAR_3P'):
+        assert reading[name] == pytest.approx(met[name], abs=0.05, rel=2e-3)
+    assert reading['I1_ANG'] == pytest.approx(met['I1_ANG'], abs=0.01)
+    assert reading['PF_3P'] is None
+    assert reading['PF_LEADLAG_3P'] == ''
+    assert reading['S_3P'] == complex(reading['MW_3P'], reading['MVAR_3P'])
+
+
+def test_decode_data_batch():
+    met = su.RelaySEL311C.parse_met(sel311c_met)
+    config = fastmeter.FastMeterConfig(make_config(
+        [('IA', 0, True), ('VA', 1, False), ('FREQ', 2, False)], samples=1,
+        n_status=2, n_digital=6, time_stamp=False))
+    assert config.data_length == 3 + 2 + 4 + 2 + 4 + 8 + 6 + 1
+    frames = [make_data(config, {'IA': [i], 'IA_SCALE': 0.5, 'VA': [68.8],
+                                 'FREQ': [60.]})
+              for i in range(100)]
+    columns = fastmeter.decode_data_batch(su.RelaySEL311C, config, frames,
+                                          met['RID'])
+    assert list(columns['IA_MAG']) == [0.5 * i for i in range(100)]
+    assert np.isnan(columns['IA_ANG']).all()
+    assert (columns['FREQ'] == 60.).all()
+    assert list(columns['RID']) == [met['RID']] * 100
+    assert list(columns['DATE']) == [''] * 100
+    assert sorted(columns) == sorted(met)
+    #  All frames in one buffer
+    columns = fastmeter.decode_data_batch(su.RelaySEL311C, config,
+                                          b''.join(frames))
+    assert len(columns['IA_MAG']) == 100
+
+
+def test_decode_errors():
+    message = make_config([('IA', 1, False)])
+    config = fastmeter.FastMeterConfig(message)
+    for bad in (message[:-1] + b'\0',
+                b'\xa5\xd1' + message[2:],
+                message[:-2] + checksum(message[-2:-1])):
+        with pytest.raises(ValueError):
+            fastmeter.FastMeterConfig(bad)
+
+    frame = make_data(config, {'IA': [1., 2.]})
+    for bad in ([frame, frame[:-1] + b'\0'], [frame[:-1]],
+                [b'\xa5\xc1' + frame[2:]]):
+        with pytest.raises(ValueError):
+            fastmeter.decode_data_batch(su.RelaySEL311C, config, bad)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_fleet
+----------------------------------
+
+Tests for `fleet` module.
+"""
+
+import os
+
+from sel_utilities import fleet
+from sel_utilities import settings as st
+
+from .test_settings import lines, sel351_log, sel421_log
+
+
+def test_settings_group():
+    group = fleet.SettingsGroup([('SITM1', 'IN101'), ('SNAME1', 'BKR'),
+                                 ('SITM2', ''), ('SITM3', 'OUT101'),
+                                 ('SITMX', 'Y')])
+    assert list(group) == ['SITM1', 'SNAME1', 'SITM2', 'SITM3', 'SITMX']
+    assert group['SITM3'] == 'OUT101'
+    assert group.points('SITM') == ['IN101', 'OUT101']
+    #  Names are interned
+    name = ''.join(['SIT', 'M1'])
+    assert [n for n in fleet.SettingsGroup([(name, '')])][0] is \
+        list(group)[0]
+    assert fleet.SettingsGroup(group) == group
+
+
+def test_diff_settings():
+    reference = fleet.SettingsGroup([('A', '1'), ('B', '2'), ('C', '3')])
+    settings = fleet.SettingsGroup([('C', '3'), ('B', '5'), ('D', '4')])
+    assert fleet.diff_settings(reference, settings) == [
+        ('A', '1', None), ('B', '2', '5'), ('D', None, '4')]
+    assert settings.diff(reference, subset=True) == [('A', '1', None),
+                                                     ('B', '2', '5')]
+    assert settings.diff(settings) == []
+
+
+def test_fleet():
+    captures = (list(st.parse_settings(lines(sel421_log))) +
+                list(st.parse_settings(lines(sel351_log))))
+    f = fleet.SettingsFleet.from_captures(captures)
+    assert list(f) == ['BROKEN BOW 11S-08', 'BROKEN BOW 11T1L SEL-351-6']
+    relay = f['BROKEN BOW 11S-08']
+    assert list(relay) == ['S1', 'L1', 'R1', 'S2']
+    assert relay.relay_id['FID'].startswith('SEL-421')
+    assert relay['S1']['CTRW'] == '240'
+    assert relay.get('CTRW', 'S2') is None
+    assert relay['R1'].points('ERDG') == ['TRIP', '67P1TOR 67G1T']
+
+    assert f.lookup('E21P') == {('BROKEN BOW 11S-08', 'S1'): '3',
+                                ('BROKEN BOW 11S-08', 'S2'): '2'}
+    assert f.lookup('CTR', '1') == {('BROKEN BOW 11T1L SEL-351-6', '1'):
+                                    '240'}
+    assert f.lookup('CTR', 'S1') == {}
+
+    #  Against an earlier capture
+    newer = sel421_log.replace('E21MG  := 4', 'E21MG  := 5')
+    g = fleet.SettingsFleet.from_captures(st.parse_settings(lines(newer)))
+    g.add({'DEVID': 'NEW RELAY'}, 'S1', [('E21P', '1')])
+    assert g.diff(f) == {'BROKEN BOW 11S-08': {
+        'S1': [('E21MG', '4', '5')], 'S2': [('E21MG', '4', '5')]}}
+
+    #  Against a template of the settings that matter
+    template = {'S1': {'E21P': '3', 'CTRW': '240'}, 'S3': {'E21P': '3'}}
+    assert f.diff(template, subset=True) == {
+        'BROKEN BOW 11S-08': {'S3': [('E21P', '3', None)]},
+        'BROKEN BOW 11T1L SEL-351-6': {
+            'S1': [('E21P', '3', None), ('CTRW', '240', None)],
+            'S3': [('E21P', '3', None)]}}
+    diffs = f['BROKEN BOW 11S-08'].diff(template)
+    assert list(diffs) == ['S1', 'S3', 'L1', 'R1', 'S2']
+    assert diffs['S2'][0] == ('E21P', None, '2')
+
+
+def test_load_exports(tmpdir):
+    captures = list(st.parse_settings(lines(sel421_log)))
+    for relay_id, group, settings in captures:
+        st.export_settings(str(tmpdir), relay_id, group, settings)
+    relay_id, group, settings = captures[0]
+    name = st.export_settings(str(tmpdir), relay_id, group,
+                              [('E21P', '9')] + settings[1:])
+    #  Numbered files were written later
+    for path in (name, name.replace(' (1)', '')):
+        os.utime(path, (1000, 1000))
+
+    info, group, exported = fleet.read_settings_export(name)
+    assert group == 'S1'
+    assert info['RELAYTYPE'] == 'SEL-421'
+    assert info['PARTNO'] == '0421H11XX3X4H4XXXXX'
+    assert exported['E21P'] == '9'
+    assert exported['LINENAM'] == 'L1074 BROKEN BOW-CROOKED CREEK'
+
+    f = fleet.load_exports(str(tmpdir))
+    relay = f['BROKEN BOW 11S-08']
+    assert sorted(relay) == ['L1', 'R1', 'S1', 'S2']
+    assert relay['S1']['E21P'] == '9'
+    assert relay.relay_id['FID'] == relay_id['FID']
+    assert list(relay['R1'].items()) == captures[2][2]
+
+
+def test_load_exports_sanitized_devid(tmpdir):
+    log = sel421_log.replace('BROKEN BOW 11S-08', 'BROKEN BOW 11S/08')
+    parsed = fleet.SettingsFleet.from_captures(
+        st.parse_settings(lines(log)))
+    for devid, relay in parsed.relays.items():
+        for group, settings in relay.groups.items():
+            st.export_settings(str(tmpdir), relay.relay_id, group,
+                               list(settings.items()))
+    assert tmpdir.join('BROKEN BOW 11S_08').check(dir=True)
+
+    exported = fleet.load_exports(str(tmpdir))
+    assert list(exported) == ['BROKEN BOW 11S/08']
+    relay = exported['BROKEN BOW 11S/08']
+    relay['S1']['E21P'] = '9'
+    assert parsed.diff(exported) == {'BROKEN BOW 11S/08': {
+        'S1': [('E21P', '9', '3')]}}
+
+    #  Files without a DEVID are keyed by their folder
+    tmpdir.join('OTHER', 'Set_1.txt').write('[INFO]\nFID=X\n[1]\nCTR,"1"\n',
+                                            ensure=True)
+    assert list(fleet.load_exports(str(tmpdir))) == ['BROKEN BOW 11S/08',
+                                                     'OTHER']
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_impedance
+----------------------------------
+
+Tests for `impedance` module.
+"""
+
+import cmath
+import math
+
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import batch
+from sel_utilities import impedance
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+from .test_checks import replace_field
+
+
+def phasor(reading, q):
+    return cmath.rect(reading[q + '_MAG'], math.radians(reading[q + '_ANG']))
+
+
+@pytest.mark.parametrize('relay, met_text',
+                         [(su.RelaySEL311C, sel311c_met),
+                          (su.RelaySEL421, sel421_met),
+                          (su.RelaySEL351Delta, sel351delta_met)])
+def test_apparent_impedances(relay, met_text):
+    reading = relay.parse_met(met_text)
+    z = impedance.apparent_impedances(batch.read_met_batch(relay, [met_text]))
+    if 'VA_MAG' in reading:
+        for ph in 'ABC':
+            expected = phasor(reading, 'V' + ph) * 1000 / phasor(reading,
+                                                                 'I' + ph)
+            assert z['Z' + ph][0] == pytest.approx(expected)
+    else:
+        assert 'ZA' not in z
+    for a, b in ('AB', 'BC', 'CA'):
+        if 'VAB_MAG' in reading:
+            v = phasor(reading, 'V' + a + b)
+        else:
+            v = phasor(reading, 'V' + a) - phasor(reading, 'V' + b)
+        i = phasor(reading, 'I' + a) - phasor(reading, 'I' + b)
+        assert z['Z' + a + b][0] == pytest.approx(v * 1000 / i)
+    #  Z1 is close to the phase-phase impedances for a balanced load
+    assert abs(z['Z1'][0] - z['ZAB'][0]) < 0.1 * abs(z['Z1'][0])
+
+
+@pytest.mark.parametrize('relay, met_text, phases',
+                         [(su.RelaySEL311C, sel311c_met,
+                           ['S_3P', 'S_A', 'S_B', 'S_C']),
+                          (su.RelaySEL421, sel421_met,
+                           ['S_3P', 'S_A', 'S_B', 'S_C']),
+                          (su.RelaySEL351Delta, sel351delta_met, ['S_3P'])])
+def test_apparent_power(relay, met_text, phases):
+    reading = relay.parse_met(met_text)
+    columns = batch.read_met_batch(relay, [met_text] * 2)
+    power = impedance.apparent_power(columns)
+    assert sorted(power) == phases
+    for name in phases:
+        reported = complex(reading['MW' + name[1:]],
+                           reading['MVAR' + name[1:]])
+        assert abs(power[name][1] - reported) < 0.01 * abs(reported)
+    failed = impedance.check_power(columns)
+    assert sorted(failed) == phases
+    assert all(len(failed[name]) == 0 for name in phases)
+
+
+def test_check_power():
+    fields = dict((f[0], f[1:4]) for f in su.RelaySEL351Delta._met_template
+                  .fields)
+    captures = [sel351delta_met,
+                replace_field(sel351delta_met,
+                              *fields['MW_3P'] + ('20.089',)),
+                replace_field(sel351delta_met,
+                              *fields['IB_ANG'] + ('-123.74',))]
+    columns = batch.read_met_batch(su.RelaySEL351Delta, captures)
+    assert list(impedance.check_power(columns)['S_3P']) == [1, 2]
+
+
+def test_no_voltages():
+    columns = batch.read_met_batch(su.RelaySEL311C, [sel311c_met])
+    columns = dict((q, v) for q, v in columns.items() if q[0] != 'V')
+    for func in (impedance.apparent_impedances, impedance.apparent_power):
+        with pytest.raises(KeyError) as e:
+            func(columns)
+        assert 'VA_MAG' in str(e.value) and 'VAB_MAG' in str(e.value)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_ingest
+----------------------------------
+
+Tests for `ingest` module.
+"""
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import ingest
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+
+
+def test_ingest_directory(tmpdir):
+    texts = [sel311c_met, sel421_met, sel351delta_met, ['=>MET', 'Invalid']]
+    for i in range(20):
+        d = tmpdir.join('%02d' % (i // 5)).ensure(dir=True)
+        d.join('met%02d.txt' % i).write(
+            '=>MET\n' + '\n'.join(texts[i % 4]) + '\n')
+    reports = []
+    chunks = list(ingest.ingest_directory(
+        str(tmpdir), '*.txt', batch_size=3, max_workers=2,
+        report=lambda n, t: reports.append(n)))
+    assert [n for n in reports] == [3, 6, 9, 12, 15, 18, 20]
+    paths = sum([c.paths for c in chunks], [])
+    assert paths == sorted(str(p) for p in tmpdir.visit('*.txt'))
+    assert sum([c.skipped for c in chunks], []) == paths[3::4]
+
+    chunk = chunks[0]
+    assert set(chunk.tables) == set([su.RelaySEL311C, su.RelaySEL421,
+                                     su.RelaySEL351Delta])
+    columns = chunk.tables[su.RelaySEL421]
+    assert list(columns['FILE']) == [1]
+    assert columns['IA_MAG'][0] == 199.332
+    columns = chunks[1].tables[su.RelaySEL311C]
+    assert list(columns['FILE']) == [1]
+    assert columns['RID'][0] == 'BROKEN BOW 11S-02'
+
+
+def test_ingest_batch_unreadable(tmpdir):
+    good = tmpdir.join('met.txt')
+    good.write('=>MET\n' + '\n'.join(sel311c_met) + '\n')
+    paths = [str(tmpdir.join('missing.txt')), str(good), str(tmpdir)]
+    chunk = ingest.ingest_batch(paths)
+    assert [path for path, message in chunk.errors] == [paths[0], paths[2]]
+    assert chunk.skipped == []
+    assert list(chunk.tables[su.RelaySEL311C]['FILE']) == [1]
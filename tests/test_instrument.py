@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_instrument
+----------------------------------
+
+Tests for `instrument` module.
+"""
+
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import instrument
+
+from .test_sel_utilities import sel311c_met, sel421_met
+
+
+@pytest.fixture
+def stats():
+    yield instrument.enable_stats()
+    instrument.disable_stats()
+
+
+def garble(met_text, line_no, old, new):
+    lines = list(met_text)
+    lines[line_no] = lines[line_no].replace(old, new)
+    return lines
+
+
+def test_parse_met_stats(stats):
+    su.RelaySEL311C.parse_met(sel311c_met)
+    su.RelaySEL311C.parse_met(sel311c_met)
+    with pytest.raises(ValueError):
+        su.RelaySEL311C.parse_met(garble(sel311c_met, 3, '213.328',
+                                         '213.3x8'))
+    with pytest.raises(ValueError):
+        su.RelaySEL311C.parse_met(sel421_met)
+    snapshot = stats.snapshot()
+    assert list(snapshot) == ['RelaySEL311C']
+    s = snapshot['RelaySEL311C']
+    assert s['parsed'] == 2
+    assert s['failed'] == 2
+    assert s['mismatched'] == 0
+    #  Only the capture that fits the layout has field errors
+    assert s['field_errors'] == {'IB_MAG': 1}
+    assert s['parse_met']['calls'] == 4
+    assert s['parse_met']['seconds'] > 0
+    assert s['match'] == {'calls': 0, 'seconds': 0.}
+
+
+def test_met_stats(stats):
+    met = su.RelaySEL421().met
+    assert met.match(sel421_met)
+    met.read(sel421_met)
+    assert met.data['IA'] == su.RelaySEL421.parse_met(sel421_met)['IA']
+    bad = garble(sel421_met, 6, '89.01', '89.x1')
+    assert not met.match(bad)
+    with pytest.raises(ValueError):
+        met.read(bad)
+
+    s = stats.snapshot()['RelaySEL421']
+    assert s['parsed'] == 2
+    #  The failed match is a probe, not a second failed parse
+    assert s['failed'] == 1
+    assert s['mismatched'] == 1
+    assert s['field_errors'] == {'IB_ANG': 1}
+    assert s['match']['calls'] == 2
+    assert s['read']['calls'] == 2
+    assert s['post_read']['calls'] == 1
+    assert s['parse_met']['calls'] == 1
+
+    stats.reset()
+    assert stats.snapshot() == {}
+
+
+def test_disable_stats():
+    stats = instrument.enable_stats()
+    assert instrument.disable_stats() is stats
+    assert instrument.active is None
+    su.RelaySEL311C.parse_met(sel311c_met)
+    su.RelaySEL311C().met.read(sel311c_met)
+    assert stats.snapshot() == {}
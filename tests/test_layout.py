@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_layout
+----------------------------------
+
+Tests for `layout` module.
+"""
+
+import pytest
+
+
+from sel_utilities import layout
+
+
+test_layout = [('A6, F6.2, A4', ['RID', 'X', 'Y:  '], (2,)),
+               'FIXED TEXT',
+               ('A3, F5.1, F5.1', ['Z: ', 'Z1', 'Z2'], (0,))]
+
+
+def test_parse_format():
+    assert layout._parse_format('A12, F10.3,F8.2') == [('A', 12), ('F', 10),
+                                                       ('F', 8)]
+    with pytest.raises(ValueError):
+        layout._parse_format('I5')
+
+
+def test_template():
+    t = layout.LayoutTemplate(test_layout)
+    assert t.n_lines == 3
+    assert t.checks == ((0, 12, 16, 'Y:'), (1, 0, None, 'FIXED TEXT'),
+                        (2, 0, 3, 'Z:'))
+    assert t.fields == (('RID', 0, 0, 6, 'A'), ('X', 0, 6, 12, 'F'),
+                        ('Z1', 2, 3, 8, 'F'), ('Z2', 2, 8, 13, 'F'))
+    assert t.prefilter_checks == ((1, 0, None, 'FIXED TEXT'),
+                                  (0, 12, 16, 'Y:'), (2, 0, 3, 'Z:'))
+    assert t.names == ('RID', 'X', 'Z1', 'Z2')
+    assert [p[:3] for p in t.plan] == [(0, 0, 6), (0, 6, 12), (2, 3, 8),
+                                       (2, 8, 13)]
+    with pytest.raises(AttributeError):
+        t.n_lines = 4
+
+
+@pytest.mark.parametrize("lines, matches", [
+    (['RELAY1  1.25Y:', 'FIXED TEXT', 'Z:   1.5'], True),
+    (['RELAY1  1.25Y:', 'FIXED TEXT'], False),
+    (['RELAY1  1.25X:', 'FIXED TEXT', 'Z:   1.5'], False),
+    (['RELAY1  1.2xY:', 'FIXED TEXT', 'Z:   1.5'], False),
+    (['RELAY1  1.25Y:', 'FIXED', 'Z:   1.5'], False)])
+def test_match(lines, matches):
+    assert layout.LayoutTemplate(test_layout).match(lines) is matches
+
+
+def test_view():
+    t = layout.LayoutTemplate(test_layout)
+    reads = []
+    v1 = layout.LayoutView(t, post_read_hook=reads.append)
+    v2 = layout.LayoutView(t)
+    v1.read(['RELAY1  1.25Y:', 'FIXED TEXT', 'Z:   1.5'])
+    v2.read(['RELAY2 -1.25Y:', 'FIXED TEXT', 'Z:        2.0'])
+    assert v1.data == {'RID': 'RELAY1', 'X': 1.25, 'Z1': 1.5, 'Z2': None}
+    assert v2.data == {'RID': 'RELAY2', 'X': -1.25, 'Z1': None, 'Z2': 2.0}
+    assert reads == [v1]
+
+
+def test_prefilter():
+    t = layout.LayoutTemplate(test_layout)
+    assert t.prefilter(['RELAY1  1.2xY:', 'FIXED TEXT', 'Z:  1.5'])
+    assert not t.prefilter(['RELAY1  1.25Y:', 'FIXED', 'Z:   1.5'])
+    with pytest.raises(ValueError) as e:
+        t.parse(['RELAY1  1.25Y:', 'FIXED', 'Z:   1.5'])
+    assert 'Line 1' in str(e.value)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_reading
+----------------------------------
+
+Tests for `reading` module.
+"""
+
+import pickle
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import reading
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+
+
+@pytest.mark.parametrize("relay, met_text",
+                         [(su.RelaySEL311C, sel311c_met),
+                          (su.RelaySEL421, sel421_met),
+                          (su.RelaySEL351Delta, sel351delta_met)])
+def test_reading_matches_met_data(relay, met_text):
+    met = relay().met
+    met.read(met_text)
+    r = relay.parse_met(met_text)
+    assert isinstance(r, reading.MeterReading)
+    assert dict(r) == met.data
+    assert list(r) == list(met.data)
+    assert len(r) == len(met.data)
+
+
+def test_derived_quantities_are_lazy():
+    r = su.RelaySEL311C.parse_met(sel311c_met)
+    assert not hasattr(r, '__dict__')
+    assert r._cache is None
+    assert r['IA_MAG'] == 200.563
+    assert r._cache is None
+    ia = r['IA']
+    assert r['IA'] is ia
+    assert r['V0_MAG'] == r['3V0_MAG'] / 3.
+    assert r['RID'] == 'BROKEN BOW 11S-02'
+    assert 'S_3P' in r and 'S_A_MAG' not in r
+    with pytest.raises(KeyError):
+        r['S_A_MAG']
+
+
+def test_blank_field():
+    r = su.RelaySEL351Delta.parse_met(sel351delta_met)
+    assert r['3V0_ANG'] is None
+    assert r.get('3V0_ANG', 0.) is None
+
+
+def test_pickle():
+    r = su.RelaySEL421.parse_met(sel421_met)
+    r2 = pickle.loads(pickle.dumps(r, 2))
+    assert type(r2) is type(r)
+    assert r2 == r
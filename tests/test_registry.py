@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_registry
+----------------------------------
+
+Tests for `registry` module.
+"""
+
+import pickle
+
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import detect, registry, stream
+from sel_utilities.detect import METER_RELAYS
+
+from .test_sel_utilities import sel311c_met, sel351delta_met
+
+
+#  The SEL-351 delta layout, trimmed after the power factor lines
+trimmed_layout = su.RelaySEL351Delta._met_layout[:15]
+
+
+@pytest.fixture
+def unregister():
+    """ Removes the relay types named in the returned list from the
+        registry, and their classes from sel_utilities, after the test.
+    """
+    names = []
+    yield names
+    for name in names:
+        registry._meter_layouts.pop(name, None)
+        relay = su._meter_relays.pop(name, None)
+        if relay is not None and getattr(su, name, None) is relay:
+            delattr(su, name)
+
+
+def test_builtin_relays():
+    assert registry.meter_layout_names() == ['RelaySEL311C',
+                                             'RelaySEL351Delta',
+                                             'RelaySEL421']
+    assert METER_RELAYS == (su.RelaySEL311C, su.RelaySEL351Delta,
+                            su.RelaySEL421)
+    for relay in METER_RELAYS:
+        entry = registry.meter_layout(relay.__name__)
+        assert su.meter_relay_class(relay.__name__) is relay
+        assert relay._met_template is entry.template
+        assert relay.__doc__ == entry.doc
+        assert issubclass(relay, su._MeterRelay)
+        assert relay._met_reading.relay is relay
+        assert relay.__module__ == 'sel_utilities.sel_utilities'
+
+
+def test_register_meter_layout(unregister):
+    unregister.append('RelayTestTrimmed')
+    registry.register_meter_layout(
+        'RelayTestTrimmed', trimmed_layout, quantities=['IA', 'VAB'],
+        power_phases=['3P'], strings=['RID', 'PF_LEADLAG_3P'],
+        doc=""" Test relay. """)
+    relay = su.meter_relay_class('RelayTestTrimmed')
+    assert su.RelayTestTrimmed is relay
+    with pytest.raises(ValueError):
+        registry.register_meter_layout('RelayTestTrimmed', trimmed_layout)
+
+    reading = relay.parse_met(sel351delta_met)
+    full = su.RelaySEL351Delta.parse_met(sel351delta_met)
+    assert reading['IA'] == full['IA']
+    assert reading['S_3P'] == full['S_3P']
+    assert reading['PF_LEADLAG_3P'] == 'LAG'
+    assert 'FREQ' not in reading and 'IB' not in reading
+    assert pickle.loads(pickle.dumps(reading)) == reading
+
+    met = relay().met
+    met.read(sel351delta_met)
+    assert met.data == reading.data
+
+
+@pytest.mark.parametrize('rules',
+                         [{'sequence': ['I2']},
+                          {'quantities': ['IX']},
+                          {'power_phases': ['A']},
+                          {'strings': ['IA_MAG']}])
+def test_register_meter_layout_errors(rules, unregister):
+    unregister.append('RelayTestBad')
+    with pytest.raises(ValueError):
+        registry.register_meter_layout('RelayTestBad', trimmed_layout,
+                                       **rules)
+    assert 'RelayTestBad' not in registry.meter_layout_names()
+
+
+def test_detect_registered_layout(unregister):
+    layout = list(su.RelaySEL311C._met_layout)
+    assert layout[2].startswith('                 A ')
+    layout[2] = 'TEST RELAY CURRENTS'
+    met_text = list(sel311c_met)
+    met_text[2] = layout[2]
+    assert detect.detect_relay(met_text) is None
+
+    unregister.append('RelayTestDetect')
+    registry.register_meter_layout('RelayTestDetect', layout)
+    relay = su.meter_relay_class('RelayTestDetect')
+    assert detect.RelayDetector().detect(met_text) is relay
+    assert detect.detect_relay(met_text) is relay
+    assert detect.detect_relay(sel311c_met) is su.RelaySEL311C
+    log = '=>MET\n' + '\n'.join(met_text) + '\n'
+    assert [r for offset, r, lines in stream.iter_met_blocks(
+        log.encode('latin-1'))] == [relay]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_rolling
+----------------------------------
+
+Tests for `rolling` module.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import rolling
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+from .test_store import with_time
+
+
+def test_running_stats():
+    rng = random.Random(1)
+    values = [rng.gauss(100., 10.) for i in range(20000)]
+    stats = rolling.RunningStats((0.1, 0.5, 0.9))
+    for x in values:
+        stats.add(x)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(np.mean(values))
+    assert stats.variance == pytest.approx(np.var(values, ddof=1))
+    assert stats.min == min(values) and stats.max == max(values)
+    for p in (0.1, 0.5, 0.9):
+        assert stats.quantile(p) == pytest.approx(
+            np.percentile(values, 100 * p), abs=0.5)
+    with pytest.raises(KeyError):
+        stats.quantile(0.25)
+
+    stats = rolling.RunningStats()
+    assert stats.summary() == {'count': 0, 'mean': None, 'std': None,
+                               'min': None, 'max': None, 0.5: None}
+    for x in (3., 1., 2.):
+        stats.add(x)
+    assert stats.quantile(0.5) == 2.
+
+
+@pytest.mark.parametrize('n', range(1, 11))
+def test_running_quantiles_small(n):
+    for values in (range(1, n + 1), range(n, 0, -1)):
+        stats = rolling.RunningStats((0.1, 0.5, 0.9))
+        for x in values:
+            stats.add(float(x))
+        for p in (0.1, 0.5, 0.9):
+            assert stats.quantile(p) == pytest.approx(
+                np.percentile(list(values), 100 * p))
+
+
+def test_window_stats():
+    rng = random.Random(2)
+    values = [rng.uniform(0., 1.) for i in range(500)]
+    stats = rolling.WindowStats(50, (0.25, 0.5), buckets=10)
+    for t, x in enumerate(values):
+        stats.add(t, x)
+        #  Whole buckets of 5 leave the window
+        first = max(((t - 55) // 5 + 1) * 5, 0)
+        window = values[first:t + 1]
+        assert 50 <= len(window) <= 55 or t < 49
+        assert stats.count == len(window)
+        assert stats.min == min(window) and stats.max == max(window)
+        assert stats.mean == pytest.approx(np.mean(window))
+        if len(window) > 1:
+            assert stats.variance == pytest.approx(np.var(window, ddof=1))
+        assert stats.quantile(0.25) == pytest.approx(
+            np.percentile(window, 25))
+    stats.expire(1000)
+    assert stats.count == 0 and stats.min is None and stats.max is None
+    assert stats.quantile(0.5) is None
+
+
+def test_window_stats_bounded():
+    rng = random.Random(3)
+    values = [rng.gauss(100., 10.) for i in range(50000)]
+    stats = rolling.WindowStats(20000, (0.1, 0.5, 0.9), buckets=20,
+                                sketch_size=32)
+    for t, x in enumerate(values):
+        stats.add(t, x)
+        assert len(stats._buckets) <= 21
+        assert all(len(b.sketch) < 64 for b in stats._buckets)
+    window = values[-stats.count:]
+    assert 20000 <= len(window) <= 21000
+    assert stats.mean == pytest.approx(np.mean(window))
+    assert stats.variance == pytest.approx(np.var(window, ddof=1))
+    for p in (0.1, 0.5, 0.9):
+        assert stats.quantile(p) == pytest.approx(
+            np.percentile(window, 100 * p), abs=0.5)
+
+
+def test_aggregator():
+    agg = rolling.RollingAggregator(['IA_MAG', 'MW_3P', 'FREQ', 'VDC'],
+                                    windows=(None, 150), quantiles=(0.5,))
+    agg.extend(su.RelaySEL311C.parse_met(with_time(sel311c_met, m))
+               for m in range(10))
+    agg.add(su.RelaySEL351Delta.parse_met(sel351delta_met))
+    agg.add(su.RelaySEL421.parse_met(sel421_met).data)
+    assert agg.relays() == ['BROKEN BOW 11S-02',
+                            'BROKEN BOW 11S-08 SEL-421 NON-PILOT',
+                            'BROKEN BOW 11T1L SEL-351-6']
+
+    summary = agg.summary('BROKEN BOW 11S-02')
+    assert summary[None]['IA_MAG']['count'] == 10
+    assert summary[None]['IA_MAG']['mean'] == pytest.approx(200.563)
+    assert summary[None]['IA_MAG']['std'] == pytest.approx(0.)
+    #  Readings are a minute apart, so 3 fall in a 150 s window
+    assert summary[150]['FREQ']['count'] == 3
+    assert summary[150]['FREQ'][0.5] == 59.99
+    assert summary[None]['VDC']['max'] == 133.4
+    #  The SEL-421 has no VDC field
+    summary = agg.summary('BROKEN BOW 11S-08 SEL-421 NON-PILOT')
+    assert summary[None]['VDC']['count'] == 0
+
+    stats = agg.stats('BROKEN BOW 11T1L SEL-351-6', None, 'MW_3P')
+    assert stats.count == 1 and stats.mean == 24.089
+    assert set(agg.summary()) == set(agg.relays())
@@ -9,6 +9,7 @@ Tests for `sel_utilities` module.
 """
 
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 
 
 from sel_utilities import sel_utilities as su
@@ -317,3 +318,31 @@ def test_mag_ang_to_complex(q, d_in, d_expected):
 def test_strip_string(q, d_in, d_expected):
     su._strip_string(q, d_in)
     assert d_in == d_expected
+
+
+@pytest.mark.parametrize("relay, met_text, met_values_dict",
+                         [(su.RelaySEL311C, sel311c_met, sel311c_met_values),
+                          (su.RelaySEL421, sel421_met, sel421_met_values),
+                          (su.RelaySEL351Delta, sel351delta_met,
+                           sel351delta_met_values)])
+def test_parse_met_reading(relay, met_text, met_values_dict):
+    r = relay()
+    reading = r.parse_met(met_text)
+    assert reading.relay is relay
+    assert r.met.data == {}
+    for k, v in met_values_dict.items():
+        assert_round_equals(reading[k], v)
+    with pytest.raises(ValueError):
+        relay.parse_met(met_text[:3] + ['I MAG'] + met_text[4:])
+
+
+def test_parse_met_threads():
+    relays = [su.RelaySEL311C(), su.RelaySEL421(), su.RelaySEL351Delta()]
+    texts = [sel311c_met, sel421_met, sel351delta_met]
+    expected = [r.parse_met(t).data for r, t in zip(relays, texts)]
+    jobs = [i % 3 for i in range(3000)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        readings = list(pool.map(
+            lambda i: relays[i].parse_met(texts[i]), jobs))
+    for i, reading in zip(jobs, readings):
+        assert reading.data == expected[i]
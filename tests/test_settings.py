@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_settings
+----------------------------------
+
+Tests for `settings` module.
+"""
+
+import os
+import random
+import re
+
+import pytest
+
+
+from sel_utilities import settings as st
+
+
+sel421_log = """\
+=>ID
+"FID=SEL-421-R120-V0-Z011008-D20100315","08F3"
+"BFID=SLBT-4XX-R100-V0-Z001001-D20080506","0930"
+"CID=0xA5B2","025C"
+"DEVID=BROKEN BOW 11S-08","0654"
+"DEVCODE=65","0312"
+"PARTNO=0421H11XX3X4H4XXXXX","0597"
+"CONFIG=11100201","03E5"
+=>SHO 1
+Group 1
+
+Relay Configuration
+
+E21P   := 3       E21MG  := 4       E21XG  := 4       ECVT   := N
+ECOMM  := N       E25BK1 := N
+
+Line Configuration
+
+LINENAM := "L1074 BROKEN BOW-CROOKED CREEK"
+CTRW   := 240     CTRX   := 240     PTRY   := 1000    PTRZ   := 1000
+
+=>SHO L
+Protection 1
+1: PLT01S := IN101 AND NOT RB01
+2: PLT01R := RB01
+
+=>SHO R
+SER Points and Aliases
+1: IN101,"BKR_52A","Closed","Opened",Y
+2: OUT101,"TRIP","Asserted","Deasserted"
+
+Event Reporting Digitals
+1: TRIP
+2: 67P1T\\
+ OR 67G1T
+=>SHO 2
+Group 2
+
+E21P   := 3\x08\x082       E21MG  := 4
+"""
+
+sel351_log = """\
+=>>ID
+"FID=SEL-351-6-R107-V0-Z103103-D20110519","0926"
+"BFID=SLBT-3CF1-R102-V0-Z100100-D20091207","095C"
+"CID=F7CE","0257"
+"DEVID=BROKEN BOW 11T1L SEL-351-6","0926"
+"PARTNO=0351601425X0X1","03D6"
+=>>SHO 1
+
+Group 1
+RID    =BROKEN BOW 11T1L SEL-351-6
+TID    =BROKEN BOW PCB610 T1 11T1L
+CTR    = 240      CTRN   = 240      PTR    = 1000.00  PTRS   = 1000.00
+"""
+
+
+def lines(text):
+    return text.splitlines(True)
+
+
+def test_parse_settings_421():
+    sections = list(st.parse_settings(lines(sel421_log)))
+    assert [group for relay_id, group, s in sections] == ['S1', 'L1', 'R1',
+                                                          'S2']
+    relay_id = sections[0][0]
+    assert relay_id['DEVID'] == 'BROKEN BOW 11S-08'
+    assert relay_id['FID'] == 'SEL-421-R120-V0-Z011008-D20100315'
+    assert len(relay_id) == 7
+
+    s1 = sections[0][2]
+    assert s1[:6] == [('E21P', '3'), ('E21MG', '4'), ('E21XG', '4'),
+                      ('ECVT', 'N'), ('ECOMM', 'N'), ('E25BK1', 'N')]
+    assert ('LINENAM', 'L1074 BROKEN BOW-CROOKED CREEK') in s1
+    assert s1[-1] == ('PTRZ', '1000')
+
+    l1 = sections[1][2]
+    assert l1[:2] == [('PROTSEL1', 'PLT01S := IN101 AND NOT RB01'),
+                      ('PROTSEL2', 'PLT01R := RB01')]
+    assert l1[-1] == ('PROTSEL100', '')
+    assert len(l1) == 100
+
+    r1 = sections[2][2]
+    assert r1[:5] == [('SITM1', 'IN101'), ('SNAME1', 'BKR_52A'),
+                      ('SSET1', 'Closed'), ('SCLR1', 'Opened'),
+                      ('SHMI1', 'Y')]
+    assert r1[9] == ('SHMI2', '')
+    assert r1[10] == ('SITM3', '')
+    assert r1[5 * 250 - 1] == ('SHMI250', '')
+    #  Continuation lines are joined
+    assert r1[5 * 250:5 * 250 + 2] == [('ERDG1', 'TRIP'),
+                                       ('ERDG2', '67P1TOR 67G1T')]
+    assert len(r1) == 5 * 250 + 800
+
+    #  Backspaces are applied, and the log may end without a prompt
+    assert sections[3][2] == [('E21P', '2'), ('E21MG', '4')]
+
+
+def test_parse_settings_351():
+    [(relay_id, group, s1)] = st.parse_settings(lines(sel351_log))
+    assert relay_id['DEVID'] == 'BROKEN BOW 11T1L SEL-351-6'
+    assert group == '1'
+    assert s1 == [('RID', 'BROKEN BOW 11T1L SEL-351-6'),
+                  ('TID', 'BROKEN BOW PCB610 T1 11T1L'),
+                  ('CTR', '240'), ('CTRN', '240'), ('PTR', '1000.00'),
+                  ('PTRS', '1000.00')]
+
+
+def test_parse_settings_streams():
+    read = []
+
+    def log():
+        for line in lines(sel421_log):
+            read.append(line)
+            yield line
+
+    sections = st.parse_settings(log())
+    relay_id, group, s1 = next(sections)
+    assert group == 'S1'
+    #  Only up to the next command, and one line of lookahead
+    assert read[-1] == '=>SHO L\n'
+    assert len(read) == lines(sel421_log).index('=>SHO L\n') + 1
+
+
+@pytest.mark.parametrize('text, fid, group', [
+    ('1', 'SEL-421-R120', 'S1'), ('6', 'SEL-421-R120', 'S6'),
+    ('L', 'SEL-421-R120', 'L1'), ('g', 'SEL-421-R120', 'G1'),
+    ('L3', 'SEL-421-R120', 'L3'), ('1', 'SEL-351-6-R107', '1'),
+    ('L', 'SEL-351-6-R107', 'L'), ('L2', 'SEL-351-6-R107', 'L2')])
+def test_settings_group(text, fid, group):
+    assert st.settings_group(text, fid) == group
+
+
+def test_sanitize_lines():
+    assert list(st.sanitize_lines(['ab\x08c\n', 'SHO\\\n', ' 1\n',
+                                   'xx\x08\x08y'])) == ['ac\n', 'SHO1', 'y']
+
+
+def old_sanitize_lines(lines):
+    """ The sanitizer ParseSettings.py used, applying backspaces until there
+        are none left to apply.
+    """
+    find_backspace = re.compile('[^\x08]\x08')
+    new_lines = []
+    i = iter(lines)
+    for line in i:
+        while len(line.strip()) > 0 and line.strip()[-1] == "\\":
+            line = line.strip()[0:-1] + next(i).strip()
+        while find_backspace.search(line):
+            line = find_backspace.sub('', line)
+        new_lines.append(line)
+    return new_lines
+
+
+def test_sanitize_lines_random():
+    rng = random.Random(0)
+    for n in range(500):
+        lines = [''.join(rng.choice('ab \x08\\') for j in range(
+                     rng.randrange(12))) + rng.choice(['', '\n'])
+                 for k in range(5)] + ['end\n']
+        assert list(st.sanitize_lines(lines)) == old_sanitize_lines(lines)
+
+
+def test_apply_backspaces():
+    assert st.apply_backspaces('abc') == 'abc'
+    assert st.apply_backspaces('\x08ab\x08\x08\x08c') == '\x08\x08c'
+    assert st.apply_backspaces(b'SHI\x08O 1\r\n') == b'SHO 1\r\n'
+    assert list(st.sanitize_lines([b'SHO\\\n', b'  1\x08L'])) == [b'SHOL']
+    #  Long runs take linear time
+    line = 'x' * 100000 + '\x08' * 99999 + 'yz'
+    assert st.apply_backspaces(line) == 'xyz'
+
+
+def old_simple_settings(line, sep):
+    """ The settings of a simple settings line as ParseSettings.py found
+        them, with one regular expression for the number of separators.
+        Returns None where that did not match.
+    """
+    item = r' *(\w+) *' + sep + r'(.+)'
+    m = re.match(r'\s+'.join([item] * len(re.findall(sep, line))), line)
+    if m is None:
+        return None
+    return list(zip([n.strip() for n in m.groups()[0::2]],
+                    [n.strip().strip('"') for n in m.groups()[1::2]]))
+
+
+def test_simple_settings():
+    for log in (sel421_log, sel351_log):
+        sep = ':=' if log is sel421_log else '='
+        for line in lines(log):
+            if st._simple_test[sep].match(line):
+                assert (st.simple_settings(line, sep) ==
+                        old_simple_settings(line, sep))
+    assert st.simple_settings('TR     := M1P OR Z1G OR M2PT OR Z2GT\n',
+                              ':=') == [('TR', 'M1P OR Z1G OR M2PT OR Z2GT')]
+
+    rng = random.Random(1)
+    n_compared = 0
+    for n in range(2000):
+        sep = rng.choice([':=', '='])
+        items = []
+        for k in range(rng.randrange(1, 5)):
+            value = rng.choice(['3', 'N', '"A B"', '1000.00', 'IN101 AND X',
+                                ' ', 'OFF', '-1.5'])
+            items.append('%s%s%s%s%s' % (
+                rng.choice(['E21P', 'CTR', 'X1', '50P1P']),
+                ' ' * rng.randrange(3), sep, ' ' * rng.randrange(3), value))
+        line = (' ' * rng.randrange(2) +
+                ''.join(item + ' ' * rng.randrange(1, 8) for item in items)
+                + rng.choice(['', '\n', '\r\n']))
+        old = old_simple_settings(line, sep)
+        if old is not None and st._simple_test[sep].match(line):
+            assert st.simple_settings(line, sep) == old, line
+            n_compared += 1
+    assert n_compared > 1000
+
+
+def test_export_settings(tmpdir):
+    sections = list(st.parse_settings(lines(sel421_log)))
+    relay_id, group, s1 = sections[0]
+    name = st.export_settings(str(tmpdir), relay_id, group, s1[:2])
+    assert name == str(tmpdir.join('BROKEN BOW 11S-08', 'Set_S1.txt'))
+    assert open(name).read() == (
+        '[INFO]\n'
+        'RELAYTYPE=SEL-421\n'
+        'FID=SEL-421-R120-V0-Z011008-D20100315\n'
+        'BFID=SLBT-4XX-R100-V0-Z001001-D20080506\n'
+        'PARTNO=0421H11XX3X4H4XXXXX\n'
+        'DEVID=BROKEN BOW 11S-08\n'
+        '[S1]\n'
+        'E21P,"3"\n'
+        'E21MG,"4"\n')
+    name = st.export_settings(str(tmpdir), relay_id, group, s1[:2])
+    assert name.endswith('Set_S1 (1).txt')
+    name = st.export_settings(str(tmpdir), None, '1', [])
+    assert name == str(tmpdir.join('NODEVID', 'Set_1.txt'))
+
+
+def test_extract_settings(tmpdir):
+    newer = sel421_log.replace('E21MG  := 4', 'E21MG  := 5')
+    for name, log, mtime in [('a/old.txt', sel421_log + sel351_log, 1000),
+                             ('b/new.txt', newer, 2000),
+                             ('b/same.txt', sel421_log, 2000)]:
+        path = tmpdir.join(name)
+        path.write(log, ensure=True)
+        os.utime(str(path), (mtime, mtime))
+    path = tmpdir.join('b', 'later.txt')
+    path.write(sel421_log.split('=>SHO L')[0].replace(':= 4', ':= 7'))
+    os.utime(str(path), (1500, 1500))
+
+    reports = []
+    merged = st.extract_settings(str(tmpdir), max_workers=2,
+                                 report=lambda n, t: reports.append(n))
+    assert reports == [1, 2, 3, 4]
+    assert sorted(merged) == [('BROKEN BOW 11S-08', 'L1'),
+                              ('BROKEN BOW 11S-08', 'R1'),
+                              ('BROKEN BOW 11S-08', 'S1'),
+                              ('BROKEN BOW 11S-08', 'S2'),
+                              ('BROKEN BOW 11T1L SEL-351-6', '1')]
+    #  The last file listed of those modified last
+    capture = merged[('BROKEN BOW 11S-08', 'S1')]
+    assert capture.path == str(tmpdir.join('b', 'same.txt'))
+    assert ('E21MG', '4') in capture.settings
+    assert merged[('BROKEN BOW 11T1L SEL-351-6', '1')].mtime == 1000
+
+    assert st.extract_settings([str(tmpdir.join('b', 'later.txt'))],
+                               max_workers=1)[
+        ('BROKEN BOW 11S-08', 'S1')].settings[1] == ('E21MG', '7')
+    single = st.extract_settings(str(tmpdir.join('a', 'old.txt')),
+                                 max_workers=1)
+    assert sorted(single) == [('BROKEN BOW 11S-08', 'L1'),
+                              ('BROKEN BOW 11S-08', 'R1'),
+                              ('BROKEN BOW 11S-08', 'S1'),
+                              ('BROKEN BOW 11S-08', 'S2'),
+                              ('BROKEN BOW 11T1L SEL-351-6', '1')]
+
+
+def test_merge_settings():
+    captures = [st.SettingsCapture({'DEVID': 'A'}, 'S1', [('X', '1')], 'f',
+                                   10),
+                st.SettingsCapture({'DEVID': 'A'}, 'S1', [('X', '2')], 'f',
+                                   10),
+                st.SettingsCapture({'DEVID': 'A'}, 'S1', [('X', '3')], 'g',
+                                   5),
+                st.SettingsCapture(None, '1', [], 'g', 5)]
+    merged = st.merge_settings(captures)
+    assert merged[('A', 'S1')].settings == [('X', '2')]
+    assert merged[(None, '1')].path == 'g'
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_store
+----------------------------------
+
+Tests for `store` module.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import batch
+from sel_utilities import store
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+
+
+def with_time(met_text, minute, rid=None):
+    """ Returns a copy of a 311C/351 capture with a new time and RID. """
+    lines = list(met_text)
+    header = lines[0]
+    if rid is not None:
+        header = rid.ljust(30) + header[30:]
+    lines[0] = header[:-12] + '16:%02d:00.000' % minute
+    return lines
+
+
+def test_append_and_query(tmpdir):
+    s = store.MeterStore(str(tmpdir), block_size=4)
+    captures = [with_time(sel311c_met, m) for m in range(0, 30, 2)]
+    columns = batch.read_met_batch(su.RelaySEL311C, captures[:10])
+    s.append_columns(su.RelaySEL311C, columns)
+    s.append(su.RelaySEL311C.parse_met(c) for c in captures[10:])
+    s.append([su.RelaySEL421.parse_met(sel421_met),
+              su.RelaySEL351Delta.parse_met(sel351delta_met)])
+    s.append([su.RelaySEL311C.parse_met(with_time(sel311c_met, 1, 'OTHER'))])
+    assert s.series() == [('BROKEN BOW 11S-02',
+                           'L1140C, PCB1102, BRK BOW-CALWY'),
+                          ('BROKEN BOW 11S-08 SEL-421 NON-PILOT',
+                           'L1074 BROKEN BOW-CROOKED CREEK'),
+                          ('BROKEN BOW 11T1L SEL-351-6',
+                           'BROKEN BOW PCB610 T1 11T1L'),
+                          ('OTHER', 'L1140C, PCB1102, BRK BOW-CALWY')]
+
+    rid, tid = s.series()[0]
+    q = s.query(rid, tid, '2016-07-21T16:05', '2016-07-21T16:21',
+                ['IA_MAG', 'VA_MAG', 'PF_LEADLAG_A'])
+    assert sorted(q) == ['IA_MAG', 'PF_LEADLAG_A', 'TIME', 'VA_MAG']
+    assert list(q['TIME']) == [np.datetime64('2016-07-21T16:%02d' % m, 'ms')
+                               for m in range(6, 21, 2)]
+    assert list(q['IA_MAG']) == [200.563] * 8
+    assert list(q['PF_LEADLAG_A']) == ['LEAD'] * 8
+
+    q = s.query(rid, tid)
+    assert len(q['TIME']) == 15
+    assert len(q) == len(store.MeterStore._field_types(su.RelaySEL311C)) + 1
+    q = s.query(rid, tid, end='2016-07-21T16:00')
+    assert len(q['TIME']) == 0 and len(q['VS_ANG']) == 0
+
+    q = s.query(*s.series()[2])
+    assert np.isnan(q['3V0_ANG'][0])
+    assert q['MW_3P'][0] == 24.089
+
+    with pytest.raises(KeyError):
+        s.query('NONE', 'NONE')
+
+
+def test_append_out_of_order(tmpdir):
+    s = store.MeterStore(str(tmpdir))
+    s.append([su.RelaySEL311C.parse_met(with_time(sel311c_met, 5))])
+    with pytest.raises(ValueError):
+        s.append([su.RelaySEL311C.parse_met(with_time(sel311c_met, 4))])
+    # Readings within one append are put in order
+    s.append([su.RelaySEL311C.parse_met(with_time(sel311c_met, m))
+              for m in (9, 7, 8)])
+    times = s.query(*s.series()[0])['TIME']
+    assert list(times) == [np.datetime64('2016-07-21T16:%02d' % m, 'ms')
+                           for m in (5, 7, 8, 9)]
+
+
+def test_rebuild_index(tmpdir):
+    s = store.MeterStore(str(tmpdir), block_size=2)
+    s.append([su.RelaySEL311C.parse_met(with_time(sel311c_met, m))
+              for m in range(5)])
+    index = tmpdir.join(tmpdir.listdir()[0].basename, 'index.i8')
+    index.write_binary(index.read_binary()[:8])
+    s.append([su.RelaySEL311C.parse_met(with_time(sel311c_met, 5))])
+    assert list(np.fromfile(str(index), '<i8')) == list(
+        s.query(*s.series()[0])['TIME'].astype(np.int64)[::2])
+
+
+def test_interrupted_append(tmpdir):
+    s = store.MeterStore(str(tmpdir), block_size=2,
+                         compression={'FREQ': ('deadband', 0.05)})
+    readings = [su.RelaySEL311C.parse_met(with_time(sel311c_met, m))
+                for m in range(5)]
+    s.append(readings[:3])
+    rid, tid = s.series()[0]
+    path = tmpdir.join(tmpdir.listdir()[0].basename)
+    #  Only meta.json was written before the first append stopped
+    for p in path.listdir():
+        if p.basename != 'meta.json':
+            p.remove()
+    q = s.query(rid, tid)
+    assert len(q['TIME']) == 0 and len(q['FREQ']) == 0
+    assert len(q['IA_MAG']) == 0
+
+    s.append(readings)
+    path.join('index.i8').remove()
+    q = s.query(rid, tid, start='2016-07-21T16:03')
+    assert list(q['TIME']) == [np.datetime64('2016-07-21T16:03', 'ms'),
+                               np.datetime64('2016-07-21T16:04', 'ms')]
+    assert list(q['FREQ']) == [59.99] * 2
+
+
+def test_append_rejects_nat(tmpdir, monkeypatch):
+    s = store.MeterStore(str(tmpdir))
+    monkeypatch.setattr(store, 'parse_timestamps', lambda dates, times:
+                        np.array(['NaT'] * len(dates), 'datetime64[ms]'))
+    with pytest.raises(ValueError):
+        s.append([su.RelaySEL311C.parse_met(sel311c_met)])
+    assert s.series() == []
+
+
+def test_compression(tmpdir):
+    with pytest.raises(ValueError):
+        store.MeterStore(str(tmpdir), compression={'FREQ': ('zip', 1.)})
+    s = store.MeterStore(str(tmpdir), block_size=4,
+                         compression={'FREQ': ('deadband', 0.05),
+                                      'IA_MAG': ('swinging_door', 0.5),
+                                      'PF_LEADLAG_A': ('deadband', 1.)},
+                         keyframe=600)
+    captures = [with_time(sel311c_met, m) for m in range(30)]
+    s.append(su.RelaySEL311C.parse_met(c) for c in captures[:12])
+    s.append(su.RelaySEL311C.parse_met(c) for c in captures[12:])
+    path = s._series_path(*s.series()[0])
+    #  Both batch ends and the 10 minute keyframes
+    rows = np.fromfile(path + '/FREQ.rows.i8', '<i8')
+    assert list(rows) == [0, 10, 11, 21, 29]
+    assert not os.path.exists(path + '/PF_LEADLAG_A.rows.i8')
+
+    q = s.query(*s.series()[0])
+    assert list(q['FREQ']) == [59.99] * 30
+    assert list(q['IA_MAG']) == [200.563] * 30
+    q = s.query(*s.series()[0], start='2016-07-21T16:13',
+                end='2016-07-21T16:17', fields=['FREQ'])
+    assert list(q['FREQ']) == [59.99] * 4
+    q = s.query(*s.series()[0], start='2016-07-21T17:00', fields=['FREQ'])
+    assert len(q['FREQ']) == 0
+
+    s = store.MeterStore(str(tmpdir.join('varying')), block_size=8,
+                         compression={'FREQ': ('swinging_door', 0.002)})
+    columns = batch.read_met_batch(
+        su.RelaySEL311C, [with_time(sel311c_met, m) for m in range(60)])
+    freq = 60. + 0.01 * np.sin(np.arange(60) / 5.)
+    columns['FREQ'] = freq
+    s.append_columns(su.RelaySEL311C, columns)
+    rid, tid = s.series()[0]
+    path = s._series_path(rid, tid)
+    assert len(np.fromfile(path + '/FREQ.rows.i8', '<i8')) < 30
+    q = s.query(rid, tid, '2016-07-21T16:17', '2016-07-21T16:43', ['FREQ'])
+    assert np.abs(q['FREQ'] - freq[17:43]).max() <= 0.002 + 1e-9
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_stream
+----------------------------------
+
+Tests for `stream` module.
+"""
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import stream
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+
+
+def make_log():
+    """ Returns the text of a log with METER captures among other output,
+        and the offsets of the complete captures.
+    """
+    parts = ['=>ID\n"FID=SEL-311C-R100-V0-Z001001-D20010101","0963"\n\n',
+             '=>MET\n',
+             '\n'.join(sel311c_met) + '\n',
+             '\n=>>MET\n\n',
+             '\r\n'.join(sel421_met) + '\r\n',
+             'Date: 01/01/16    Time: 00:00:00.000\n',
+             '=>MET\n',
+             '\n'.join(sel351delta_met) + '\n=>\n',
+             '=>MET\n',
+             '\n'.join(sel311c_met[:-3])]
+    offsets = []
+    pos = 0
+    for i, p in enumerate(parts):
+        if i in (2, 4, 7):
+            offsets.append(pos)
+        pos += len(p)
+    return ''.join(parts).encode('latin-1'), offsets
+
+
+def test_iter_met_readings(tmpdir):
+    text, offsets = make_log()
+    log = tmpdir.join('log.txt')
+    log.write_binary(text)
+    found = list(stream.iter_met_readings(str(log)))
+    assert [offset for offset, reading in found] == offsets
+    assert [reading.relay for offset, reading in found] == [
+        su.RelaySEL311C, su.RelaySEL421, su.RelaySEL351Delta]
+    assert found[1][1] == su.RelaySEL421.parse_met(sel421_met)
+
+
+def test_iter_met_readings_empty(tmpdir):
+    log = tmpdir.join('empty.txt')
+    log.write_binary(b'')
+    assert list(stream.iter_met_readings(str(log))) == []
+
+
+def test_iter_met_blocks_bytes():
+    text, offsets = make_log()
+    blocks = list(stream.iter_met_blocks(text))
+    assert [b[0] for b in blocks] == offsets
+    assert blocks[0][2] == sel311c_met
+
+
+def test_follower_pieces(tmpdir):
+    text, offsets = make_log()
+    log = tmpdir.join('log.txt')
+    log.write_binary(b'')
+    follower = stream.MetFollower(str(log))
+    found = []
+    for i in range(0, len(text), 97):
+        with open(str(log), 'ab') as f:
+            f.write(text[i:i + 97])
+        found.extend(follower.poll())
+    # The last capture is cut short and never completed
+    assert [offset for offset, reading in found] == offsets
+    assert follower.poll() == []
+    # A new follower can resume from the saved offset
+    resumed = stream.MetFollower(str(log), offset=follower.offset)
+    with open(str(log), 'ab') as f:
+        rest = '\n' + '\n'.join(sel311c_met[-3:]) + '\n'
+        f.write(rest.encode('latin-1'))
+    assert [r.relay for offset, r in resumed.poll()] == [su.RelaySEL311C]
+    follower.close()
+    resumed.close()
+
+
+def test_follower_truncate_and_rotate(tmpdir):
+    met = ('\n'.join(sel311c_met) + '\n').encode('latin-1')
+    log = tmpdir.join('log.txt')
+    log.write_binary(b'=>MET\n' + met)
+    follower = stream.MetFollower(str(log))
+    assert [offset for offset, r in follower.poll()] == [6]
+    # Truncated and rewritten
+    log.write_binary(met)
+    assert [offset for offset, r in follower.poll()] == [0]
+    # Truncated and rewritten past the old offset between two polls
+    log.write_binary(b'=>MET\n=>MET\n' + met + met)
+    assert [offset for offset, r in follower.poll()] == [12, 12 + len(met)]
+    log.write_binary(met)
+    assert [offset for offset, r in follower.poll()] == [0]
+    # Rotated with a capture still being written to the old file
+    with open(str(log), 'ab') as f:
+        f.write(met)
+    log.rename(tmpdir.join('log.1'))
+    tmpdir.join('log.txt').write_binary(b'\n' + met)
+    found = follower.poll()
+    assert [offset for offset, r in found] == [len(met), 1]
+    follower.close()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_synthetic
+----------------------------------
+
+Tests for `synthetic` module.
+"""
+
+import datetime
+import random
+
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import detect
+from sel_utilities import stream
+from sel_utilities import synthetic
+
+from .test_sel_utilities import sel311c_met, sel351delta_met, sel421_met
+
+
+relays = [su.RelaySEL311C, su.RelaySEL351Delta, su.RelaySEL421]
+
+
+@pytest.mark.parametrize('relay, met_text',
+                         [(su.RelaySEL311C, sel311c_met),
+                          (su.RelaySEL351Delta, sel351delta_met),
+                          (su.RelaySEL421, sel421_met)])
+def test_format_met(relay, met_text):
+    values = relay._met_template.parse(met_text)
+    lines = synthetic.format_met(relay, values)
+    assert len(lines) == len(met_text)
+    assert relay.parse_met(lines) == relay.parse_met(met_text)
+    assert detect.detect_relay(lines) is relay
+
+
+@pytest.mark.parametrize('relay', relays)
+def test_random_met_values(relay):
+    rng = random.Random(0)
+    stamp = datetime.datetime(2016, 7, 21, 16, 51, 54, 489000)
+    for i in range(50):
+        values = synthetic.random_met_values(relay, rng, stamp, 'RELAY 1',
+                                             blank_rate=0.1)
+        reading = relay.parse_met(synthetic.format_met(relay, values))
+        for name, v in values.items():
+            if isinstance(v, str):
+                assert reading[name] == v.strip()
+            else:
+                assert reading[name] == v
+        assert reading['RID'] == 'RELAY 1'
+        assert reading['TIME'] == '16:51:54.489'
+        assert reading.timestamp == stamp
+
+
+def test_generate_met(tmpdir):
+    captures = list(synthetic.generate_met(su.RelaySEL421, 3, seed=1))
+    assert [su.RelaySEL421.parse_met(c)['TIME'] for c in captures] == [
+        '16:00:00.000', '16:00:01.000', '16:00:02.000']
+    assert captures == list(synthetic.generate_met(su.RelaySEL421, 3,
+                                                   seed=1))
+
+    names = synthetic.write_met_corpus(str(tmpdir), relays, 6,
+                                       captures_per_file=2)
+    assert len(names) == 6
+    for name in names:
+        readings = list(stream.iter_met_readings(name))
+        assert len(readings) == 2
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_timestamps
+----------------------------------
+
+Tests for `timestamps` module.
+"""
+
+import datetime
+
+import numpy as np
+import pytest
+
+
+from sel_utilities import sel_utilities as su
+from sel_utilities import batch
+from sel_utilities import timestamps
+
+from .test_sel_utilities import sel311c_met, sel421_met
+
+
+def strptime(date, time):
+    fmt = '%m/%d/%Y' if len(date) == 10 else '%m/%d/%y'
+    if '.' not in time:
+        time += '.0'
+    return np.datetime64(datetime.datetime.strptime(
+        date + ' ' + time, fmt + ' %H:%M:%S.%f'), 'ms')
+
+
+def test_parse_timestamp():
+    for date, time in [('07/21/16', '16:51:54.489'),
+                       ('07/21/2016', '16:54:23.886'),
+                       ('01/01/70', '00:00:00.000'),
+                       ('12/31/68', '23:59:59.999'),
+                       ('02/29/2000', '01:02:03.4'),
+                       ('03/01/99', '12:00:00')]:
+        assert timestamps.parse_timestamp(date, time) == strptime(date, time)
+    for date, time in [('07/21/16', '16:51:54,489'),
+                       ('21/07/16', '16:51:54.489'),
+                       ('07/21/216', '16:51:54.489'),
+                       ('07/21/16', '16:51')]:
+        with pytest.raises(ValueError):
+            timestamps.parse_timestamp(date, time)
+
+
+def test_parse_timestamps():
+    dates = ['07/21/16', '07/21/2016', '12/31/68', '07/21/16', '02/29/2000']
+    times = ['16:51:54.489', '16:54:23.886', '23:59:59.999', ' 00:00:00.0 ',
+             '01:02:03']
+    stamps = timestamps.parse_timestamps(dates, times)
+    assert stamps.dtype == np.dtype('datetime64[ms]')
+    assert list(stamps) == [strptime(d, t.strip())
+                            for d, t in zip(dates, times)]
+    assert len(timestamps.parse_timestamps([], [])) == 0
+
+    for time in ['16:51:54,489', '16-51-54.489', '16:5:54.489', '16:51:54.4x']:
+        with pytest.raises(ValueError):
+            timestamps.parse_timestamps(dates[:2], [times[0], time])
+    with pytest.raises(ValueError):
+        timestamps.parse_timestamps(['07/21/16', '7-21-16'], times[:2])
+
+
+def test_reading_timestamps():
+    reading = su.RelaySEL421.parse_met(sel421_met)
+    assert reading.timestamp == np.datetime64('2016-07-21T16:54:23.886')
+
+    columns = batch.read_met_batch(su.RelaySEL311C, [sel311c_met] * 3)
+    stamps = timestamps.parse_timestamps(columns['DATE'], columns['TIME'])
+    assert list(stamps) == [np.datetime64('2016-07-21T16:51:54.489')] * 3